@@ -0,0 +1,223 @@
+from dataclasses import dataclass
+from datetime import datetime, date
+from typing import Any, Dict, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # numpy 是可选依赖，只有分析功能需要
+    np = None
+
+from cache import data_versions, VersionedLRUCache
+from database import DatabaseManager
+from models import (
+    TransactionType, Category, TRANSACTION_TYPES, CATEGORIES,
+    TRANSACTION_TYPE_CODES, CATEGORY_CODES, to_epoch
+)
+
+NUMPY_AVAILABLE = np is not None
+
+SECONDS_PER_DAY = 86400
+INCOME_CODE = TRANSACTION_TYPE_CODES[TransactionType.INCOME.value]
+EXPENSE_CODE = TRANSACTION_TYPE_CODES[TransactionType.EXPENSE.value]
+
+# 列快照按用户缓存，数据版本变化后失效；快照较大，只保留少量用户
+snapshot_cache = VersionedLRUCache(data_versions, max_entries=8)
+
+def _code_case(column: str, values: Sequence) -> str:
+    """在 SQL 中把枚举文本映射为整数编码，未知取值为 -1"""
+    branches = " ".join(f"WHEN '{item.value}' THEN {code}" for code, item in enumerate(values))
+    return f"CASE {column} {branches} ELSE -1 END"
+
+# 第二列为交易时刻在本机时区的本地时间（秒），与汇总表按本机日期划分、
+# 统计查询按 to_epoch 换算时间范围处在同一时间框架
+SNAPSHOT_QUERY = f'''
+    SELECT transaction_epoch,
+           CAST(strftime('%s', transaction_epoch, 'unixepoch', 'localtime') AS INTEGER),
+           amount_cents,
+           {_code_case('transaction_type', TRANSACTION_TYPES)},
+           {_code_case('category', CATEGORIES)}
+    FROM transactions
+    WHERE user_id = ?
+    ORDER BY transaction_epoch
+'''
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("分析功能需要安装 numpy")
+
+def _local_day(value: datetime) -> int:
+    """时间在本机时区的日期（自 1970-01-01 起的天数）；带时区的时间先换算到本机时区"""
+    return (datetime.fromtimestamp(to_epoch(value)[0]).date() - date(1970, 1, 1)).days
+
+@dataclass
+class ColumnSnapshot:
+    """一个用户的交易列数组，按时间升序排列
+
+    local_seconds 为交易时刻在本机时区的本地时间（秒）；balance 为截至每笔交易
+    （含）的累计收支差额（分），对时间段切片时已包含期初余额。
+    """
+    epoch: "np.ndarray"
+    local_seconds: "np.ndarray"
+    amount_cents: "np.ndarray"
+    type_code: "np.ndarray"
+    category_code: "np.ndarray"
+    balance: "np.ndarray"
+
+    @classmethod
+    def from_rows(cls, rows) -> "ColumnSnapshot":
+        data = np.array(rows, dtype=np.int64).reshape(-1, 5)
+        epoch = data[:, 0]
+        type_code = data[:, 3].astype(np.int8)
+        amount_cents = data[:, 2]
+        signed = np.where(type_code == INCOME_CODE, amount_cents,
+                          np.where(type_code == EXPENSE_CODE, -amount_cents, 0))
+        return cls(
+            epoch=epoch,
+            local_seconds=data[:, 1],
+            amount_cents=amount_cents,
+            type_code=type_code,
+            category_code=data[:, 4].astype(np.int8),
+            balance=np.cumsum(signed),
+        )
+
+    def __len__(self) -> int:
+        return len(self.epoch)
+
+    def slice(self, start_time: Optional[datetime] = None,
+              end_time: Optional[datetime] = None) -> "ColumnSnapshot":
+        """取闭区间 [start_time, end_time] 内的部分（视图，不复制数据）"""
+        lo = 0 if start_time is None else np.searchsorted(self.epoch, to_epoch(start_time)[0], 'left')
+        hi = len(self) if end_time is None else np.searchsorted(self.epoch, to_epoch(end_time)[0], 'right')
+        return ColumnSnapshot(self.epoch[lo:hi], self.local_seconds[lo:hi], self.amount_cents[lo:hi],
+                              self.type_code[lo:hi], self.category_code[lo:hi], self.balance[lo:hi])
+
+    def mask(self, transaction_type: Optional[TransactionType] = None,
+             category: Optional[Category] = None) -> "np.ndarray":
+        selected = np.ones(len(self), dtype=bool)
+        if transaction_type is not None:
+            selected &= self.type_code == TRANSACTION_TYPE_CODES[transaction_type.value]
+        if category is not None:
+            selected &= self.category_code == CATEGORY_CODES[category.value]
+        return selected
+
+    @property
+    def local_days(self) -> "np.ndarray":
+        """本地日期（自 1970-01-01 起的天数）"""
+        return self.local_seconds // SECONDS_PER_DAY
+
+class AnalyticsEngine:
+    """基于 NumPy 列数组的交易分析
+
+    每个用户的全部交易只按 (时间, 金额, 类型, 分类) 四列读取一次（走覆盖索引），
+    之后各项分析都在内存中向量化计算；数据版本变化（增删交易）后重新读取。
+    金额结果单位为元（float64），精确的账面金额请使用 StatisticsService。
+    """
+
+    def __init__(self, cache: Optional[VersionedLRUCache] = None):
+        _require_numpy()
+        self.db = DatabaseManager()
+        self.cache = cache or snapshot_cache
+
+    def snapshot(self, user_id: int) -> ColumnSnapshot:
+        """用户全部交易的列快照（缓存）"""
+        return self.cache.get_or_compute(user_id, 'columns', lambda: self._load_snapshot(user_id))
+
+    def _load_snapshot(self, user_id: int) -> ColumnSnapshot:
+        with self.db.connection() as conn:
+            rows = conn.execute(SNAPSHOT_QUERY, (user_id,)).fetchall()
+        return ColumnSnapshot.from_rows(rows)
+
+    def columns(self, user_id: int, start_time: Optional[datetime] = None,
+                end_time: Optional[datetime] = None) -> ColumnSnapshot:
+        return self.snapshot(user_id).slice(start_time, end_time)
+
+    def daily_totals(self, user_id: int, start_time: datetime, end_time: datetime,
+                     transaction_type: Optional[TransactionType] = TransactionType.EXPENSE,
+                     category: Optional[Category] = None) -> Dict[str, Any]:
+        """每个本机日期的金额合计，没有交易的日期为 0
+
+        日期与汇总表一样按本机时区划分，时间范围内的每笔交易都计入。
+        返回 {'dates': datetime64[D] 数组, 'totals': 元}
+        """
+        cols = self.columns(user_id, start_time, end_time)
+        selected = cols.mask(transaction_type, category)
+        local_days = cols.local_days
+        first_day, last_day = _local_day(start_time), _local_day(end_time)
+        if len(local_days):
+            # 夏令时切换可能让本机时间回拨，按实际出现的日期扩展，不丢弃任何交易
+            first_day = min(first_day, int(local_days.min()))
+            last_day = max(last_day, int(local_days.max()))
+        day_count = last_day - first_day + 1
+        days = local_days - first_day
+        totals = np.bincount(days[selected], weights=cols.amount_cents[selected], minlength=day_count)
+        dates = np.arange(first_day, last_day + 1).astype('datetime64[D]')
+        return {'dates': dates, 'totals': totals / 100}
+
+    def rolling_average(self, user_id: int, start_time: datetime, end_time: datetime,
+                        window_days: int = 7,
+                        transaction_type: Optional[TransactionType] = TransactionType.EXPENSE,
+                        category: Optional[Category] = None) -> Dict[str, Any]:
+        """每日金额的滑动平均；前 window_days-1 天按已有天数平均
+
+        返回 {'dates', 'totals', 'average'}
+        """
+        if window_days <= 0:
+            raise ValueError("window_days 必须为正数")
+        daily = self.daily_totals(user_id, start_time, end_time, transaction_type, category)
+        totals = daily['totals']
+        cumulative = np.concatenate(([0.0], np.cumsum(totals)))
+        index = np.arange(1, len(totals) + 1)
+        lower = np.maximum(index - window_days, 0)
+        daily['average'] = (cumulative[index] - cumulative[lower]) / (index - lower)
+        return daily
+
+    def percentiles(self, user_id: int, start_time: Optional[datetime] = None,
+                    end_time: Optional[datetime] = None, q: Sequence[float] = (50, 90, 99),
+                    transaction_type: Optional[TransactionType] = TransactionType.EXPENSE,
+                    category: Optional[Category] = None) -> Dict[float, float]:
+        """单笔金额的百分位数；没有交易时为空字典"""
+        cols = self.columns(user_id, start_time, end_time)
+        amounts = cols.amount_cents[cols.mask(transaction_type, category)]
+        if not len(amounts):
+            return {}
+        values = np.percentile(amounts, q) / 100
+        return dict(zip(q, values.tolist()))
+
+    def histogram(self, user_id: int, start_time: Optional[datetime] = None,
+                  end_time: Optional[datetime] = None, bins: Any = 20, log_scale: bool = False,
+                  transaction_type: Optional[TransactionType] = TransactionType.EXPENSE,
+                  category: Optional[Category] = None) -> Dict[str, Any]:
+        """单笔金额分布
+
+        bins 同 numpy.histogram；log_scale 为 True 时按对数等距分箱，适合长尾金额。
+        返回 {'edges': 元, 'counts'}
+        """
+        cols = self.columns(user_id, start_time, end_time)
+        amounts = cols.amount_cents[cols.mask(transaction_type, category)] / 100
+        if log_scale and len(amounts) and isinstance(bins, int):
+            bins = np.geomspace(amounts.min(), amounts.max(), bins + 1) if amounts.min() < amounts.max() else bins
+        counts, edges = np.histogram(amounts, bins=bins)
+        return {'edges': edges, 'counts': counts}
+
+    def weekday_hour_heatmap(self, user_id: int, start_time: Optional[datetime] = None,
+                             end_time: Optional[datetime] = None, count: bool = False,
+                             transaction_type: Optional[TransactionType] = TransactionType.EXPENSE,
+                             category: Optional[Category] = None) -> "np.ndarray":
+        """按本机时区的 (星期, 小时) 汇总的 7x24 矩阵，第 0 行为周一；count 为 True 时统计笔数，否则为金额（元）"""
+        cols = self.columns(user_id, start_time, end_time)
+        selected = cols.mask(transaction_type, category)
+        local_seconds = cols.local_seconds[selected]
+        # 1970-01-01 是周四
+        weekday = (local_seconds // SECONDS_PER_DAY + 3) % 7
+        hour = local_seconds % SECONDS_PER_DAY // 3600
+        weights = None if count else cols.amount_cents[selected] / 100
+        return np.bincount(weekday * 24 + hour, weights=weights, minlength=7 * 24).reshape(7, 24)
+
+    def cumulative_balance(self, user_id: int, start_time: Optional[datetime] = None,
+                           end_time: Optional[datetime] = None) -> Dict[str, Any]:
+        """每笔交易后的累计余额（收入 - 支出，含 start_time 之前的期初余额）
+
+        返回 {'times': 本机时区的本地时间 datetime64[s] 数组, 'balance': 元}
+        """
+        cols = self.columns(user_id, start_time, end_time)
+        return {'times': cols.local_seconds.astype('datetime64[s]'), 'balance': cols.balance / 100}
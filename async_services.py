@@ -0,0 +1,284 @@
+"""服务层的 asyncio 接口
+
+    executor = AsyncExecutor()
+    transactions = AsyncTransactionService(executor)
+    stats = AsyncStatisticsService(executor, timeout=5)
+    summary, recent = await fan_out(
+        stats.get_time_range_stats(user_id, start, end),
+        transactions.get_user_transactions(user_id, limit=20),
+    )
+    async for transaction in AsyncQueryService(executor).iter_transactions(user_id, category=Category.FOOD):
+        ...
+
+SQLite 调用在 AsyncExecutor 的专用线程中执行。每个工作线程在忙碌期间持有连接池中的同一个连接，
+线程内的服务调用都是对它的嵌套借用，因此同一线程上的调用始终使用同一连接。
+协程被取消（包括 asyncio.wait_for 超时）时，排队中的调用不再执行，执行中的调用通过
+Connection.interrupt() 中断当前语句。
+"""
+import asyncio
+import queue
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from database import DatabaseManager
+from models import Transaction, TransactionPage, BulkInsertResult
+from services import TransactionService, QueryService, StatisticsService
+
+# 工作线程空闲超过该秒数后把连接归还连接池
+IDLE_RELEASE = 5.0
+
+class _Job:
+    """提交给执行器的一次调用"""
+    __slots__ = ('func', 'args', 'kwargs', 'loop', 'future', 'lock', 'conn', 'cancelled')
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict,
+                 loop: asyncio.AbstractEventLoop, future: asyncio.Future):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.loop = loop
+        self.future = future
+        self.lock = threading.Lock()
+        self.conn = None  # 执行期间为所在工作线程的连接
+        self.cancelled = False
+
+    def settle(self, result: Any = None, error: Optional[BaseException] = None):
+        try:
+            self.loop.call_soon_threadsafe(_set_future, self.future, result, error)
+        except RuntimeError:
+            pass  # 事件循环已关闭，没有人再等待结果
+
+def _set_future(future: asyncio.Future, result: Any, error: Optional[BaseException]):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+_STOP = object()
+
+class AsyncExecutor:
+    """执行服务层调用的专用线程池
+
+    workers 默认为连接池大小的一半，给界面线程等其他借用者留出连接。
+    """
+
+    def __init__(self, workers: Optional[int] = None, db: Optional[DatabaseManager] = None):
+        self.db = db or DatabaseManager()
+        self.workers = workers or max(1, self.db.pool.max_size // 2)
+        if self.workers > self.db.pool.max_size:
+            raise ValueError(f"工作线程数 {self.workers} 超过连接池大小 {self.db.pool.max_size}")
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {'calls': 0, 'cancelled': 0, 'interrupted': 0, 'errors': 0}
+        self._threads = [threading.Thread(target=self._work, name=f'finance-async-{index}', daemon=True)
+                         for index in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在工作线程中执行 func(*args, **kwargs) 并等待结果"""
+        loop = asyncio.get_running_loop()
+        job = _Job(func, args, kwargs, loop, loop.create_future())
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("执行器已关闭")
+            self._stats['calls'] += 1
+            self._queue.put(job)
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            self._cancel(job)
+            raise
+
+    def _cancel(self, job: _Job):
+        with job.lock:
+            job.cancelled = True
+            conn = job.conn
+            if conn is not None:
+                # 只在该调用执行期间中断，不会误伤同一连接上的下一个调用
+                conn.interrupt()
+        with self._lock:
+            self._stats['interrupted' if conn is not None else 'cancelled'] += 1
+
+    def _work(self):
+        job = self._queue.get()
+        while job is not _STOP:
+            try:
+                with self.db.connection() as conn:
+                    while job is not None and job is not _STOP:
+                        self._execute(job, conn)
+                        try:
+                            job = self._queue.get(timeout=IDLE_RELEASE)
+                        except queue.Empty:
+                            job = None  # 空闲：归还连接，下一个调用到来时再借
+            except Exception as e:
+                # 借不到连接（例如等待超时）或回滚失败（连接被丢弃）：当前调用以该错误结束
+                if job is not None and job is not _STOP:
+                    job.settle(error=e)
+                    job = None
+            if job is None:
+                job = self._queue.get()
+
+    def _execute(self, job: _Job, conn):
+        with job.lock:
+            if job.cancelled:
+                return
+            job.conn = conn
+        try:
+            result = job.func(*job.args, **job.kwargs)
+        except BaseException as e:
+            result, error = None, e
+        else:
+            error = None
+        finally:
+            with job.lock:
+                job.conn = None
+        if error is not None:
+            with self._lock:
+                self._stats['errors'] += 1
+        try:
+            if conn.in_transaction:
+                # 嵌套借用不会自动回滚，失败或被中断的写入在这里回滚
+                conn.rollback()
+        finally:
+            job.settle(result, error)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, workers=self.workers, queued=self._queue.qsize())
+
+    def shutdown(self, wait: bool = True):
+        """不再接受新调用；已排队的调用执行完后线程退出"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for _ in self._threads:
+                self._queue.put(_STOP)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+_default_executor: Optional[AsyncExecutor] = None
+_default_lock = threading.Lock()
+
+def get_default_executor() -> AsyncExecutor:
+    """未指定执行器的异步服务共用的执行器，第一次使用时创建"""
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None or _default_executor._closed:
+            _default_executor = AsyncExecutor()
+        return _default_executor
+
+async def fan_out(*aws: Awaitable) -> List[Any]:
+    """并发等待多个相互独立的查询，按参数顺序返回结果；任一失败时取消其余查询"""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+class _AsyncService:
+    """异步服务的公共部分：timeout 为每次调用的超时秒数，超时抛出 asyncio.TimeoutError"""
+
+    def __init__(self, executor: Optional[AsyncExecutor] = None, timeout: Optional[float] = None):
+        self.executor = executor or get_default_executor()
+        self.timeout = timeout
+
+    async def _call(self, func: Callable, *args, **kwargs) -> Any:
+        call = self.executor.run(func, *args, **kwargs)
+        if self.timeout is None:
+            return await call
+        return await asyncio.wait_for(call, self.timeout)
+
+    async def _iter_pages(self, fetch_page: Callable[[Optional[str]], TransactionPage],
+                          cursor: Optional[str]) -> AsyncIterator[Transaction]:
+        """逐条产出分页结果；消费当前页时下一页已在工作线程中读取"""
+        pending = asyncio.ensure_future(self._call(fetch_page, cursor))
+        try:
+            while pending is not None:
+                page = await pending
+                pending = None
+                if page.next_cursor is not None:
+                    pending = asyncio.ensure_future(self._call(fetch_page, page.next_cursor))
+                for transaction in page.transactions:
+                    yield transaction
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+class AsyncTransactionService(_AsyncService):
+    def __init__(self, executor: Optional[AsyncExecutor] = None, timeout: Optional[float] = None):
+        super().__init__(executor, timeout)
+        self.service = TransactionService()
+
+    async def add_transaction(self, transaction: Transaction) -> Optional[Transaction]:
+        return await self._call(self.service.add_transaction, transaction)
+
+    async def add_transactions_bulk(self, transactions: List[Transaction],
+                                    chunk_size: int = 1000) -> BulkInsertResult:
+        """批量添加交易；取消时已提交的分块保留，正在写入的分块回滚"""
+        return await self._call(self.service.add_transactions_bulk, list(transactions), chunk_size)
+
+    async def get_user_transactions(self, user_id: int, limit: int = 100) -> List[Transaction]:
+        return await self._call(self.service.get_user_transactions, user_id, limit)
+
+    async def get_transactions_page(self, user_id: int, page_size: int = 100,
+                                    cursor: Optional[str] = None) -> TransactionPage:
+        return await self._call(self.service.get_transactions_page, user_id, page_size, cursor)
+
+    def iter_user_transactions(self, user_id: int, page_size: int = 500,
+                               cursor: Optional[str] = None) -> AsyncIterator[Transaction]:
+        """异步逐条产出用户的全部交易记录"""
+        return self._iter_pages(lambda page_cursor: self.service.get_transactions_page(
+            user_id, page_size, page_cursor), cursor)
+
+    async def delete_transaction(self, transaction_id: int) -> bool:
+        return await self._call(self.service.delete_transaction, transaction_id)
+
+class AsyncQueryService(_AsyncService):
+    def __init__(self, executor: Optional[AsyncExecutor] = None, timeout: Optional[float] = None):
+        super().__init__(executor, timeout)
+        self.service = QueryService()
+
+    async def query_transactions(self, user_id: int, **conditions) -> List[Transaction]:
+        return await self._call(self.service.query_transactions, user_id, **conditions)
+
+    async def query_transactions_page(self, user_id: int, page_size: int = 100,
+                                      cursor: Optional[str] = None, **conditions) -> TransactionPage:
+        return await self._call(self.service.query_transactions_page, user_id, page_size, cursor, **conditions)
+
+    def iter_transactions(self, user_id: int, page_size: int = 500,
+                          cursor: Optional[str] = None, **conditions) -> AsyncIterator[Transaction]:
+        """异步逐条产出查询结果（时间倒序），不会一次性加载全部结果"""
+        return self._iter_pages(lambda page_cursor: self.service.query_transactions_page(
+            user_id, page_size, page_cursor, **conditions), cursor)
+
+    async def count_transactions(self, user_id: int, **conditions) -> int:
+        return await self._call(self.service.count_transactions, user_id, **conditions)
+
+class AsyncStatisticsService(_AsyncService):
+    """service 默认为不带缓存的 StatisticsService，可传入 CachedStatisticsService"""
+
+    def __init__(self, executor: Optional[AsyncExecutor] = None, timeout: Optional[float] = None,
+                 service: Optional[StatisticsService] = None):
+        super().__init__(executor, timeout)
+        self.service = service or StatisticsService()
+
+    async def get_time_range_stats(self, user_id: int, start_time, end_time) -> Dict[str, Any]:
+        return await self._call(self.service.get_time_range_stats, user_id, start_time, end_time)
+
+    async def get_top_categories(self, user_id: int, limit: int = 10,
+                                 start_time=None, end_time=None) -> List[Dict[str, Any]]:
+        return await self._call(self.service.get_top_categories, user_id, limit, start_time, end_time)
+
+    async def get_time_series(self, user_id: int, start_time, end_time,
+                              granularity: str = 'month', by_category: bool = False) -> List[Dict[str, Any]]:
+        return await self._call(self.service.get_time_series, user_id, start_time, end_time,
+                                granularity, by_category)
@@ -0,0 +1,2 @@
+# 性能基准：python -m benchmarks --help
+# 命令行冷启动基准：python -m benchmarks.startup
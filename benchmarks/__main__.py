@@ -0,0 +1,129 @@
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from benchmarks.generator import GeneratorConfig
+
+# 与基准结果相比中位数变慢超过该比例时标记为回退
+REGRESSION_THRESHOLD = 1.2
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="服务层与表格加载性能基准")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子（默认 42）")
+    parser.add_argument("--users", type=int, default=3, help="用户数（默认 3）")
+    parser.add_argument("--rows", type=int, default=100_000, help="交易总数（默认 100000）")
+    parser.add_argument("--years", type=int, default=3, help="数据覆盖的年数（默认 3）")
+    parser.add_argument("--db", help="数据库路径；默认在临时目录按参数命名，参数相同时复用")
+    parser.add_argument("--regenerate", action="store_true", help="删除已有的基准数据库并重新生成")
+    parser.add_argument("--repeat", type=int, default=5, help="每个场景的计时次数（默认 5）")
+    parser.add_argument("--scenario", action="append", default=[],
+                        help="只运行名称匹配的场景（可用通配符，可重复）")
+    parser.add_argument("--no-ui", action="store_true", help="跳过 MainWindow 场景")
+    parser.add_argument("--output", help="把结果写入 JSON 文件")
+    parser.add_argument("--compare", help="与之前输出的 JSON 结果比较")
+    return parser.parse_args(argv)
+
+def git_revision() -> Optional[str]:
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """逐场景比较中位数，返回报告行"""
+    lines = []
+    old_results = baseline.get('results', {})
+    if baseline.get('config') != results['config']:
+        lines.append("注意：两次运行的数据参数不同，结果不可直接比较")
+    for name, stats in results['results'].items():
+        old = old_results.get(name)
+        if not old:
+            continue
+        ratio = stats['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+        flag = "  <-- 回退" if ratio > REGRESSION_THRESHOLD else ""
+        lines.append(f"{name:<72} {old['median_ms']:>10.2f} -> {stats['median_ms']:>10.2f} ms  x{ratio:.2f}{flag}")
+    return lines
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    config = GeneratorConfig(seed=args.seed, users=args.users, transactions=args.rows, years=args.years)
+    db_path = args.db or os.path.join(
+        tempfile.gettempdir(), f"finance_bench_{config.seed}_{config.users}_{config.transactions}_{config.years}.db")
+    if args.regenerate:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+    needs_data = not os.path.exists(db_path)
+
+    # DatabaseManager 是单例，必须在第一次使用服务之前指定数据库路径
+    os.environ['FINANCE_DB_PATH'] = db_path
+    if not args.no_ui:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from benchmarks.generator import create_users, populate
+    from benchmarks.scenarios import measure, service_scenarios, write_scenarios, UIScenarios
+
+    started = time.perf_counter()
+    users = create_users(config)
+    insert_seconds = populate(config, users) if needs_data else None
+    setup_seconds = time.perf_counter() - started
+    user = users[0]
+    print(f"数据库: {db_path}（{'新生成' if needs_data else '复用'}，准备耗时 {setup_seconds:.1f}s）")
+
+    ui = None
+    scenarios = service_scenarios(user, config)
+    if not args.no_ui:
+        ui = UIScenarios(user)
+        scenarios += ui.scenarios()
+    writes, cleanup_writes = write_scenarios(user, config)
+    scenarios += writes
+    if args.scenario:
+        scenarios = [s for s in scenarios if any(fnmatch.fnmatch(s[0], pattern) for pattern in args.scenario)]
+
+    results: Dict[str, Any] = {}
+    try:
+        for name, fn, scale in scenarios:
+            stats = measure(fn, max(1, round(args.repeat * scale)))
+            results[name] = stats
+            print(f"{name:<72} median {stats['median_ms']:>10.2f} ms  (min {stats['min_ms']:.2f}, "
+                  f"p95 {stats['p95_ms']:.2f}, n={stats['runs']})")
+    finally:
+        cleanup_writes()
+        if ui is not None:
+            ui.close()
+
+    output = {
+        'meta': {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'db_path': db_path,
+            'generated': needs_data,
+            'insert_seconds': insert_seconds,
+            'repeat': args.repeat,
+        },
+        'config': config.to_dict(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print("\n".join(compare(output, json.load(f))))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import random
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List
+
+from models import Transaction, TransactionType, Category, User
+
+# 分类 -> (权重, 金额中位数（元）, 对数标准差)，金额服从对数正态分布
+EXPENSE_PROFILES = {
+    Category.FOOD: (40, 28, 0.6),
+    Category.TRANSPORT: (20, 12, 0.8),
+    Category.SHOPPING: (15, 120, 1.0),
+    Category.ENTERTAINMENT: (8, 80, 0.9),
+    Category.PAYMENT: (10, 200, 1.1),
+    Category.RED_PACKET: (3, 50, 0.8),
+    Category.TRANSFER: (3, 500, 1.0),
+    Category.OTHER: (1, 60, 1.2),
+}
+INCOME_PROFILES = {
+    Category.SALARY: (10, 12000, 0.2),
+    Category.RED_PACKET: (30, 66, 0.9),
+    Category.TRANSFER: (50, 300, 1.1),
+    Category.OTHER: (10, 150, 1.0),
+}
+
+MERCHANTS = {
+    Category.FOOD: ["星巴克咖啡", "麦当劳", "肯德基", "美团外卖", "饿了么", "喜茶", "瑞幸咖啡", "沙县小吃", "海底捞"],
+    Category.TRANSPORT: ["滴滴出行", "南京地铁", "高铁12306", "中国石化", "哈啰单车"],
+    Category.SHOPPING: ["淘宝", "京东", "拼多多", "苏宁易购", "盒马鲜生", "永辉超市", "优衣库"],
+    Category.ENTERTAINMENT: ["万达影城", "腾讯视频", "网易云音乐", "Steam", "KTV"],
+    Category.PAYMENT: ["国家电网", "中国移动", "物业公司", "自来水公司", "燃气公司"],
+}
+PEOPLE = ["张伟", "王芳", "李娜", "刘洋", "陈静", "杨磊", "赵敏", "黄勇", "周杰", "吴倩",
+          "Alice", "Bob", "Carol", "David", "Eve"]
+BRANCHES = ["新街口店", "鼓楼店", "仙林店", "河西店", "江宁店", "浦口店", "玄武店", "秦淮店"]
+EMPLOYERS = ["南京大学", "某科技有限公司"]
+DESCRIPTIONS = {
+    Category.FOOD: ["午餐", "晚餐", "早餐", "咖啡", "奶茶", "外卖", "聚餐"],
+    Category.TRANSPORT: ["打车", "地铁", "加油", "火车票", "共享单车"],
+    Category.SHOPPING: ["日用品", "衣服", "电子产品", "书籍", "生鲜"],
+    Category.ENTERTAINMENT: ["电影", "会员续费", "游戏", "唱歌"],
+    Category.PAYMENT: ["电费", "话费", "物业费", "水费", "燃气费"],
+    Category.RED_PACKET: ["红包", "生日红包", "节日红包"],
+    Category.TRANSFER: ["转账", "还款", "AA"],
+    Category.SALARY: ["工资", "奖金"],
+    Category.OTHER: ["其他", ""],
+}
+
+# 一天中各小时的相对交易量：早中晚三个高峰，深夜很少
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 10, 14, 8, 7, 12, 18, 10, 6, 6, 7, 9, 15, 16, 12, 8, 5, 2]
+
+@dataclass
+class GeneratorConfig:
+    """合成数据参数；参数相同时生成的数据完全相同"""
+    seed: int = 42
+    users: int = 3
+    transactions: int = 100_000  # 所有用户合计
+    years: int = 3
+    end: str = "2025-01-01"  # 固定的结束日期，保证不同时间运行结果一致
+    expense_ratio: float = 0.85
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+def _counterparties(rng: random.Random) -> Dict[Category, List[str]]:
+    """每个分类的交易方列表，排在前面的更常出现"""
+    names = {}
+    for category, brands in MERCHANTS.items():
+        branches = [f"{brand}({branch})" for brand in brands for branch in BRANCHES]
+        rng.shuffle(branches)
+        names[category] = brands + branches
+    names[Category.SALARY] = list(EMPLOYERS)
+    for category in (Category.RED_PACKET, Category.TRANSFER, Category.OTHER):
+        names[category] = list(PEOPLE)
+    return names
+
+def _zipf_weights(count: int) -> List[float]:
+    return [1 / (rank + 1) for rank in range(count)]
+
+def generate_user_transactions(user: User, count: int, config: GeneratorConfig,
+                               rng: random.Random) -> Iterator[Transaction]:
+    """按时间顺序产出一个用户的 count 笔交易（流式，不在内存中保留）"""
+    counterparties = _counterparties(rng)
+    weights = {category: _zipf_weights(len(names)) for category, names in counterparties.items()}
+    expense_categories = list(EXPENSE_PROFILES)
+    expense_weights = [profile[0] for profile in EXPENSE_PROFILES.values()]
+    income_categories = list(INCOME_PROFILES)
+    income_weights = [profile[0] for profile in INCOME_PROFILES.values()]
+    hours = list(range(24))
+
+    end = datetime.fromisoformat(config.end)
+    days = config.years * 365
+    start = end - timedelta(days=days)
+    for day in range(days):
+        # 按天平均分配，保证总数恰好为 count
+        day_count = count * (day + 1) // days - count * day // days
+        moments = sorted(
+            (rng.choices(hours, HOUR_WEIGHTS)[0], rng.randrange(3600)) for _ in range(day_count)
+        )
+        for hour, second in moments:
+            if rng.random() < config.expense_ratio:
+                transaction_type = TransactionType.EXPENSE
+                category = rng.choices(expense_categories, expense_weights)[0]
+                _, median, sigma = EXPENSE_PROFILES[category]
+            else:
+                transaction_type = TransactionType.INCOME
+                category = rng.choices(income_categories, income_weights)[0]
+                _, median, sigma = INCOME_PROFILES[category]
+            names = counterparties.get(category) or PEOPLE
+            other = rng.choices(names, weights.get(category) or _zipf_weights(len(names)))[0]
+            amount = max(Decimal(round(rng.lognormvariate(0, sigma) * median * 100)).scaleb(-2), Decimal('0.01'))
+            if transaction_type == TransactionType.EXPENSE:
+                from_user, to_user = user.username, other
+            else:
+                from_user, to_user = other, user.username
+            yield Transaction(
+                id=0,
+                user_id=user.id,
+                from_user=from_user,
+                to_user=to_user,
+                amount=amount,
+                transaction_type=transaction_type,
+                category=category,
+                description=rng.choice(DESCRIPTIONS[category]),
+                transaction_time=start + timedelta(days=day, hours=hour, seconds=second)
+            )
+
+def create_users(config: GeneratorConfig, password: str = "benchmark") -> List[User]:
+    """创建（或登录已有的）基准用户，用户名由种子和序号决定"""
+    from services import UserService
+
+    user_service = UserService()
+    users = []
+    for index in range(config.users):
+        username = f"bench_{config.seed}_{index}"
+        user = user_service.register_user(username, password) or user_service.login_user(username, password)
+        users.append(user)
+    return users
+
+def populate(config: GeneratorConfig, users: List[User]) -> float:
+    """为 users 写入合成交易，返回写入耗时秒数
+
+    写入使用 bulk-load 性能配置，结束后切回原配置并做检查点。
+    """
+    from services import TransactionService
+
+    rng = random.Random(config.seed)
+    transaction_service = TransactionService()
+    db = transaction_service.db
+    previous_profile = db.profile
+    db.set_profile('bulk-load')
+    elapsed = 0.0
+    try:
+        for index, user in enumerate(users):
+            count = config.transactions * (index + 1) // config.users - config.transactions * index // config.users
+            result = transaction_service.add_transactions_bulk(
+                generate_user_transactions(user, count, config, rng), chunk_size=5000)
+            elapsed += result.elapsed
+    finally:
+        db.set_profile(previous_profile)
+        db.checkpoint('TRUNCATE')
+    return elapsed
@@ -0,0 +1,199 @@
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from itertools import combinations
+from typing import Any, Callable, Dict, List, Tuple
+
+from models import Transaction, TransactionType, Category, User
+
+from benchmarks.generator import GeneratorConfig
+
+# (名称, 无参函数, 重复次数倍数)
+Scenario = Tuple[str, Callable[[], Any], float]
+
+# query_transactions 的各个条件，基准覆盖它们的所有组合
+QUERY_CONDITIONS = {
+    'search_text': "咖啡",
+    'target_user': "星巴克",
+    'time_range': None,  # 按数据结束日期计算最近 90 天
+    'transaction_type': TransactionType.EXPENSE,
+    'category': Category.FOOD,
+}
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    """执行 warmup 次预热后计时 repeat 次，返回毫秒统计"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'runs': len(samples),
+        'min_ms': samples[0],
+        'median_ms': statistics.median(samples),
+        'mean_ms': statistics.fmean(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'max_ms': samples[-1],
+    }
+
+def query_condition_sets(end: datetime) -> List[Tuple[str, Dict[str, Any]]]:
+    """QUERY_CONDITIONS 的全部组合（含空集），名称形如 type+category"""
+    combos = []
+    names = list(QUERY_CONDITIONS)
+    for size in range(len(names) + 1):
+        for chosen in combinations(names, size):
+            conditions = {}
+            for name in chosen:
+                if name == 'time_range':
+                    conditions['start_time'] = end - timedelta(days=90)
+                    conditions['end_time'] = end
+                else:
+                    conditions[name] = QUERY_CONDITIONS[name]
+            combos.append(("+".join(chosen) or "none", conditions))
+    return combos
+
+def service_scenarios(user: User, config: GeneratorConfig) -> List[Scenario]:
+    """只读的服务层场景"""
+    from services import TransactionService, QueryService, StatisticsService
+
+    transaction_service = TransactionService()
+    query_service = QueryService()
+    stats_service = StatisticsService()
+    end = datetime.fromisoformat(config.end)
+    start = end - timedelta(days=config.years * 365)
+
+    def page_through(pages: int):
+        cursor = None
+        for _ in range(pages):
+            page = transaction_service.get_transactions_page(user.id, 200, cursor)
+            if not page.has_more:
+                break
+            cursor = page.next_cursor
+
+    scenarios: List[Scenario] = [
+        ("get_user_transactions.limit_100", partial(transaction_service.get_user_transactions, user.id), 1),
+        ("get_user_transactions.limit_1000", partial(transaction_service.get_user_transactions, user.id, 1000), 1),
+        ("get_transactions_page.10_pages", partial(page_through, 10), 1),
+    ]
+    for name, conditions in query_condition_sets(end):
+        scenarios.append((f"query_transactions.{name}",
+                          partial(query_service.query_transactions, user.id, **conditions), 0.5))
+    ranges = {
+        'partial_day': (end - timedelta(hours=30), end - timedelta(hours=20)),
+        '30_days': (end - timedelta(days=30, hours=5), end),
+        '1_year': (end - timedelta(days=365, hours=5), end),
+        'all': (start, end),
+    }
+    for name, (lower, upper) in ranges.items():
+        scenarios.append((f"get_time_range_stats.{name}",
+                          partial(stats_service.get_time_range_stats, user.id, lower, upper), 1))
+    scenarios.append(("get_top_categories.all", partial(stats_service.get_top_categories, user.id), 1))
+    scenarios.append(("get_top_categories.90_days",
+                      partial(stats_service.get_top_categories, user.id, 10, end - timedelta(days=90), end), 1))
+    for granularity in ('day', 'month'):
+        scenarios.append((f"get_time_series.{granularity}",
+                          partial(stats_service.get_time_series, user.id, start, end, granularity), 1))
+    return scenarios
+
+def write_scenarios(user: User, config: GeneratorConfig) -> Tuple[List[Scenario], Callable[[], None]]:
+    """会写库的场景，放在最后执行，避免影响只读场景的数据量
+
+    返回 (场景列表, 清理函数)。生成的数据库会在多次运行间复用，
+    清理函数删除场景写入的全部交易，调用方必须在场景结束后（包括出错时）调用它。
+    """
+    from services import TransactionService
+
+    transaction_service = TransactionService()
+    end = datetime.fromisoformat(config.end)
+    # 使用数据中已有的交易方，不往交易方字典里新增名称
+    latest = transaction_service.get_user_transactions(user.id, limit=1)
+    to_user = latest[0].to_user if latest else user.username
+    inserted: List[int] = []
+
+    def add_one():
+        saved = transaction_service.add_transaction(Transaction(
+            id=0, user_id=user.id, from_user=user.username, to_user=to_user,
+            amount=Decimal('12.34'), transaction_type=TransactionType.EXPENSE,
+            category=Category.OTHER, description="benchmark", transaction_time=end
+        ))
+        if saved is not None:
+            inserted.append(saved.id)
+
+    def cleanup():
+        if not inserted:
+            return
+        # 删除触发器同步维护汇总表与全文索引，删除后数据与运行前一致
+        with transaction_service.db.connection() as conn:
+            conn.executemany("DELETE FROM transactions WHERE id = ?", [(i,) for i in inserted])
+            conn.commit()
+        inserted.clear()
+
+    return [("add_transaction", add_one, 4)], cleanup
+
+class UIScenarios:
+    """MainWindow 表格加载场景（需要 QApplication，建议 QT_QPA_PLATFORM=offscreen）"""
+
+    def __init__(self, user: User):
+        from PyQt6.QtWidgets import QApplication
+        from ui.main_window import MainWindow
+
+        self.app = QApplication.instance() or QApplication([])
+        self.user = user
+        self.window_class = MainWindow
+        self.window = self.open_window()
+        self.fetch_page = partial(self.window._fetch_user_page, user.id)
+
+    def open_window(self):
+        """创建并显示主窗口，等到初始数据加载完、窗口可交互为止"""
+        window = self.window_class(self.user)
+        window.resize(1200, 800)
+        window.show()
+        self.wait_until(lambda: window.startup_timer.time_to_interactive is not None)
+        return window
+
+    def wait_until(self, condition, timeout: float = 30.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            self.app.processEvents()
+            time.sleep(0.001)
+        self.app.processEvents()
+
+    def startup(self):
+        """新建主窗口直到可交互（首次显示后才开始加载数据）"""
+        window = self.open_window()
+        window.close()
+        window.deleteLater()
+
+    def populate(self):
+        """设置数据源、读取第一页并绘制可见行"""
+        window = self.window
+        window.populate_table(window.transaction_model, self.fetch_page)
+        window.transaction_table.viewport().grab()
+
+    def scroll(self, pages: int = 20):
+        """加载第一页后继续向下翻 pages 页并绘制最后一屏"""
+        window = self.window
+        model = window.transaction_model
+        window.populate_table(model, self.fetch_page)
+        for _ in range(pages):
+            if not model.canFetchMore():
+                break
+            model.fetchMore()
+        window.transaction_table.scrollToBottom()
+        window.transaction_table.viewport().grab()
+
+    def scenarios(self) -> List[Scenario]:
+        return [
+            ("MainWindow.startup", self.startup, 1),
+            ("MainWindow.populate_table", self.populate, 1),
+            ("MainWindow.populate_table.scroll_20_pages", self.scroll, 0.5),
+        ]
+
+    def close(self):
+        self.window.close()
+        self.app.processEvents()
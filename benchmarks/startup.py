@@ -0,0 +1,66 @@
+"""命令行冷启动基准：python -m benchmarks.startup
+
+每次在新的解释器进程中执行命令，测量从启动到退出的墙钟时间，
+并以 `python -c pass` 与导入图形界面模块作为对照。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.scenarios import measure
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "cli.py")
+USERNAME = "bench_startup"
+
+def commands(db_path: str) -> List[Tuple[str, List[str]]]:
+    """(名称, 参数列表)；参数列表不含解释器本身"""
+    cli = [CLI, "--db", db_path, "--user", USERNAME]
+    return [
+        ("python -c pass", ["-c", "pass"]),
+        ("cli --help", [CLI, "--help"]),
+        ("cli query --limit 20", cli + ["query", "--limit", "20"]),
+        ("cli stats", cli + ["stats"]),
+        ("cli maintenance migrations", [CLI, "--db", db_path, "maintenance", "migrations"]),
+        ("import ui.main_window", ["-c", "import ui.main_window"]),
+    ]
+
+def prepare(db_path: str):
+    """在子进程中创建数据库与基准用户，当前进程不导入服务层"""
+    subprocess.run([sys.executable, "-c",
+                    f"from services import UserService; UserService().register_user({USERNAME!r}, 'benchmark')"],
+                   cwd=ROOT, env=dict(os.environ, FINANCE_DB_PATH=db_path), check=True, capture_output=True)
+
+def run(db_path: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    results = {}
+    for name, arguments in commands(db_path):
+        def once():
+            subprocess.run([sys.executable] + arguments, cwd=ROOT, env=env, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            results[name] = measure(once, repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<32} 失败（退出码 {e.returncode}）")
+            continue
+        print(f"{name:<32} median {results[name]['median_ms']:>8.1f} ms  (min {results[name]['min_ms']:.1f}, "
+              f"max {results[name]['max_ms']:.1f}, n={results[name]['runs']})")
+    return results
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description="命令行冷启动时间基准")
+    parser.add_argument("--db", help="数据库路径（默认在临时目录新建）")
+    parser.add_argument("--repeat", type=int, default=10, help="每条命令的计时次数（默认 10）")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = args.db or os.path.join(directory, "startup.db")
+        prepare(db_path)
+        run(db_path, args.repeat)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
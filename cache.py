@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class DataVersions:
+    """每个用户一个数据版本号，交易写入后递增，用于判断缓存是否过期"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[int, int] = {}
+        self._epoch = 0  # 全局版本，整体修改数据时递增
+
+    def get(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: int) -> int:
+        with self._lock:
+            version = self._versions.get(user_id, 0) + 1
+            self._versions[user_id] = version
+            return version
+
+    def bump_all(self):
+        """数据被整体修改（例如重建汇总表）后使所有用户的缓存失效"""
+        with self._lock:
+            self._epoch += 1
+
+    def snapshot(self, user_id: int) -> tuple:
+        """(全局版本, 用户版本)，缓存条目以此判断是否过期"""
+        with self._lock:
+            return self._epoch, self._versions.get(user_id, 0)
+
+def copy_result(value: Any) -> Any:
+    """复制由 dict/list 嵌套组成的查询结果
+
+    叶子值（Decimal、date、字符串、数字）不可变，直接共享，比 copy.deepcopy 快得多。
+    """
+    if isinstance(value, dict):
+        return {key: copy_result(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_result(item) for item in value]
+    return value
+
+class VersionedLRUCache:
+    """带数据版本校验的LRU缓存
+
+    条目记录写入时的用户数据版本，版本变化后视为失效；可选的 ttl 用于
+    “最近N天”这类随时间滑动的查询。超过 max_entries 时淘汰最久未使用的条目。
+    get_or_compute 返回缓存值经 copy 复制后的结果（默认为 copy_result），调用方修改结果
+    不会影响缓存；copy 为 None 时直接返回缓存的对象，调用方不得修改。
+    """
+
+    def __init__(self, versions: DataVersions, max_entries: int = 256,
+                 copy: Optional[Callable[[Any], Any]] = copy_result):
+        self.versions = versions
+        self.max_entries = max_entries
+        self.copy = copy
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0, 'expired': 0, 'evictions': 0}
+
+    def get_or_compute(self, user_id: int, key: Hashable, compute: Callable[[], Any],
+                       ttl: Optional[float] = None) -> Any:
+        """命中且未失效时返回缓存值（的副本），否则调用 compute 计算并写入缓存"""
+        full_key = (user_id, key)
+        version = self.versions.snapshot(user_id)
+        now = time.monotonic()
+        hit = False
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                cached_version, expires_at, value = entry
+                if cached_version != version:
+                    self._stats['stale'] += 1
+                    del self._entries[full_key]
+                elif expires_at is not None and now >= expires_at:
+                    self._stats['expired'] += 1
+                    del self._entries[full_key]
+                else:
+                    self._stats['hits'] += 1
+                    self._entries.move_to_end(full_key)
+                    hit = True
+            if not hit:
+                self._stats['misses'] += 1
+        if hit:
+            # 缓存的对象不会被修改，可以在锁外复制
+            return self._copy(value)
+
+        # 在锁外计算，避免慢查询阻塞其他线程的缓存读取
+        value = compute()
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            # 计算期间数据又发生了变化时不写入，避免缓存旧结果
+            if self.versions.snapshot(user_id) == version:
+                self._entries[full_key] = (version, expires_at, value)
+                self._entries.move_to_end(full_key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+        # 计算出的值已写入缓存，返回给调用方的同样是副本
+        return self._copy(value)
+
+    def _copy(self, value: Any) -> Any:
+        return value if self.copy is None else self.copy(value)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """主动清除某个用户（或全部）的缓存条目"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                for full_key in [k for k in self._entries if k[0] == user_id]:
+                    del self._entries[full_key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['entries'] = len(self._entries)
+            snapshot['max_entries'] = self.max_entries
+        lookups = snapshot['hits'] + snapshot['misses']
+        snapshot['hit_rate'] = snapshot['hits'] / lookups if lookups else 0.0
+        return snapshot
+
+# 进程内共享的数据版本与统计缓存
+data_versions = DataVersions()
+stats_cache = VersionedLRUCache(data_versions)
@@ -0,0 +1,394 @@
+"""记账本命令行入口（不依赖 PyQt6）
+
+    python cli.py --user alice import bills.csv
+    python cli.py --user alice query --search 咖啡 --limit 20
+    python cli.py --user alice stats --start 2024-01-01 --end 2024-12-31 --series month
+    python cli.py maintenance verify-plans
+
+服务层模块在子命令执行时才导入，--help 与参数错误不会打开数据库。
+"""
+import argparse
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+# verify-export 使用的样本时间：与本机不同的时区偏移（含非整点偏移）以及不带时区的本机时间
+ROUNDTRIP_TIMES = ('2024-03-01T00:30:00+08:00', '2024-02-29T11:30:00-05:00',
+                   '2024-07-01T06:15:00+05:45', '2024-12-31T23:59:59+00:00', '2024-03-01T00:30:00')
+
+class CLIError(Exception):
+    """命令行使用错误，输出信息后以状态码 2 退出"""
+
+def parse_time(text: str, end_of_day: bool = False):
+    """解析 ISO 格式时间；只给出日期且 end_of_day 为 True 时取当天最后一刻"""
+    from datetime import datetime, time as time_of_day
+    try:
+        value = datetime.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"时间格式无效: {text!r}（应为 YYYY-MM-DD 或 YYYY-MM-DDTHH:MM[:SS]）")
+    if end_of_day and len(text) <= 10:
+        value = datetime.combine(value.date(), time_of_day.max)
+    return value
+
+def _start_time(text: str):
+    return parse_time(text)
+
+def _end_time(text: str):
+    return parse_time(text, end_of_day=True)
+
+def _positive_int(text: str) -> int:
+    value = int(text)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"必须为正整数: {text}")
+    return value
+
+def _add_filter_arguments(parser: argparse.ArgumentParser):
+    """query/export 共用的筛选条件，与 QueryService.query_transactions 的条件一一对应"""
+    parser.add_argument("--search", dest="search_text", help="全文检索描述与交易方")
+    parser.add_argument("--target", dest="target_user", help="交易方名称（子串匹配）")
+    parser.add_argument("--start", type=_start_time, help="开始时间（含）")
+    parser.add_argument("--end", type=_end_time, help="结束时间（含，只给日期时包含当天）")
+    parser.add_argument("--type", dest="transaction_type", choices=("income", "expense"), help="交易类型")
+    parser.add_argument("--category", help="分类（如 food、transport）")
+
+def _conditions(args: argparse.Namespace) -> Dict[str, Any]:
+    from models import TransactionType, Category
+
+    conditions: Dict[str, Any] = {}
+    if args.search_text:
+        conditions['search_text'] = args.search_text
+    if args.target_user:
+        conditions['target_user'] = args.target_user
+    if args.start:
+        conditions['start_time'] = args.start
+    if args.end:
+        conditions['end_time'] = args.end
+    if args.transaction_type:
+        conditions['transaction_type'] = TransactionType(args.transaction_type)
+    if args.category:
+        try:
+            conditions['category'] = Category(args.category.lower())
+        except ValueError:
+            raise CLIError(f"未知的分类: {args.category}（可选: {', '.join(c.value for c in Category)}）")
+    return conditions
+
+def _require_user(args: argparse.Namespace):
+    from services import UserService
+
+    if not args.user:
+        raise CLIError("该命令需要 --user 指定用户名（或设置环境变量 FINANCE_USER）")
+    user = UserService().get_user_by_username(args.user)
+    if user is None:
+        raise CLIError(f"用户不存在: {args.user}")
+    return user
+
+def _transaction_record(transaction) -> Dict[str, Any]:
+    """交易 -> 导出记录，字段与导入格式一致，导出的文件可以直接再导入
+
+    时间带时区偏移输出，再导入后得到同一时刻与偏移。
+    """
+    transaction_time = transaction.transaction_time
+    if transaction_time.tzinfo is None:
+        transaction_time = transaction_time.astimezone()  # 与 to_epoch 一致，按本机时区解释
+    return {
+        'from_user': transaction.from_user,
+        'to_user': transaction.to_user,
+        'amount': str(transaction.amount),
+        'transaction_type': transaction.transaction_type.value,
+        'category': transaction.category.value,
+        'description': transaction.description,
+        'transaction_time': transaction_time.isoformat(),
+    }
+
+def _json_default(value):
+    from datetime import date
+    from decimal import Decimal
+
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+def _print_json(data):
+    import json
+    print(json.dumps(data, ensure_ascii=False, indent=2, default=_json_default))
+
+def cmd_import(args: argparse.Namespace) -> int:
+    from importer import TransactionImporter
+
+    user = _require_user(args)
+    importer = TransactionImporter(chunk_size=args.chunk_size)
+    try:
+        report = importer.import_file(args.path, user.id, args.format, use_bulk_profile=args.bulk)
+    except (OSError, ValueError) as e:
+        raise CLIError(str(e))
+    print(report.summary())
+    for chunk_index, line_no, message in report.errors[:args.max_errors]:
+        location = f"第 {line_no} 行" if line_no is not None else f"分块 {chunk_index}"
+        print(f"  {location}: {message}", file=sys.stderr)
+    if len(report.errors) > args.max_errors:
+        print(f"  ……另有 {len(report.errors) - args.max_errors} 条错误", file=sys.stderr)
+    return 1 if report.rejected else 0
+
+def cmd_export(args: argparse.Namespace) -> int:
+    import csv
+    import json
+    from importer import IMPORT_FIELDS
+    from services import QueryService
+
+    user = _require_user(args)
+    fmt = args.format
+    if fmt is None:
+        fmt = 'jsonl' if args.output and args.output.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+    transactions = QueryService().iter_transactions(user.id, **_conditions(args))
+
+    output = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    count = 0
+    try:
+        if fmt == 'csv':
+            writer = csv.DictWriter(output, fieldnames=IMPORT_FIELDS)
+            writer.writeheader()
+            for transaction in transactions:
+                writer.writerow(_transaction_record(transaction))
+                count += 1
+        else:
+            for transaction in transactions:
+                output.write(json.dumps(_transaction_record(transaction), ensure_ascii=False) + "\n")
+                count += 1
+    finally:
+        if args.output:
+            output.close()
+    if args.output:
+        print(f"已导出 {count} 笔交易到 {args.output}")
+    return 0
+
+def cmd_query(args: argparse.Namespace) -> int:
+    import json
+    from itertools import islice
+    from services import QueryService
+
+    user = _require_user(args)
+    conditions = _conditions(args)
+    query_service = QueryService()
+    if args.count:
+        print(query_service.count_transactions(user.id, **conditions))
+        return 0
+    # 分页读取，只取需要的条数
+    transactions = islice(query_service.iter_transactions(user.id, page_size=min(args.limit, 500), **conditions),
+                          args.limit)
+    for transaction in transactions:
+        if args.json:
+            record = _transaction_record(transaction)
+            record['id'] = transaction.id
+            print(json.dumps(record, ensure_ascii=False))
+        else:
+            sign = '+' if transaction.transaction_type.value == 'income' else '-'
+            print(f"{transaction.id:>8}  {transaction.transaction_time:%Y-%m-%d %H:%M}  "
+                  f"{sign}{transaction.amount:>12}  {transaction.category.value:<13} "
+                  f"{transaction.from_user} -> {transaction.to_user}  {transaction.description}")
+    return 0
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    from datetime import datetime, timedelta
+    from services import StatisticsService
+
+    user = _require_user(args)
+    end = args.end or datetime.now()
+    start = args.start or end - timedelta(days=30)
+    stats_service = StatisticsService()
+    result: Dict[str, Any] = {
+        'start': start,
+        'end': end,
+        'summary': stats_service.get_time_range_stats(user.id, start, end),
+        'top_categories': stats_service.get_top_categories(user.id, args.top, start, end),
+    }
+    if args.series:
+        result['series'] = stats_service.get_time_series(user.id, start, end, args.series)
+    if args.json:
+        _print_json(result)
+        return 0
+
+    summary = result['summary']
+    print(f"{start:%Y-%m-%d %H:%M} ~ {end:%Y-%m-%d %H:%M}")
+    print(f"收入 {summary['total_income']}  支出 {summary['total_expense']}  "
+          f"净额 {summary['net_amount']}  共 {summary['transaction_count']} 笔")
+    if result['top_categories']:
+        print("支出分类：")
+        for item in result['top_categories']:
+            print(f"  {item['category']:<13} {item['amount']:>12}  {item['count']} 笔")
+    for point in result.get('series', []):
+        print(f"  {point['period']}  收入 {point['income']:>12}  支出 {point['expense']:>12}  "
+              f"净额 {point['net']:>12}  {point['count']} 笔")
+    return 0
+
+def cmd_checkpoint(args: argparse.Namespace) -> int:
+    from database import DatabaseManager
+
+    try:
+        result = DatabaseManager().checkpoint(args.mode)
+    except ValueError as e:
+        raise CLIError(str(e))
+    print(f"检查点 {args.mode.upper()}：WAL {result['log_frames']} 帧，已写回 {result['checkpointed_frames']} 帧"
+          + ("（有读写冲突，未完成）" if result['busy'] else ""))
+    return 0
+
+def cmd_rebuild_summaries(args: argparse.Namespace) -> int:
+    from services import StatisticsService
+
+    StatisticsService().rebuild_summaries()
+    print("汇总表已重建")
+    return 0
+
+def cmd_rebuild_fts(args: argparse.Namespace) -> int:
+    from database import DatabaseManager
+
+    db = DatabaseManager()
+    if not db.fts_enabled:
+        raise CLIError("当前 SQLite 不支持 FTS5，没有全文索引")
+    db.rebuild_fts_index()
+    print("全文索引已重建")
+    return 0
+
+def cmd_verify_plans(args: argparse.Namespace) -> int:
+    from query_plans import verify_query_plans, format_report
+
+    checks = verify_query_plans(args.user_id)
+    print(format_report(checks))
+    return 0 if all(check.ok for check in checks) else 1
+
+def cmd_verify_export(args: argparse.Namespace) -> int:
+    from importer import parse_transaction
+    from models import to_epoch, from_epoch
+
+    failed = 0
+    for text in ROUNDTRIP_TIMES:
+        record = {'from_user': 'a', 'to_user': 'b', 'amount': '1.00', 'transaction_type': 'expense',
+                  'category': 'other', 'transaction_time': text}
+        # 导入 -> 按库中的 (时间戳, 偏移) 存取 -> 导出 -> 再导入，时刻与偏移都应不变
+        transaction = parse_transaction(record, 0)
+        stored = to_epoch(transaction.transaction_time)
+        transaction.transaction_time = from_epoch(*stored)
+        exported = _transaction_record(transaction)['transaction_time']
+        reimported = to_epoch(parse_transaction(dict(record, transaction_time=exported), 0).transaction_time)
+        ok = reimported == stored
+        failed += not ok
+        print(f"[{'OK' if ok else '!!'}] {text} -> {exported}"
+              + ("" if ok else f"  时间戳/偏移 {stored} -> {reimported}"))
+    print(f"共 {len(ROUNDTRIP_TIMES)} 个时间，{failed} 个往返后不一致")
+    return 0 if failed == 0 else 1
+
+def cmd_migrations(args: argparse.Namespace) -> int:
+    from database import DatabaseManager, SCHEMA_VERSION
+
+    db = DatabaseManager()  # 打开数据库时会自动执行未完成的迁移
+    with db.connection() as conn:
+        version = db.schema_version(conn)
+    print(f"数据库: {db.db_path}  结构版本 {version}（程序支持 {SCHEMA_VERSION}）")
+    for entry in db.migration_history():
+        print(f"  {entry['version']:>3}  {entry['name']:<20} {entry['applied_at']}  {entry['duration']:.3f}s")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python cli.py", description="记账本命令行工具")
+    parser.add_argument("--db", help="数据库路径（默认取环境变量 FINANCE_DB_PATH，否则为 finance_manager.db）")
+    parser.add_argument("--user", default=os.environ.get('FINANCE_USER'), help="用户名（默认取环境变量 FINANCE_USER）")
+    parser.add_argument("--profile", help="数据库性能配置（默认取环境变量 FINANCE_DB_PROFILE）")
+    parser.add_argument("--trace", action="store_true", help="结束时在标准错误输出各语句的耗时统计")
+    commands = parser.add_subparsers(dest="command", metavar="<command>", required=True)
+
+    command = commands.add_parser("import", help="导入 CSV/JSONL 交易记录")
+    command.add_argument("path")
+    command.add_argument("--format", choices=EXPORT_FORMATS, help="文件格式（默认按扩展名判断）")
+    command.add_argument("--chunk-size", type=_positive_int, default=1000, help="每个分块的行数（默认 1000）")
+    command.add_argument("--bulk", action="store_true", help="导入期间使用 bulk-load 性能配置")
+    command.add_argument("--max-errors", type=int, default=20, help="最多显示的错误条数（默认 20）")
+    command.set_defaults(handler=cmd_import)
+
+    command = commands.add_parser("export", help="导出交易记录（格式与导入一致）")
+    _add_filter_arguments(command)
+    command.add_argument("--format", choices=EXPORT_FORMATS, help="导出格式（默认按输出文件扩展名，否则为 csv）")
+    command.add_argument("-o", "--output", help="输出文件（默认标准输出）")
+    command.set_defaults(handler=cmd_export)
+
+    command = commands.add_parser("query", help="按条件查询交易（时间倒序）")
+    _add_filter_arguments(command)
+    command.add_argument("--limit", type=_positive_int, default=50, help="最多显示的条数（默认 50）")
+    command.add_argument("--count", action="store_true", help="只输出满足条件的笔数")
+    command.add_argument("--json", action="store_true", help="每行输出一条 JSON")
+    command.set_defaults(handler=cmd_query)
+
+    command = commands.add_parser("stats", help="收支统计")
+    command.add_argument("--start", type=_start_time, help="开始时间（默认结束时间前 30 天）")
+    command.add_argument("--end", type=_end_time, help="结束时间（默认当前时间）")
+    command.add_argument("--top", type=_positive_int, default=5, help="支出分类排行条数（默认 5）")
+    command.add_argument("--series", choices=("day", "week", "month", "year"), help="同时输出按该粒度的时间序列")
+    command.add_argument("--json", action="store_true", help="以 JSON 输出")
+    command.set_defaults(handler=cmd_stats)
+
+    maintenance = commands.add_parser("maintenance", help="数据库维护")
+    tasks = maintenance.add_subparsers(dest="task", metavar="<task>", required=True)
+    task = tasks.add_parser("checkpoint", help="执行 WAL 检查点")
+    task.add_argument("--mode", default="TRUNCATE", help="PASSIVE/FULL/RESTART/TRUNCATE（默认 TRUNCATE）")
+    task.set_defaults(handler=cmd_checkpoint)
+    task = tasks.add_parser("rebuild-summaries", help="根据交易表重建日/月汇总表")
+    task.set_defaults(handler=cmd_rebuild_summaries)
+    task = tasks.add_parser("rebuild-fts", help="根据交易表重建全文索引")
+    task.set_defaults(handler=cmd_rebuild_fts)
+    task = tasks.add_parser("verify-plans", help="检查主要查询的执行计划是否走索引")
+    task.add_argument("--user-id", type=int, default=1, help="代入查询的用户ID（默认 1）")
+    task.set_defaults(handler=cmd_verify_plans)
+    task = tasks.add_parser("verify-export", help="检查导出的时间再导入后时刻与时区偏移不变（不访问数据库）")
+    task.set_defaults(handler=cmd_verify_export)
+    task = tasks.add_parser("migrations", help="执行未完成的迁移并显示结构版本与迁移记录")
+    task.set_defaults(handler=cmd_migrations)
+    return parser
+
+def _check_profile():
+    """在打开数据库之前校验性能配置名，未知的配置作为使用错误报告"""
+    if not os.environ.get('FINANCE_DB_PROFILE'):
+        return  # 未指定时使用默认配置，不必为校验导入数据库模块
+    from database import resolve_profile
+
+    try:
+        resolve_profile()
+    except ValueError as e:
+        raise CLIError(str(e))
+
+def _print_trace_summary():
+    from database import DatabaseManager
+
+    # 命令没有打开过数据库（例如参数校验失败）时没有可输出的统计，也不要在这里创建实例
+    tracer = getattr(DatabaseManager._instance, 'tracer', None)
+    if tracer is None:
+        return
+    for item in tracer.summary():
+        print(f"{item['total_ms']:>9.2f} ms  x{item['count']:<4} {item['sql'][:100]}", file=sys.stderr)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    # DatabaseManager 是单例，必须在第一次导入使用服务之前设置好环境变量
+    if args.db:
+        os.environ['FINANCE_DB_PATH'] = args.db
+    if args.profile:
+        os.environ['FINANCE_DB_PROFILE'] = args.profile
+    if args.trace:
+        os.environ['FINANCE_SQL_TRACE'] = '1'
+    handler: Callable[[argparse.Namespace], int] = args.handler
+    try:
+        _check_profile()
+        return handler(args)
+    except CLIError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # 输出被管道提前关闭（例如 | head），不视为错误；把标准输出指向空设备，避免退出时再次报错
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        if args.trace:
+            _print_trace_summary()
+
+if __name__ == "__main__":
+    sys.exit(main())
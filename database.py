@@ -1,8 +1,266 @@
 import sqlite3
 import hashlib
 import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
+
+from sql_trace import SQLTracer, TracingConnection
+
+# 性能配置：每个新连接都会执行对应的 PRAGMA
+# cache_size 为负数时单位是 KiB；wal_autocheckpoint 单位是页
+PERFORMANCE_PROFILES: Dict[str, Dict[str, Any]] = {
+    # 最大持久性：每次提交都落盘
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -8000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000,
+        'wal_autocheckpoint': 1000,
+    },
+    # 默认：WAL + NORMAL，断电最多丢失最后几次提交，但不会损坏数据库
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -32000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+        'wal_autocheckpoint': 1000,
+    },
+    # 批量导入：关闭同步、放大缓存，导入结束后应切回其他配置并做检查点
+    'bulk-load': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -256000,
+        'mmap_size': 1024 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000,
+        'wal_autocheckpoint': 10000,
+    },
+}
+
+DEFAULT_PROFILE = 'balanced'
+
+def resolve_profile(name: Optional[str] = None) -> str:
+    """解析性能配置名：参数 > 环境变量 FINANCE_DB_PROFILE > 默认值"""
+    name = name or os.environ.get('FINANCE_DB_PROFILE') or DEFAULT_PROFILE
+    if name not in PERFORMANCE_PROFILES:
+        raise ValueError(f"未知的数据库性能配置: {name}（可选: {', '.join(PERFORMANCE_PROFILES)}）")
+    return name
+
+def apply_profile(conn: sqlite3.Connection, profile: str):
+    """在连接上执行性能配置对应的 PRAGMA"""
+    settings = PERFORMANCE_PROFILES[profile]
+    # busy_timeout 放在最前，后续切换 journal_mode 时也能等待锁
+    conn.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout'])}")
+    conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}").fetchone()
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}").fetchone()
+    conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+    conn.execute(f"PRAGMA wal_autocheckpoint = {int(settings['wal_autocheckpoint'])}").fetchone()
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """连接池在等待超时后仍无可用连接"""
+
+class SchemaVersionError(sqlite3.DatabaseError):
+    """数据库结构版本比当前程序支持的更新"""
+
+# 数据库结构迁移：(版本号, 名称, DatabaseManager 上的迁移方法)
+# 版本号记录在 PRAGMA user_version 中；只能在末尾追加，已发布的迁移不再修改
+MIGRATIONS = [
+    (1, 'base_schema', '_migrate_base_schema'),
+    (2, 'amount_cents', '_migrate_amount_cents'),
+    (3, 'transaction_epoch', '_migrate_transaction_epoch'),
+    (4, 'summary_tables', '_migrate_summary_tables'),
+    (5, 'fts_index', '_migrate_fts_index'),
+    (6, 'counterparties', '_migrate_counterparties'),
+    (7, 'composite_indexes', '_migrate_composite_indexes'),
+    (8, 'summary_local_days', '_migrate_summary_local_days'),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# 大表回填时每批更新的行数，每批单独提交
+BACKFILL_BATCH_SIZE = 5000
+
+class ConnectionPool:
+    """线程感知的有界SQLite连接池
+
+    同一线程内的嵌套借用复用同一连接；空闲连接超过 health_check_interval
+    秒未使用时，借出前先执行 SELECT 1 做健康检查，失败则丢弃重建。
+    """
+
+    def __init__(self, factory: Callable[[], sqlite3.Connection], max_size: int = 5,
+                 timeout: float = 10.0, health_check_interval: float = 30.0):
+        self._factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = []  # (连接, 最后使用时间, 代数)，后进先出以提高缓存命中
+        self._size = 0  # 已创建且未丢弃的连接数
+        self._generation = 0  # reset() 后旧代连接归还时直接丢弃
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,  # 借出次数（不含同线程嵌套借用）
+            'nested_checkouts': 0,  # 同线程嵌套借用次数
+            'reuses': 0,  # 复用空闲连接次数
+            'created': 0,  # 新建连接次数
+            'waits': 0,  # 因连接耗尽而等待的次数
+            'wait_time': 0.0,  # 累计等待秒数
+            'health_check_failures': 0,  # 健康检查失败次数
+            'discarded': 0,  # 丢弃的连接数
+        }
+
+    @contextmanager
+    def connection(self):
+        """借出一个连接，退出时归还；发生异常时回滚未提交的事务"""
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is not None:
+            # 同一线程的嵌套借用，直接复用外层连接
+            with self._cond:
+                self._stats['nested_checkouts'] += 1
+            local.depth += 1
+            try:
+                yield conn
+            finally:
+                local.depth -= 1
+            return
+
+        conn, generation = self._acquire()
+        local.conn = conn
+        local.depth = 1
+        broken = False
+        try:
+            yield conn
+        except BaseException:
+            broken = not self._rollback(conn)
+            raise
+        finally:
+            local.conn = None
+            local.depth = 0
+            self._release(conn, generation, broken)
+
+    def _acquire(self):
+        deadline = None
+        with self._cond:
+            if self._closed:
+                raise sqlite3.ProgrammingError("连接池已关闭")
+            self._stats['checkouts'] += 1
+            while True:
+                generation = self._generation
+                if self._idle:
+                    conn, last_used, generation = self._idle.pop()
+                    self._stats['reuses'] += 1
+                    break
+                if self._size < self.max_size:
+                    # 先占位，在锁外创建连接
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                if deadline is None:
+                    self._stats['waits'] += 1
+                    deadline = time.monotonic() + self.timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(f"等待数据库连接超时（{self.timeout}s）")
+                started = time.monotonic()
+                self._cond.wait(remaining)
+                self._stats['wait_time'] += time.monotonic() - started
+
+        if conn is None:
+            return self._create(), generation
+        if time.monotonic() - last_used > self.health_check_interval and not self._is_healthy(conn):
+            with self._cond:
+                self._stats['health_check_failures'] += 1
+                self._stats['discarded'] += 1
+            self._close_quietly(conn)
+            return self._create(), generation
+        return conn, generation
+
+    def _create(self) -> sqlite3.Connection:
+        try:
+            conn = self._factory()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['created'] += 1
+        return conn
+
+    def _release(self, conn: sqlite3.Connection, generation: int, broken: bool = False):
+        if not broken and conn.in_transaction:
+            # 调用方未提交的事务一律回滚，避免污染下一个借用者
+            broken = not self._rollback(conn)
+        with self._cond:
+            if broken or self._closed or generation != self._generation:
+                self._size -= 1
+                self._stats['discarded'] += 1
+                self._cond.notify()
+            else:
+                self._idle.append((conn, time.monotonic(), generation))
+                self._cond.notify()
+                return
+        self._close_quietly(conn)
+
+    @staticmethod
+    def _rollback(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.rollback()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def reset(self):
+        """丢弃现有连接，之后借出的连接都重新创建（例如切换性能配置后）"""
+        with self._cond:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._stats['discarded'] += len(idle)
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._close_quietly(conn)
+
+    def close_all(self):
+        """关闭所有空闲连接，借出中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+        self.reset()
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池计数器快照"""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot['size'] = self._size
+            snapshot['idle'] = len(self._idle)
+            snapshot['in_use'] = self._size - len(self._idle)
+            snapshot['max_size'] = self.max_size
+        return snapshot
 
 class DatabaseManager:
     _instance = None
@@ -14,13 +272,92 @@ class DatabaseManager:
     
     def __init__(self):
         if not hasattr(self, 'initialized'):
-            self.db_path = "finance_manager.db"
+            self.db_path = os.environ.get('FINANCE_DB_PATH', "finance_manager.db")
+            self.profile = resolve_profile()
+            self.tracer = SQLTracer.from_env()  # FINANCE_SQL_TRACE=1 时开启语句跟踪
+            self.pool = ConnectionPool(self._create_connection)
+            self.counterparty_ids: Dict[str, int] = {}  # 交易方名称 -> ID，ID 分配后不再变化
+            self.counterparty_lock = threading.Lock()
             self.initialized = True
             self.init_database()
     
     def init_database(self):
-        """初始化数据库表"""
-        conn = self.get_connection()
+        """初始化数据库：结构已是最新版本时只读取一次 user_version，否则按顺序执行迁移"""
+        with self.connection() as conn:
+            version = self.schema_version(conn)
+            if version > SCHEMA_VERSION:
+                raise SchemaVersionError(
+                    f"数据库结构版本 {version} 高于程序支持的版本 {SCHEMA_VERSION}，请升级程序")
+            if version < SCHEMA_VERSION:
+                self.migrate(conn, version)
+            self._detect_features(conn)
+            self._check_summary_timezone(conn)
+    
+    @staticmethod
+    def schema_version(conn: sqlite3.Connection) -> int:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def migrate(self, conn: sqlite3.Connection, from_version: int = 0):
+        """依次执行版本号大于 from_version 的迁移
+
+        每个迁移完成后在同一事务中写入 schema_migrations 并更新 user_version；
+        迁移中途中断时下次启动会从该迁移重新执行，因此迁移必须可重复执行。
+        """
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at DATETIME NOT NULL,
+                duration REAL NOT NULL
+            )
+        ''')
+        for version, name, method in MIGRATIONS:
+            if version <= from_version:
+                continue
+            started = time.perf_counter()
+            getattr(self, method)(conn)
+            duration = time.perf_counter() - started
+            conn.execute(
+                "INSERT OR REPLACE INTO schema_migrations (version, name, applied_at, duration) VALUES (?, ?, ?, ?)",
+                (version, name, datetime.now().isoformat(timespec='seconds'), duration)
+            )
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+    
+    def migration_history(self) -> List[Dict[str, Any]]:
+        """已执行的迁移及耗时"""
+        with self.connection() as conn:
+            if not self._table_exists(conn.cursor(), 'schema_migrations'):
+                return []
+            rows = conn.execute(
+                "SELECT version, name, applied_at, duration FROM schema_migrations ORDER BY version").fetchall()
+        return [{'version': v, 'name': n, 'applied_at': a, 'duration': d} for v, n, a, d in rows]
+    
+    def _detect_features(self, conn: sqlite3.Connection):
+        # FTS5/三元组分词不可用时迁移会跳过对应的虚拟表，查询退化为 LIKE
+        names = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE name IN ('transactions_fts', 'counterparties_trigram')")}
+        self.fts_enabled = 'transactions_fts' in names
+        self.trigram_enabled = 'counterparties_trigram' in names
+    
+    def _backfill_in_batches(self, conn: sqlite3.Connection, assignments: str, pending: str,
+                             batch_size: Optional[int] = None):
+        """按 id 区间分批更新交易表中满足 pending 条件的行，每批提交一次
+
+        已处理的行不再满足 pending 条件，中断后重新执行会跳过它们继续回填。
+        """
+        batch_size = batch_size or BACKFILL_BATCH_SIZE
+        max_id = conn.execute("SELECT MAX(id) FROM transactions").fetchone()[0] or 0
+        for low in range(0, max_id, batch_size):
+            conn.execute(
+                f"UPDATE transactions SET {assignments} WHERE id > ? AND id <= ? AND ({pending})",
+                (low, low + batch_size)
+            )
+            conn.commit()
+    
+    # ========== 迁移 ==========
+    
+    def _migrate_base_schema(self, conn: sqlite3.Connection):
         cursor = conn.cursor()#创建游标对象；游标用于执行SQL语句和获取结果
         
         # 用户表
@@ -34,7 +371,7 @@ class DatabaseManager:
             )
         ''')
         
-        # 交易表
+        # 交易表（后续列由之后的迁移添加）
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS transactions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -54,14 +391,385 @@ class DatabaseManager:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions(user_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_time ON transactions(transaction_time)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(transaction_type)')
+    
+    def _migrate_amount_cents(self, conn: sqlite3.Connection):
+        # 金额以整数分存储（amount_cents），amount 列仅为兼容旧读取方保留
+        cursor = conn.cursor()
+        if not self._column_exists(cursor, 'transactions', 'amount_cents'):
+            cursor.execute("ALTER TABLE transactions ADD COLUMN amount_cents INTEGER")
+        # 其他途径只写了 amount 的行，插入后补齐 amount_cents
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_transactions_amount_cents AFTER INSERT ON transactions
+            WHEN NEW.amount_cents IS NULL
+            BEGIN
+                UPDATE transactions SET amount_cents = {self.amount_cents_sql('NEW')} WHERE id = NEW.id;
+            END
+        ''')
+        self._backfill_in_batches(conn, f"amount_cents = {self.amount_cents_sql()}", "amount_cents IS NULL")
+    
+    def _migrate_transaction_epoch(self, conn: sqlite3.Connection):
+        # 交易时间以 UTC 秒级时间戳 + 时区偏移存储，transaction_time 文本仅为兼容保留
+        cursor = conn.cursor()
+        if not self._column_exists(cursor, 'transactions', 'transaction_epoch'):
+            cursor.execute("ALTER TABLE transactions ADD COLUMN transaction_epoch INTEGER")
+        if not self._column_exists(cursor, 'transactions', 'tz_offset'):
+            cursor.execute("ALTER TABLE transactions ADD COLUMN tz_offset INTEGER")
+        # 旧数据的时间文本是本机本地时间，'utc' 修饰符按本机时区换算
+        fill = '''
+            transaction_epoch = CAST(strftime('%s', {row}.transaction_time, 'utc') AS INTEGER),
+            tz_offset = CAST(strftime('%s', {row}.transaction_time) AS INTEGER)
+                      - CAST(strftime('%s', {row}.transaction_time, 'utc') AS INTEGER)
+        '''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_transactions_epoch AFTER INSERT ON transactions
+            WHEN NEW.transaction_epoch IS NULL
+            BEGIN
+                UPDATE transactions SET {fill.format(row='NEW')} WHERE id = NEW.id;
+            END
+        ''')
+        self._backfill_in_batches(conn, fill.format(row='transactions'), "transaction_epoch IS NULL")
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_user_epoch ON transactions(user_id, transaction_epoch)')
+    
+    def _migrate_summary_tables(self, conn: sqlite3.Connection):
+        # 汇总表：由触发器在增删改交易时同步维护；旧格式的汇总表与触发器一律删除后重建
+        cursor = conn.cursor()
+        for table in self.SUMMARY_TABLES:
+            for action in ('insert', 'delete', 'update'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{action}")
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        self._create_summary_tables(cursor)
+        self.rebuild_summaries(conn)
+    
+    def _migrate_summary_local_days(self, conn: sqlite3.Connection):
+        # 汇总表的日期改为按本机时区划分（与 to_epoch 及查询的时间范围一致），
+        # 原先按交易发生地本地日期划分，时区偏移与本机不同的交易会在首尾被重复或遗漏
+        conn.execute("CREATE TABLE IF NOT EXISTS summary_timezone (name TEXT NOT NULL)")
+        self._migrate_summary_tables(conn)
+    
+    def _migrate_fts_index(self, conn: sqlite3.Connection):
+        # 全文索引：SQLite 未编译 FTS5 时跳过，文本搜索退化为 LIKE 查询
+        if self._create_fts_index(conn.cursor()):
+            conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+    
+    def _migrate_counterparties(self, conn: sqlite3.Connection):
+        # 交易方字典：交易表通过整数ID引用，交易方名称的子串查询走三元组索引
+        self._create_counterparty_tables(conn.cursor())
+        self.backfill_counterparties(conn)
+    
+    def _migrate_composite_indexes(self, conn: sqlite3.Connection):
+        # 查询都以 user_id 加时间范围为条件并按时间倒序排序：
+        # (user_id, transaction_epoch) 负责分页与排序（隐含的 rowid 即排序的第二键）；
+        # 覆盖索引让时间段汇总不必回表；按类型+分类筛选时走第三个索引
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_transactions_user_epoch_cover
+            ON transactions(user_id, transaction_epoch, tz_offset, transaction_type, category, amount_cents)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_transactions_user_type_category
+            ON transactions(user_id, transaction_type, category, transaction_epoch)
+        ''')
+        # 被上面的组合索引取代：user_id 是它们的前缀，时间文本与类型不再单独作为查询条件
+        cursor.execute('DROP INDEX IF EXISTS idx_transactions_user_id')
+        cursor.execute('DROP INDEX IF EXISTS idx_transactions_time')
+        cursor.execute('DROP INDEX IF EXISTS idx_transactions_type')
+    
+    # 交易金额（分）；兼容只写了 amount 列的旧数据
+    @staticmethod
+    def amount_cents_sql(row: str = 'transactions') -> str:
+        return f"COALESCE({row}.amount_cents, CAST(ROUND({row}.amount * 100) AS INTEGER))"
+    
+    # 汇总表名 -> (时间桶列, 时间桶格式)，时间桶按本机时区的日期划分
+    SUMMARY_TABLES = {
+        'daily_summaries': ('day', '%Y-%m-%d'),
+        'monthly_summaries': ('month', '%Y-%m'),
+    }
+    
+    # 交易时间戳在本机时区的日期/月份，与统计查询用 to_epoch 换算的时间范围处在同一时间框架，
+    # 整日部分与首尾按时间戳筛选的部分恰好互补；兼容只写了 transaction_time 文本（本机本地时间）的旧数据
+    @staticmethod
+    def bucket_sql(fmt: str, row: str = 'transactions') -> str:
+        return (f"COALESCE(strftime('{fmt}', {row}.transaction_epoch, 'unixepoch', 'localtime'), "
+                f"strftime('{fmt}', {row}.transaction_time))")
+    
+    @staticmethod
+    def timezone_name() -> str:
+        """本机时区的标识，时区变化后汇总表的日期划分需要重建"""
+        return f"{'/'.join(time.tzname)};{time.timezone};{time.altzone}"
+    
+    def _check_summary_timezone(self, conn: sqlite3.Connection):
+        """本机时区与汇总表建立时不同则重建汇总表"""
+        name = self.timezone_name()
+        row = conn.execute("SELECT name FROM summary_timezone").fetchone()
+        if row is not None and row[0] == name:
+            return
+        if row is not None:
+            self.rebuild_summaries(conn)
+        conn.execute("DELETE FROM summary_timezone")
+        conn.execute("INSERT INTO summary_timezone (name) VALUES (?)", (name,))
+        conn.commit()
+    
+    @staticmethod
+    def _table_exists(cursor: sqlite3.Cursor, name: str) -> bool:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+        return cursor.fetchone() is not None
+    
+    def _create_summary_tables(self, cursor: sqlite3.Cursor):
+        new_cents = self.amount_cents_sql('NEW')
+        old_cents = self.amount_cents_sql('OLD')
+        for table, (bucket, fmt) in self.SUMMARY_TABLES.items():
+            new_bucket = self.bucket_sql(fmt, 'NEW')
+            old_bucket = self.bucket_sql(fmt, 'OLD')
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    user_id INTEGER NOT NULL,
+                    {bucket} TEXT NOT NULL,
+                    transaction_type VARCHAR(20) NOT NULL,
+                    category VARCHAR(50) NOT NULL,
+                    total_cents INTEGER NOT NULL DEFAULT 0,
+                    transaction_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, {bucket}, transaction_type, category)
+                ) WITHOUT ROWID
+            ''')
+            
+            add_new = f'''
+                INSERT INTO {table} (user_id, {bucket}, transaction_type, category, total_cents, transaction_count)
+                VALUES (NEW.user_id, {new_bucket}, NEW.transaction_type, NEW.category, {new_cents}, 1)
+                ON CONFLICT (user_id, {bucket}, transaction_type, category) DO UPDATE SET
+                    total_cents = total_cents + excluded.total_cents,
+                    transaction_count = transaction_count + 1;
+            '''
+            remove_old = f'''
+                UPDATE {table} SET
+                    total_cents = total_cents - {old_cents},
+                    transaction_count = transaction_count - 1
+                WHERE user_id = OLD.user_id AND {bucket} = {old_bucket}
+                  AND transaction_type = OLD.transaction_type AND category = OLD.category;
+                DELETE FROM {table}
+                WHERE user_id = OLD.user_id AND {bucket} = {old_bucket}
+                  AND transaction_type = OLD.transaction_type AND category = OLD.category
+                  AND transaction_count <= 0;
+            '''
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_insert AFTER INSERT ON transactions
+                BEGIN {add_new} END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_delete AFTER DELETE ON transactions
+                BEGIN {remove_old} END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_update
+                AFTER UPDATE OF user_id, amount_cents, transaction_type, category, transaction_time,
+                                 transaction_epoch, tz_offset ON transactions
+                BEGIN {remove_old} {add_new} END
+            ''')
+    
+    def _create_fts_index(self, cursor: sqlite3.Cursor) -> bool:
+        # 外部内容表：索引只保存分词结果，原文仍从 transactions 读取
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+                    description, from_user, to_user,
+                    content='transactions', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"FTS5不可用，文本搜索将使用LIKE: {e}")
+            return False
+        
+        add_new = '''
+            INSERT INTO transactions_fts (rowid, description, from_user, to_user)
+            VALUES (NEW.id, NEW.description, NEW.from_user, NEW.to_user);
+        '''
+        remove_old = '''
+            INSERT INTO transactions_fts (transactions_fts, rowid, description, from_user, to_user)
+            VALUES ('delete', OLD.id, OLD.description, OLD.from_user, OLD.to_user);
+        '''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_insert AFTER INSERT ON transactions
+            BEGIN {add_new} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_delete AFTER DELETE ON transactions
+            BEGIN {remove_old} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_update
+            AFTER UPDATE OF description, from_user, to_user ON transactions
+            BEGIN {remove_old} {add_new} END
+        ''')
+        return True
+    
+    @staticmethod
+    def _column_exists(cursor: sqlite3.Cursor, table: str, column: str) -> bool:
+        cursor.execute(f"PRAGMA table_info({table})")
+        return any(row[1] == column for row in cursor.fetchall())
+    
+    def _create_counterparty_tables(self, cursor: sqlite3.Cursor) -> bool:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS counterparties (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name VARCHAR(100) UNIQUE NOT NULL
+            )
+        ''')
+        for column in ('from_party_id', 'to_party_id'):
+            if not self._column_exists(cursor, 'transactions', column):
+                cursor.execute(f"ALTER TABLE transactions ADD COLUMN {column} INTEGER REFERENCES counterparties (id)")
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_from_party ON transactions(user_id, from_party_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_to_party ON transactions(user_id, to_party_id)')
+        
+        # 服务层写入时会直接带上交易方ID；其他途径写入的行由触发器补齐
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_transactions_party_insert AFTER INSERT ON transactions
+            WHEN NEW.from_party_id IS NULL OR NEW.to_party_id IS NULL
+            BEGIN
+                INSERT OR IGNORE INTO counterparties (name) VALUES (NEW.from_user), (NEW.to_user);
+                UPDATE transactions SET
+                    from_party_id = (SELECT id FROM counterparties WHERE name = NEW.from_user),
+                    to_party_id = (SELECT id FROM counterparties WHERE name = NEW.to_user)
+                WHERE id = NEW.id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_transactions_party_update
+            AFTER UPDATE OF from_user, to_user ON transactions
+            BEGIN
+                INSERT OR IGNORE INTO counterparties (name) VALUES (NEW.from_user), (NEW.to_user);
+                UPDATE transactions SET
+                    from_party_id = (SELECT id FROM counterparties WHERE name = NEW.from_user),
+                    to_party_id = (SELECT id FROM counterparties WHERE name = NEW.to_user)
+                WHERE id = NEW.id;
+            END
+        ''')
         
+        if not self._table_exists(cursor, 'transactions_fts'):
+            return False
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS counterparties_trigram USING fts5(
+                    name, content='counterparties', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"三元组分词不可用，交易方查询将使用LIKE: {e}")
+            return False
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_counterparties_trigram_insert AFTER INSERT ON counterparties
+            BEGIN
+                INSERT INTO counterparties_trigram (rowid, name) VALUES (NEW.id, NEW.name);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_counterparties_trigram_delete AFTER DELETE ON counterparties
+            BEGIN
+                INSERT INTO counterparties_trigram (counterparties_trigram, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+            END
+        ''')
+        cursor.execute("INSERT INTO counterparties_trigram (counterparties_trigram) VALUES ('rebuild')")
+        return True
+    
+    def backfill_counterparties(self, conn: Optional[sqlite3.Connection] = None):
+        """为尚未关联交易方ID的交易补齐交易方字典与引用"""
+        if conn is None:
+            with self.connection() as conn:
+                return self.backfill_counterparties(conn)
+        conn.execute('''
+            INSERT OR IGNORE INTO counterparties (name)
+            SELECT from_user FROM transactions WHERE from_party_id IS NULL
+            UNION
+            SELECT to_user FROM transactions WHERE to_party_id IS NULL
+        ''')
         conn.commit()
-        conn.close()
+        self._backfill_in_batches(
+            conn,
+            '''from_party_id = (SELECT id FROM counterparties WHERE name = transactions.from_user),
+               to_party_id = (SELECT id FROM counterparties WHERE name = transactions.to_user)''',
+            "from_party_id IS NULL OR to_party_id IS NULL"
+        )
+    
+    def rebuild_fts_index(self, conn: Optional[sqlite3.Connection] = None):
+        """根据交易表重建全文索引（用于回填已有数据）"""
+        if not self.fts_enabled:
+            return
+        if conn is None:
+            with self.connection() as conn:
+                return self.rebuild_fts_index(conn)
+        conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+        conn.commit()
+    
+    def rebuild_summaries(self, conn: Optional[sqlite3.Connection] = None):
+        """根据交易表重建全部汇总表"""
+        if conn is None:
+            with self.connection() as conn:
+                return self.rebuild_summaries(conn)
+        cursor = conn.cursor()
+        for table, (bucket, fmt) in self.SUMMARY_TABLES.items():
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(f'''
+                INSERT INTO {table} (user_id, {bucket}, transaction_type, category, total_cents, transaction_count)
+                SELECT user_id, {self.bucket_sql(fmt)}, transaction_type, category,
+                       SUM({self.amount_cents_sql()}), COUNT(*)
+                FROM transactions
+                GROUP BY 1, 2, 3, 4
+            ''')
+        conn.commit()
+    
+    def _create_connection(self) -> sqlite3.Connection:
+        # 池化连接会在线程间传递，同一时刻只被一个线程持有
+        if self.tracer is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=TracingConnection)
+            conn.tracer = self.tracer
+        apply_profile(conn, self.profile)
+        return conn
+    
+    def enable_tracing(self, tracer: Optional[SQLTracer] = None, **options) -> SQLTracer:
+        """开启语句跟踪，options 传给 SQLTracer；连接池中的连接会重建"""
+        self.tracer = tracer or SQLTracer(**options)
+        self.pool.reset()
+        return self.tracer
+    
+    def disable_tracing(self):
+        self.tracer = None
+        self.pool.reset()
+    
+    def set_profile(self, profile: str):
+        """切换性能配置，连接池中的连接会按新配置重建"""
+        self.profile = resolve_profile(profile)
+        self.pool.reset()
+    
+    def checkpoint(self, mode: str = 'PASSIVE') -> Dict[str, int]:
+        """手动执行WAL检查点，mode 可为 PASSIVE/FULL/RESTART/TRUNCATE"""
+        mode = mode.upper()
+        if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise ValueError(f"未知的检查点模式: {mode}")
+        with self.connection() as conn:
+            busy, log_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        return {'busy': busy, 'log_frames': log_frames, 'checkpointed_frames': checkpointed}
+    
+    def connection(self):
+        """从连接池借出连接（上下文管理器）"""
+        return self.pool.connection()
     
     def get_connection(self):
-        """获取数据库连接"""
+        """获取独立的数据库连接（不经过连接池，调用方负责关闭）"""
         return sqlite3.connect(self.db_path)
     
+    def pool_stats(self) -> Dict[str, Any]:
+        """连接池计数器：借出、等待、复用等"""
+        return self.pool.stats()
+    
+    def close(self):
+        """关闭连接池中的所有连接，关闭前把WAL内容写回主库"""
+        try:
+            self.checkpoint('TRUNCATE')
+        except sqlite3.Error:
+            pass
+        self.pool.close_all()
+    
     @staticmethod
     def hash_password(password: str) -> str:
         """密码哈希"""
@@ -0,0 +1,181 @@
+import threading
+import traceback
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from models import Transaction, to_epoch
+
+# 合并后的变更最多逐条携带的交易数与ID数，超过后只保留计数、时间范围与分类
+MAX_CHANGE_TRANSACTIONS = 200
+MAX_CHANGE_IDS = 50_000
+
+@dataclass(frozen=True)
+class TransactionChange:
+    """某个用户一次（或合并后的多次）已提交的交易写入
+
+    inserted_ids/deleted_ids 为写入的ID（超过 MAX_CHANGE_IDS 时为空，以计数为准）；
+    start_epoch/end_epoch 与 categories 为受影响交易的时间范围（UTC 时间戳）与分类。
+    complete 为 True 时 inserted/deleted 逐条列出了完整的交易，订阅方可以据此增量更新；
+    为 False 时（例如批量导入）应整体重新加载。
+    """
+    user_id: int
+    inserted_ids: Tuple[int, ...] = ()
+    deleted_ids: Tuple[int, ...] = ()
+    inserted_count: int = 0
+    deleted_count: int = 0
+    start_epoch: Optional[int] = None
+    end_epoch: Optional[int] = None
+    categories: FrozenSet[str] = frozenset()
+    inserted: Tuple[Transaction, ...] = ()
+    deleted: Tuple[Transaction, ...] = ()
+    complete: bool = True
+
+    @classmethod
+    def for_transactions(cls, user_id: int, inserted: Iterable[Transaction] = (),
+                         deleted: Iterable[Transaction] = ()) -> "TransactionChange":
+        """由写入前后的完整交易构造变更"""
+        inserted, deleted = tuple(inserted), tuple(deleted)
+        epochs = [to_epoch(t.transaction_time)[0] for t in inserted + deleted]
+        return cls(
+            user_id=user_id,
+            inserted_ids=tuple(t.id for t in inserted),
+            deleted_ids=tuple(t.id for t in deleted),
+            inserted_count=len(inserted),
+            deleted_count=len(deleted),
+            start_epoch=min(epochs, default=None),
+            end_epoch=max(epochs, default=None),
+            categories=frozenset(t.category.value for t in inserted + deleted),
+            inserted=inserted,
+            deleted=deleted,
+        )
+
+    @property
+    def count(self) -> int:
+        return self.inserted_count + self.deleted_count
+
+    def merge(self, other: "TransactionChange") -> "TransactionChange":
+        """合并同一用户的两次变更（other 在后）"""
+        complete = (self.complete and other.complete
+                    and self.count + other.count <= MAX_CHANGE_TRANSACTIONS)
+        inserted_ids = self.inserted_ids + other.inserted_ids
+        deleted_ids = self.deleted_ids + other.deleted_ids
+        inserted_count = self.inserted_count + other.inserted_count
+        deleted_count = self.deleted_count + other.deleted_count
+        if (len(inserted_ids) != inserted_count or len(deleted_ids) != deleted_count
+                or inserted_count + deleted_count > MAX_CHANGE_IDS):
+            inserted_ids, deleted_ids = (), ()
+        epochs = [e for e in (self.start_epoch, self.end_epoch, other.start_epoch, other.end_epoch)
+                  if e is not None]
+        return TransactionChange(
+            user_id=self.user_id,
+            inserted_ids=inserted_ids,
+            deleted_ids=deleted_ids,
+            inserted_count=inserted_count,
+            deleted_count=deleted_count,
+            start_epoch=min(epochs, default=None),
+            end_epoch=max(epochs, default=None),
+            categories=self.categories | other.categories,
+            inserted=self.inserted + other.inserted if complete else (),
+            deleted=self.deleted + other.deleted if complete else (),
+            complete=complete,
+        )
+
+ChangeListener = Callable[[TransactionChange], None]
+
+class Subscription:
+    """一个订阅：user_id 为 None 时接收所有用户的变更
+
+    interval 为 None 时在发布方线程中逐次同步调用；否则同一用户的变更先合并，
+    最多每 interval 秒在计时线程中调用一次，避免批量写入时订阅方被大量事件淹没。
+    """
+
+    def __init__(self, listener: ChangeListener, user_id: Optional[int] = None,
+                 interval: Optional[float] = None):
+        self.listener = listener
+        self.user_id = user_id
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending: Dict[int, TransactionChange] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._active = True
+
+    def deliver(self, change: TransactionChange):
+        if self.user_id is not None and change.user_id != self.user_id:
+            return
+        if self.interval is None:
+            self._call(change)
+            return
+        with self._lock:
+            if not self._active:
+                return
+            pending = self._pending.get(change.user_id)
+            self._pending[change.user_id] = change if pending is None else pending.merge(change)
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """立即投递已合并、尚未投递的变更"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, {}
+        for change in pending.values():
+            self._call(change)
+
+    def cancel(self):
+        with self._lock:
+            self._active = False
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending.clear()
+
+    def _call(self, change: TransactionChange):
+        # 订阅者的异常不影响写入方与其他订阅者
+        try:
+            self.listener(change)
+        except Exception:
+            traceback.print_exc()
+
+class ChangeBus:
+    """交易变更的发布/订阅
+
+    写入方在事务提交之后调用 publish；订阅者按注册顺序收到变更。
+    同步订阅者在发布方线程中被调用，需要时自行切换线程（例如界面通过队列信号回到GUI线程）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: List[Subscription] = []
+
+    def subscribe(self, listener: ChangeListener, user_id: Optional[int] = None,
+                  interval: Optional[float] = None) -> Subscription:
+        subscription = Subscription(listener, user_id, interval)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """取消订阅，尚未投递的合并变更被丢弃"""
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+        subscription.cancel()
+
+    def publish(self, change: TransactionChange):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.deliver(change)
+
+    def flush(self):
+        """立即投递所有订阅中尚未投递的合并变更"""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.flush()
+
+transaction_changes = ChangeBus()
@@ -0,0 +1,193 @@
+import csv
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Iterator, List, Optional, Dict, Any, Tuple
+
+from models import Transaction, TransactionType, Category, CENT, MAX_AMOUNT
+from services import TransactionService
+
+# CSV 表头 / JSONL 字段名
+IMPORT_FIELDS = ['from_user', 'to_user', 'amount', 'transaction_type', 'category',
+                 'description', 'transaction_time']
+
+class RowValidationError(ValueError):
+    """导入行校验失败"""
+
+@dataclass
+class ImportReport:
+    """导入结果报告"""
+    total_rows: int = 0
+    imported: int = 0
+    rejected: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+    # (分块序号, 行号, 错误信息)；行号为 None 表示整个分块写库失败
+    errors: List[Tuple[int, Optional[int], str]] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total_rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def errors_by_chunk(self) -> Dict[int, List[Tuple[Optional[int], str]]]:
+        """按分块汇总错误"""
+        grouped: Dict[int, List[Tuple[Optional[int], str]]] = {}
+        for chunk_index, line_no, message in self.errors:
+            grouped.setdefault(chunk_index, []).append((line_no, message))
+        return grouped
+
+    def summary(self) -> str:
+        return (f"共 {self.total_rows} 行，导入 {self.imported} 行，拒绝 {self.rejected} 行，"
+                f"{self.chunks} 个分块，耗时 {self.elapsed:.2f}s（{self.rows_per_second:.0f} 行/秒）")
+
+def parse_transaction(record: Dict[str, Any], user_id: int) -> Transaction:
+    """把一条导入记录校验并转换为 Transaction"""
+    missing = [name for name in ('from_user', 'to_user', 'amount', 'transaction_type', 'category')
+               if record.get(name) in (None, '')]
+    if missing:
+        raise RowValidationError(f"缺少字段: {', '.join(missing)}")
+
+    try:
+        amount = Decimal(str(record['amount']).strip())
+    except InvalidOperation:
+        raise RowValidationError(f"金额无效: {record['amount']!r}")
+    if not amount.is_finite() or amount <= 0:
+        raise RowValidationError(f"金额必须为正数: {record['amount']!r}")
+    if amount > MAX_AMOUNT:
+        raise RowValidationError(f"金额超出范围: {record['amount']!r}")
+    try:
+        rounded = amount.quantize(CENT)
+    except InvalidOperation:
+        # 有效位数超过 Decimal 上下文精度（例如 1e30），无法表示到分
+        raise RowValidationError(f"金额超出范围: {record['amount']!r}")
+    if amount != rounded:
+        raise RowValidationError(f"金额最多两位小数: {record['amount']!r}")
+
+    try:
+        transaction_type = TransactionType(str(record['transaction_type']).strip().lower())
+    except ValueError:
+        raise RowValidationError(f"未知的交易类型: {record['transaction_type']!r}")
+    try:
+        category = Category(str(record['category']).strip().lower())
+    except ValueError:
+        raise RowValidationError(f"未知的分类: {record['category']!r}")
+
+    raw_time = record.get('transaction_time')
+    if raw_time in (None, ''):
+        transaction_time = datetime.now()
+    else:
+        try:
+            transaction_time = datetime.fromisoformat(str(raw_time).strip())
+        except ValueError:
+            raise RowValidationError(f"时间格式无效: {raw_time!r}")
+
+    return Transaction(
+        id=0,
+        user_id=user_id,
+        from_user=str(record['from_user']).strip(),
+        to_user=str(record['to_user']).strip(),
+        amount=amount,
+        transaction_type=transaction_type,
+        category=category,
+        description=str(record.get('description') or '').strip(),
+        transaction_time=transaction_time
+    )
+
+def iter_csv_records(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """逐行读取CSV，产出 (行号, 记录)；行号从数据首行的 2 开始（第 1 行是表头）"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        for record in reader:
+            yield reader.line_num, record
+
+def iter_jsonl_records(path: str) -> Iterator[Tuple[int, Any]]:
+    """逐行读取JSONL，产出 (行号, 记录)；无法解析的行产出异常对象"""
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, RowValidationError(f"JSON解析失败: {e.msg}")
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f"无法识别的导入文件格式: {path}")
+
+class TransactionImporter:
+    """流式导入CSV/JSONL交易记录
+
+    文件按 chunk_size 行分块读取、校验并批量写入，内存占用只与分块大小有关。
+    """
+
+    def __init__(self, transaction_service: Optional[TransactionService] = None,
+                 chunk_size: int = 1000):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size 必须为正数")
+        self.transaction_service = transaction_service or TransactionService()
+        self.chunk_size = chunk_size
+
+    def import_file(self, path: str, user_id: int, fmt: Optional[str] = None,
+                    use_bulk_profile: bool = False) -> ImportReport:
+        """导入文件；use_bulk_profile 为 True 时导入期间切换到 bulk-load 性能配置"""
+        fmt = fmt or detect_format(path)
+        if fmt == 'csv':
+            records = iter_csv_records(path)
+        elif fmt == 'jsonl':
+            records = iter_jsonl_records(path)
+        else:
+            raise ValueError(f"不支持的导入格式: {fmt}")
+
+        db = self.transaction_service.db
+        previous_profile = db.profile
+        if use_bulk_profile:
+            db.set_profile('bulk-load')
+        try:
+            return self.import_records(records, user_id)
+        finally:
+            if use_bulk_profile:
+                db.set_profile(previous_profile)
+                db.checkpoint('TRUNCATE')
+
+    def import_records(self, records: Iterator[Tuple[int, Any]], user_id: int) -> ImportReport:
+        """导入 (行号, 记录) 流"""
+        report = ImportReport()
+        started = time.perf_counter()
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+            chunk_index = report.chunks
+            report.chunks += 1
+            report.total_rows += len(chunk)
+
+            valid = []
+            for line_no, record in chunk:
+                try:
+                    if isinstance(record, Exception):
+                        raise record
+                    if not isinstance(record, dict):
+                        raise RowValidationError("记录必须是对象")
+                    valid.append(parse_transaction(record, user_id))
+                except RowValidationError as e:
+                    report.rejected += 1
+                    report.errors.append((chunk_index, line_no, str(e)))
+
+            if valid:
+                result = self.transaction_service.add_transactions_bulk(valid, chunk_size=len(valid))
+                report.imported += result.inserted
+                report.rejected += result.failed
+                for _, message in result.chunk_errors:
+                    report.errors.append((chunk_index, None, message))
+        report.elapsed = time.perf_counter() - started
+        return report
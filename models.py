@@ -1,7 +1,11 @@
-from dataclasses import dataclass
-from datetime import datetime
+import math
+import sys
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, ROUND_HALF_UP
 from enum import Enum
-from typing import List, Optional
+from typing import List, Optional, Sequence, Iterator, Union
 
 class TransactionType(Enum):
     INCOME = "income"
@@ -18,6 +22,47 @@ class Category(Enum):
     SHOPPING = "shopping"
     OTHER = "other"
 
+CENT = Decimal('0.01')
+# 金额以整数分存入 SQLite INTEGER（64 位有符号），超出该范围的金额无法存储
+MAX_CENTS = 2 ** 63 - 1
+MAX_AMOUNT = Decimal(MAX_CENTS).scaleb(-2)
+
+def to_decimal(amount) -> Decimal:
+    """把金额（float/str/Decimal）规范为两位小数的 Decimal"""
+    if not isinstance(amount, Decimal):
+        # 经 str 转换，避免把 float 的二进制误差带进 Decimal
+        amount = Decimal(str(amount))
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def to_cents(amount) -> int:
+    """金额 -> 整数分；超出 SQLite 整数范围时抛出 OverflowError"""
+    value = amount if isinstance(amount, Decimal) else Decimal(str(amount))
+    if value.is_finite() and abs(value) > MAX_AMOUNT:
+        raise OverflowError(f"金额超出范围: {amount}")
+    return int(to_decimal(value) * 100)
+
+def from_cents(cents: int) -> Decimal:
+    """整数分 -> 两位小数的 Decimal"""
+    return Decimal(cents).scaleb(-2)
+
+UNIX_EPOCH = datetime(1970, 1, 1)
+
+def to_epoch(value: datetime) -> tuple:
+    """datetime -> (UTC 秒级时间戳, 时区偏移秒数)；不带时区的时间按本机时区解释"""
+    aware = value if value.tzinfo is not None else value.astimezone()
+    offset = int(aware.utcoffset().total_seconds())
+    return math.floor(aware.timestamp()), offset
+
+# 时区偏移秒数 -> timezone，解码时复用，不必每行构造
+_ZONES = {}
+
+def from_epoch(epoch: int, offset: int, _base=UNIX_EPOCH, _delta=timedelta, _zones=_ZONES) -> datetime:
+    """(UTC 时间戳, 时区偏移) -> 带时区的时间：记录发生地的本地时间，to_epoch 可换算回同一时刻"""
+    zone = _zones.get(offset)
+    if zone is None:
+        zone = _zones[offset] = timezone(_delta(seconds=offset))
+    return (_base + _delta(seconds=epoch + offset)).replace(tzinfo=zone)
+
 @dataclass
 class User:
     id: int
@@ -35,11 +80,15 @@ class User:
 
 @dataclass
 class Transaction:
+    # 使用 __slots__ 去掉每个实例的 __dict__，大结果集内存占用更小
+    __slots__ = ('id', 'user_id', 'from_user', 'to_user', 'amount', 'transaction_type',
+                 'category', 'description', 'transaction_time')
+    
     id: int
     user_id: int
     from_user: str
     to_user: str
-    amount: float
+    amount: Decimal
     transaction_type: TransactionType
     category: Category
     description: str
@@ -65,9 +114,133 @@ class Transaction:
             user_id=data['user_id'],
             from_user=data['from_user'],
             to_user=data['to_user'],
-            amount=data['amount'],
-            transaction_type=TransactionType(data['transaction_type']),
-            category=Category(data['category']),
+            amount=to_decimal(data['amount']),
+            transaction_type=TRANSACTION_TYPE_BY_VALUE[data['transaction_type']],
+            category=CATEGORY_BY_VALUE[data['category']],
             description=data['description'],
             transaction_time=datetime.fromisoformat(data['transaction_time'])
-        )
\ No newline at end of file
+        )
+
+# 预先计算的枚举查找表：按值/编码查找比调用 Enum(value) 快得多
+TRANSACTION_TYPES = tuple(TransactionType)
+CATEGORIES = tuple(Category)
+TRANSACTION_TYPE_BY_VALUE = {t.value: t for t in TRANSACTION_TYPES}
+CATEGORY_BY_VALUE = {c.value: c for c in CATEGORIES}
+TRANSACTION_TYPE_CODES = {t.value: code for code, t in enumerate(TRANSACTION_TYPES)}
+CATEGORY_CODES = {c.value: code for code, c in enumerate(CATEGORIES)}
+
+def decode_transaction_row(row: Sequence, _new=Transaction, _types=TRANSACTION_TYPE_BY_VALUE,
+                           _categories=CATEGORY_BY_VALUE, _from_epoch=from_epoch,
+                           _from_cents=from_cents) -> Transaction:
+    """把按 TRANSACTION_COLUMNS 顺序查询出的一行解码为 Transaction
+
+    金额列为整数分，时间为 (UTC 时间戳, 时区偏移)，不需要解析字符串；
+    解码出的 transaction_time 带时区，保留记录的时刻与发生地的偏移。
+    """
+    (transaction_id, user_id, from_user, to_user, amount_cents,
+     transaction_type, category, description, epoch, offset) = row
+    return _new(transaction_id, user_id, from_user, to_user, _from_cents(amount_cents),
+                _types[transaction_type], _categories[category], description,
+                _from_epoch(epoch, offset))
+
+class TransactionBatch:
+    """列式存储的一批交易
+
+    数值列存放在 array 中，类型/分类存为单字节编码，交易方名称做字符串驻留
+    去重；按下标访问时才构造对应的 Transaction，适合只做汇总或分批显示的大结果集。
+    """
+    __slots__ = ('ids', 'user_ids', 'amount_cents', 'type_codes', 'category_codes',
+                 'from_users', 'to_users', 'descriptions', 'epochs', 'tz_offsets')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.user_ids = array('q')
+        self.amount_cents = array('q')  # 整数分，汇总时没有浮点误差
+        self.type_codes = array('b')
+        self.category_codes = array('b')
+        self.from_users: List[str] = []
+        self.to_users: List[str] = []
+        self.descriptions: List[str] = []
+        self.epochs = array('q')  # UTC 秒级时间戳
+        self.tz_offsets = array('l')  # 时区偏移秒数
+
+    @classmethod
+    def from_rows(cls, rows) -> "TransactionBatch":
+        """从按 TRANSACTION_COLUMNS 顺序的查询结果构建（可以是游标，逐行消费）"""
+        batch = cls()
+        batch.extend(rows)
+        return batch
+
+    def extend(self, rows):
+        intern = sys.intern
+        type_codes = TRANSACTION_TYPE_CODES
+        category_codes = CATEGORY_CODES
+        for (transaction_id, user_id, from_user, to_user, amount_cents,
+             transaction_type, category, description, epoch, offset) in rows:
+            self.ids.append(transaction_id)
+            self.user_ids.append(user_id)
+            self.amount_cents.append(amount_cents)
+            self.type_codes.append(type_codes[transaction_type])
+            self.category_codes.append(category_codes[category])
+            self.from_users.append(intern(from_user))
+            self.to_users.append(intern(to_user))
+            self.descriptions.append(description)
+            self.epochs.append(epoch)
+            self.tz_offsets.append(offset)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            sliced = TransactionBatch()
+            for name in self.__slots__:
+                setattr(sliced, name, getattr(self, name)[index])
+            return sliced
+        return Transaction(
+            self.ids[index], self.user_ids[index], self.from_users[index], self.to_users[index],
+            from_cents(self.amount_cents[index]), TRANSACTION_TYPES[self.type_codes[index]],
+            CATEGORIES[self.category_codes[index]], self.descriptions[index],
+            from_epoch(self.epochs[index], self.tz_offsets[index])
+        )
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for index in range(len(self.ids)):
+            yield self[index]
+
+    def to_numpy(self) -> dict:
+        """以 NumPy 数组形式返回数值列（零拷贝），需要安装 numpy"""
+        import numpy as np
+        return {
+            'id': np.frombuffer(self.ids, dtype=np.int64),
+            'user_id': np.frombuffer(self.user_ids, dtype=np.int64),
+            'amount_cents': np.frombuffer(self.amount_cents, dtype=np.int64),
+            'type_code': np.frombuffer(self.type_codes, dtype=np.int8),
+            'category_code': np.frombuffer(self.category_codes, dtype=np.int8),
+            'epoch': np.frombuffer(self.epochs, dtype=np.int64),
+            'tz_offset': np.array(self.tz_offsets, dtype=np.int64),
+        }
+
+@dataclass
+class TransactionPage:
+    """一页交易记录；next_cursor 为 None 表示没有更多数据"""
+    transactions: List[Transaction]
+    next_cursor: Optional[str] = None
+    
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+@dataclass
+class BulkInsertResult:
+    """批量写入结果"""
+    inserted: int = 0
+    failed: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+    # (分块序号, 错误信息)；出错的分块整体回滚
+    chunk_errors: List[tuple] = field(default_factory=list)
+    
+    @property
+    def rows_per_second(self) -> float:
+        return self.inserted / self.elapsed if self.elapsed > 0 else 0.0
@@ -0,0 +1,107 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from database import DatabaseManager
+from models import TransactionType, Category
+from services import QueryService, StatisticsService, _page_query, encode_cursor
+
+# 这些表上的全表扫描视为问题；虚拟表（全文索引）与小字典表不检查
+CHECKED_TABLES = ('transactions', 'daily_summaries', 'monthly_summaries')
+
+@dataclass
+class PlanCheck:
+    """一条查询的 EXPLAIN QUERY PLAN 结果及发现的问题"""
+    name: str
+    query: str
+    params: list
+    check_order: bool  # 是否要求 ORDER BY 由索引顺序满足
+    plan: List[str] = field(default_factory=list)
+    problems: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+def explain(conn, query: str, params: list) -> List[str]:
+    """返回查询计划的各行描述"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+
+def find_problems(plan: List[str], check_order: bool) -> List[str]:
+    problems = []
+    for detail in plan:
+        words = detail.split()
+        # "SCAN 表" 或 "SCAN 表 USING INDEX" 都会读取整张表/整个索引；走索引查找时为 "SEARCH"
+        if len(words) >= 2 and words[0] == 'SCAN' and words[1] in CHECKED_TABLES:
+            problems.append(f"全表扫描: {detail}")
+        if check_order and detail.startswith('USE TEMP B-TREE') and 'ORDER BY' in detail:
+            problems.append(f"排序需要临时B树: {detail}")
+    return problems
+
+def representative_queries(user_id: int = 1) -> List[Tuple[str, Optional[str], list, bool]]:
+    """服务层主要查询的 (名称, SQL, 参数, 是否检查排序)，SQL 由服务层同一套代码生成"""
+    query_service = QueryService()
+    start, end = datetime(2024, 1, 1, 12, 30), datetime(2024, 3, 15, 18, 0)
+    cursor = encode_cursor(int(end.timestamp()), 1 << 62)
+
+    def page(name, conditions, with_cursor=False):
+        where, params = query_service._build_conditions(user_id, conditions)
+        query, params = _page_query(where, params, 200, cursor if with_cursor else None)
+        return name, query, params, True
+
+    def count(name, conditions):
+        where, params = query_service._build_conditions(user_id, conditions)
+        return name, f"SELECT COUNT(*) FROM transactions WHERE {where}", params, False
+
+    def aggregate(name, lower, upper, transaction_type=None):
+        query, params = StatisticsService._aggregate_range_query(user_id, lower, upper, transaction_type)
+        return name, query, params, False
+
+    return [
+        page("用户交易首页", {}),
+        page("用户交易续页", {}, with_cursor=True),
+        page("时间范围分页", {'start_time': start, 'end_time': end}, with_cursor=True),
+        page("类型分页", {'transaction_type': TransactionType.EXPENSE}),
+        page("分类分页", {'category': Category.FOOD}),
+        page("类型+分类+时间分页", {'transaction_type': TransactionType.EXPENSE, 'category': Category.FOOD,
+                               'start_time': start, 'end_time': end}),
+        page("全文检索分页", {'search_text': "咖啡"}),
+        page("交易方分页", {'target_user': "星巴克"}),
+        count("类型+时间计数", {'transaction_type': TransactionType.INCOME, 'start_time': start, 'end_time': end}),
+        aggregate("时间段汇总", start, end),
+        aggregate("时间段支出汇总", start, end, TransactionType.EXPENSE.value),
+        aggregate("不足一天的汇总", start, start.replace(hour=20)),
+        ("月度分类排行", '''
+            SELECT category, SUM(total_cents) as total_cents, SUM(transaction_count) as count
+            FROM monthly_summaries
+            WHERE user_id = ? AND transaction_type = 'expense'
+            GROUP BY category ORDER BY total_cents DESC LIMIT ?
+        ''', [user_id, 10], False),
+    ]
+
+def verify_query_plans(user_id: int = 1) -> List[PlanCheck]:
+    """对主要查询执行 EXPLAIN QUERY PLAN，检查是否都走索引、分页排序是否不需要临时B树"""
+    checks = []
+    with DatabaseManager().connection() as conn:
+        for name, query, params, check_order in representative_queries(user_id):
+            check = PlanCheck(name, query, params, check_order)
+            check.plan = explain(conn, query, params)
+            check.problems = find_problems(check.plan, check_order)
+            checks.append(check)
+    return checks
+
+def format_report(checks: List[PlanCheck]) -> str:
+    lines = []
+    for check in checks:
+        lines.append(f"[{'OK' if check.ok else '!!'}] {check.name}")
+        lines.extend(f"      {detail}" for detail in check.plan)
+        lines.extend(f"   -> {problem}" for problem in check.problems)
+    failed = sum(not check.ok for check in checks)
+    lines.append(f"共 {len(checks)} 条查询，{failed} 条有问题")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import sys
+    results = verify_query_plans()
+    print(format_report(results))
+    sys.exit(0 if all(check.ok for check in results) else 1)
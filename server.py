@@ -0,0 +1,748 @@
+"""记账本本地 HTTP/JSON 服务（基于 asyncio，不依赖 PyQt6 与第三方库）
+
+    python server.py --port 8765
+    curl http://127.0.0.1:8765/users/1/stats?start=2024-01-01
+    curl -H 'Accept: application/x-ndjson' 'http://127.0.0.1:8765/users/1/query?search=咖啡'
+
+默认只监听本机回环地址，不做身份认证；其他工具通过该服务访问数据库，
+而不是直接打开数据库文件。SQLite 调用在有界线程池中执行，事件循环只负责收发；
+连接默认保持（keep-alive），大查询以分块传输的 NDJSON 流式返回，每次只读一页。
+
+接口：
+    GET    /health                                   存活检查
+    GET    /metrics                                  各接口延迟统计、线程池与连接池计数
+    POST   /users                                    注册 {username, password, email}
+    POST   /login                                    登录 {username, password}
+    GET    /users?username=                          按用户名查找用户
+    GET    /users/<id>/transactions?limit=&cursor=   按时间倒序分页
+    POST   /users/<id>/transactions                  添加一笔交易（字段同导入格式）
+    POST   /users/<id>/transactions/bulk             批量添加（JSON 数组或 NDJSON）
+    DELETE /transactions/<id>                        删除交易
+    GET    /users/<id>/query?<条件>&limit=&cursor=    条件查询；Accept 为 NDJSON 或 stream=1 时流式返回全部结果
+    GET    /users/<id>/count?<条件>                   满足条件的笔数
+    GET    /users/<id>/stats?start=&end=             收支汇总（默认最近 30 天）
+    GET    /users/<id>/stats/top-categories?limit=   支出分类排行
+    GET    /users/<id>/stats/series?granularity=     按天/周/月/年的时间序列
+
+查询条件参数：search、target、start、end、type（income/expense）、category。
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as time_of_day, timedelta
+from decimal import Decimal
+from functools import partial
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# 请求头与请求体上限（字节）
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+# 空闲的保持连接在该秒数后关闭
+KEEP_ALIVE_TIMEOUT = 15.0
+# 分页接口的默认/最大页大小；流式查询每次从库中读取的行数
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_PAGE_SIZE = 500
+# 每个接口保留最近多少次请求的耗时用于计算分位数
+METRICS_WINDOW = 1024
+
+NDJSON = 'application/x-ndjson'
+
+class HTTPError(Exception):
+    """以指定状态码返回 {"error": message} 的请求错误"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: Dict[str, str]
+    headers: Dict[str, str]
+    body: bytes = b''
+    version: str = 'HTTP/1.1'
+    params: Tuple[str, ...] = ()
+
+    def arg(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        value = self.query.get(name)
+        return default if value in (None, '') else value
+
+    def int_arg(self, name: str, default: int, maximum: Optional[int] = None) -> int:
+        text = self.arg(name)
+        if text is None:
+            return default
+        try:
+            value = int(text)
+        except ValueError:
+            raise HTTPError(400, f"参数 {name} 必须为整数: {text!r}")
+        if value <= 0:
+            raise HTTPError(400, f"参数 {name} 必须为正整数: {text}")
+        return value if maximum is None else min(value, maximum)
+
+    def json(self) -> Any:
+        if not self.body:
+            raise HTTPError(400, "缺少请求体")
+        try:
+            return json.loads(self.body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise HTTPError(400, f"请求体不是有效的 JSON: {e}")
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def accepts(self, content_type: str) -> bool:
+        return content_type in self.headers.get('accept', '')
+
+@dataclass
+class Response:
+    status: int = 200
+    body: bytes = b''
+    content_type: str = 'application/json; charset=utf-8'
+    headers: Dict[str, str] = field(default_factory=dict)
+
+@dataclass
+class StreamingResponse:
+    """以分块传输编码逐段发送的响应"""
+    chunks: AsyncIterator[bytes]
+    status: int = 200
+    content_type: str = NDJSON + '; charset=utf-8'
+    headers: Dict[str, str] = field(default_factory=dict)
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+def _dumps(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+_encode_line = json.JSONEncoder(ensure_ascii=False).encode
+
+def transaction_record(transaction) -> Dict[str, Any]:
+    """交易 -> 可直接序列化的字典（金额为字符串，时间为带时区偏移的 ISO 格式）"""
+    transaction_time = transaction.transaction_time
+    if transaction_time.tzinfo is None:
+        transaction_time = transaction_time.astimezone()  # 与 to_epoch 一致，按本机时区解释
+    return {
+        'id': transaction.id,
+        'user_id': transaction.user_id,
+        'from_user': transaction.from_user,
+        'to_user': transaction.to_user,
+        'amount': str(transaction.amount),
+        'transaction_type': transaction.transaction_type.value,
+        'category': transaction.category.value,
+        'description': transaction.description,
+        'transaction_time': transaction_time.isoformat(),
+    }
+
+def encode_ndjson(transactions) -> bytes:
+    """交易列表 -> NDJSON；大结果的编码耗时与查询相当，在工作线程中执行"""
+    if not transactions:
+        return b''
+    return ('\n'.join(_encode_line(transaction_record(t)) for t in transactions) + '\n').encode('utf-8')
+
+def json_response(data: Any, status: int = 200) -> Response:
+    return Response(status, _dumps(data))
+
+def error_response(status: int, message: str) -> Response:
+    return json_response({'error': message}, status)
+
+def _parse_time(text: str, end_of_day: bool = False) -> datetime:
+    """解析 ISO 格式时间；只给出日期且 end_of_day 为 True 时取当天最后一刻"""
+    try:
+        value = datetime.fromisoformat(text)
+    except ValueError:
+        raise HTTPError(400, f"时间格式无效: {text!r}（应为 YYYY-MM-DD 或 YYYY-MM-DDTHH:MM[:SS]）")
+    if end_of_day and len(text) <= 10:
+        value = datetime.combine(value.date(), time_of_day.max)
+    return value
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class EndpointMetrics:
+    """单个接口的请求计数与最近 METRICS_WINDOW 次请求的耗时"""
+
+    def __init__(self):
+        self.count = 0
+        self.client_errors = 0
+        self.server_errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._samples: Deque[float] = deque(maxlen=METRICS_WINDOW)
+
+    def record(self, status: int, elapsed_ms: float):
+        self.count += 1
+        if 400 <= status < 500:
+            self.client_errors += 1
+        elif status >= 500:
+            self.server_errors += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self._samples.append(elapsed_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self._samples)
+        return {
+            'count': self.count,
+            'client_errors': self.client_errors,
+            'server_errors': self.server_errors,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(_percentile(ordered, 0.50), 3),
+            'p95_ms': round(_percentile(ordered, 0.95), 3),
+            'p99_ms': round(_percentile(ordered, 0.99), 3),
+            'max_ms': round(self.max_ms, 3),
+        }
+
+class WorkerPool:
+    """执行 SQLite 调用的有界线程池
+
+    线程数默认与连接池大小一致，工作线程不会因等待连接而阻塞；
+    排队中的调用超过 max_pending 时直接以 503 拒绝，而不是无限堆积。
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='finance-db')
+        self._active = 0
+        # 计数在事件循环线程与工作线程中都会更新，一律在锁内读写
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'rejected': 0, 'queue_time': 0.0, 'max_in_flight': 0}
+
+    async def run(self, func: Callable, *args, **kwargs):
+        with self._lock:
+            if self._active >= self.workers + self.max_pending:
+                self._stats['rejected'] += 1
+                raise HTTPError(503, "服务繁忙，请稍后重试")
+            self._active += 1
+            self._stats['calls'] += 1
+            self._stats['max_in_flight'] = max(self._stats['max_in_flight'], self._active)
+        submitted = time.perf_counter()
+
+        def call():
+            waited = time.perf_counter() - submitted
+            with self._lock:
+                self._stats['queue_time'] += waited
+            return func(*args, **kwargs)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, workers=self.workers, max_pending=self.max_pending, in_flight=self._active)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+Handler = Callable[[Request], Awaitable[Any]]
+
+class FinanceServer:
+    """路由、连接处理与各接口实现"""
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        # 服务层在这里才导入：DatabaseManager 是单例，须在 main() 设置好环境变量之后创建
+        from database import DatabaseManager
+        from services import UserService, TransactionService, QueryService, StatisticsService
+
+        self.db = DatabaseManager()
+        self.user_service = UserService()
+        self.transaction_service = TransactionService()
+        self.query_service = QueryService()
+        # 不使用 CachedStatisticsService：界面等其他进程写库时，本进程的缓存无法得知数据变化
+        self.stats_service = StatisticsService()
+        workers = workers or self.db.pool.max_size
+        self.workers = WorkerPool(workers, workers * 4 if max_pending is None else max_pending)
+        self.metrics: Dict[str, EndpointMetrics] = {}
+        self.started = time.time()
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._routes: List[Tuple[str, re.Pattern, str, Handler]] = []
+        route = self._route
+        route('GET', '/health', self.health)
+        route('GET', '/metrics', self.get_metrics)
+        route('POST', '/users', self.register_user)
+        route('POST', '/login', self.login)
+        route('GET', '/users', self.find_user)
+        route('GET', '/users/{id}/transactions', self.list_transactions)
+        route('POST', '/users/{id}/transactions', self.add_transaction)
+        route('POST', '/users/{id}/transactions/bulk', self.add_transactions_bulk)
+        route('DELETE', '/transactions/{id}', self.delete_transaction)
+        route('GET', '/users/{id}/query', self.query_transactions)
+        route('GET', '/users/{id}/count', self.count_transactions)
+        route('GET', '/users/{id}/stats', self.time_range_stats)
+        route('GET', '/users/{id}/stats/top-categories', self.top_categories)
+        route('GET', '/users/{id}/stats/series', self.time_series)
+
+    def _route(self, method: str, template: str, handler: Handler):
+        # 模板同时用作延迟统计的接口名
+        pattern = re.compile('^' + re.escape(template).replace(r'\{id\}', r'(\d+)') + '$')
+        self._routes.append((method, pattern, f"{method} {template}", handler))
+
+    def _resolve(self, request: Request) -> Tuple[str, Handler]:
+        allowed = []
+        for method, pattern, name, handler in self._routes:
+            match = pattern.match(request.path)
+            if match is None:
+                continue
+            if method == request.method:
+                request.params = match.groups()
+                return name, handler
+            allowed.append(method)
+        if allowed:
+            raise HTTPError(405, f"{request.path} 只支持 {', '.join(allowed)}")
+        raise HTTPError(404, f"未知的接口: {request.path}")
+
+    # ---- 连接处理 ----
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except HTTPError as e:
+                    await self._write_response(writer, error_response(e.status, e.message), keep_alive=False)
+                    break
+                if request is None:
+                    break
+                if not await self._dispatch(request, writer):
+                    break
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        """读取一个请求；对方在两个请求之间关闭连接时返回 None"""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "请求头过大")
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise HTTPError(400, "请求行格式无效")
+        if version not in ('HTTP/1.0', 'HTTP/1.1'):
+            raise HTTPError(505, f"不支持的协议版本: {version}")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise HTTPError(411, "请求体须带 Content-Length，不支持分块传输")
+        try:
+            length = int(headers.get('content-length', '0'))
+        except ValueError:
+            raise HTTPError(400, "Content-Length 无效")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"请求体超过 {MAX_BODY_BYTES} 字节")
+        body = await reader.readexactly(length) if length > 0 else b''
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+        return Request(method.upper(), unquote(url.path).rstrip('/') or '/', query, headers, body, version)
+
+    async def _dispatch(self, request: Request, writer: asyncio.StreamWriter) -> bool:
+        """处理请求并写回响应，返回连接是否继续保持"""
+        started = time.perf_counter()
+        name = 'unmatched'
+        keep_alive = request.keep_alive
+        try:
+            name, handler = self._resolve(request)
+            response = await handler(request)
+        except HTTPError as e:
+            response = error_response(e.status, e.message)
+        except Exception:
+            traceback.print_exc()
+            response = error_response(500, "服务器内部错误")
+
+        if isinstance(response, StreamingResponse):
+            # HTTP/1.0 不支持分块传输，以关闭连接表示响应结束
+            keep_alive = keep_alive and request.version == 'HTTP/1.1'
+            status = response.status
+            try:
+                complete = await self._write_stream(writer, response, keep_alive,
+                                                    chunked=request.version == 'HTTP/1.1')
+                if not complete:
+                    status = 500
+            finally:
+                self._record(name, status, started)
+            return keep_alive and complete
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        response.headers.setdefault('Server-Timing', f"app;dur={elapsed_ms:.2f}")
+        try:
+            await self._write_response(writer, response, keep_alive)
+        finally:
+            self._record(name, response.status, started)
+        return keep_alive
+
+    def _record(self, name: str, status: int, started: float):
+        self.metrics.setdefault(name, EndpointMetrics()).record(status, (time.perf_counter() - started) * 1000)
+
+    @staticmethod
+    def _head(status: int, content_type: str, headers: Dict[str, str], keep_alive: bool) -> bytes:
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                 f"Content-Type: {content_type}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if keep_alive:
+            lines.append(f"Keep-Alive: timeout={int(KEEP_ALIVE_TIMEOUT)}")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _write_response(self, writer: asyncio.StreamWriter, response: Response, keep_alive: bool):
+        headers = dict(response.headers, **{'Content-Length': str(len(response.body))})
+        writer.write(self._head(response.status, response.content_type, headers, keep_alive) + response.body)
+        await writer.drain()
+
+    async def _write_stream(self, writer: asyncio.StreamWriter, response: StreamingResponse,
+                            keep_alive: bool, chunked: bool) -> bool:
+        """发送流式响应，返回响应是否完整；中途出现意外错误时返回 False，调用方须关闭连接"""
+        headers = dict(response.headers)
+        if chunked:
+            headers['Transfer-Encoding'] = 'chunked'
+        writer.write(self._head(response.status, response.content_type, headers, keep_alive))
+        complete = True
+        try:
+            async for data in response.chunks:
+                if data:
+                    writer.write(b'%x\r\n%s\r\n' % (len(data), data) if chunked else data)
+                    # 等待发送缓冲排空再读下一页，慢客户端不会让结果堆积在内存中
+                    await writer.drain()
+        except HTTPError as e:
+            # 响应头已经发出，只能在流末尾追加一条错误记录
+            error = _dumps({'error': e.message}) + b'\n'
+            writer.write(b'%x\r\n%s\r\n' % (len(error), error) if chunked else error)
+        except ConnectionError:
+            raise  # 客户端已断开，由 handle_connection 关闭连接
+        except Exception:
+            # 意外错误：记录日志并追加一条错误记录，不发送结束块，
+            # 随后关闭连接，客户端据此判断响应不完整
+            traceback.print_exc()
+            complete = False
+            error = _dumps({'error': "服务器内部错误"}) + b'\n'
+            writer.write(b'%x\r\n%s\r\n' % (len(error), error) if chunked else error)
+        finally:
+            await response.chunks.aclose()
+        if chunked and complete:
+            writer.write(b'0\r\n\r\n')
+        await writer.drain()
+        return complete
+
+    async def close(self):
+        """关闭仍然保持的连接并等待线程池中的调用结束"""
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(None, self.workers.shutdown)
+        self.db.close()
+
+    # ---- 参数解析 ----
+
+    def _user_id(self, request: Request) -> int:
+        return int(request.params[0])
+
+    def _conditions(self, request: Request) -> Dict[str, Any]:
+        """查询参数 -> QueryService 的条件，参数名与命令行 query 子命令一致"""
+        from models import TransactionType, Category
+
+        conditions: Dict[str, Any] = {}
+        if request.arg('search'):
+            conditions['search_text'] = request.arg('search')
+        if request.arg('target'):
+            conditions['target_user'] = request.arg('target')
+        if request.arg('start'):
+            conditions['start_time'] = _parse_time(request.arg('start'))
+        if request.arg('end'):
+            conditions['end_time'] = _parse_time(request.arg('end'), end_of_day=True)
+        if request.arg('type'):
+            try:
+                conditions['transaction_type'] = TransactionType(request.arg('type').lower())
+            except ValueError:
+                raise HTTPError(400, f"未知的交易类型: {request.arg('type')}（可选: income、expense）")
+        if request.arg('category'):
+            try:
+                conditions['category'] = Category(request.arg('category').lower())
+            except ValueError:
+                raise HTTPError(400, f"未知的分类: {request.arg('category')}"
+                                     f"（可选: {', '.join(c.value for c in Category)}）")
+        return conditions
+
+    def _time_range(self, request: Request) -> Tuple[datetime, datetime]:
+        end = _parse_time(request.arg('end'), end_of_day=True) if request.arg('end') else datetime.now()
+        start = _parse_time(request.arg('start')) if request.arg('start') else end - timedelta(days=30)
+        if start > end:
+            raise HTTPError(400, "开始时间晚于结束时间")
+        return start, end
+
+    @staticmethod
+    def _page_json(page) -> Dict[str, Any]:
+        return {'transactions': [transaction_record(t) for t in page.transactions], 'next_cursor': page.next_cursor}
+
+    async def _page(self, func: Callable, *args, **kwargs):
+        try:
+            return await self.workers.run(func, *args, **kwargs)
+        except ValueError as e:
+            # decode_cursor 对无效的续传令牌抛出 ValueError
+            raise HTTPError(400, str(e))
+
+    # ---- 接口 ----
+
+    async def health(self, request: Request) -> Response:
+        return json_response({'status': 'ok', 'uptime': round(time.time() - self.started, 3)})
+
+    async def get_metrics(self, request: Request) -> Response:
+        return json_response({
+            'endpoints': {name: metrics.snapshot() for name, metrics in sorted(self.metrics.items())},
+            'workers': self.workers.stats(),
+            'pool': self.db.pool_stats(),
+            'connections': len(self._connections),
+        })
+
+    async def register_user(self, request: Request) -> Response:
+        data = request.json()
+        if not isinstance(data, dict) or not data.get('username') or not data.get('password'):
+            raise HTTPError(400, "需要 username 与 password")
+        user = await self.workers.run(self.user_service.register_user, str(data['username']),
+                                      str(data['password']), str(data.get('email') or ''))
+        if user is None:
+            raise HTTPError(409, f"用户名已存在: {data['username']}")
+        return json_response(user.to_dict(), 201)
+
+    async def login(self, request: Request) -> Response:
+        data = request.json()
+        if not isinstance(data, dict) or not data.get('username') or not data.get('password'):
+            raise HTTPError(400, "需要 username 与 password")
+        user = await self.workers.run(self.user_service.login_user, str(data['username']), str(data['password']))
+        if user is None:
+            raise HTTPError(401, "用户名或密码错误")
+        return json_response(user.to_dict())
+
+    async def find_user(self, request: Request) -> Response:
+        username = request.arg('username')
+        if username is None:
+            raise HTTPError(400, "需要参数 username")
+        user = await self.workers.run(self.user_service.get_user_by_username, username)
+        if user is None:
+            raise HTTPError(404, f"用户不存在: {username}")
+        return json_response(user.to_dict())
+
+    async def list_transactions(self, request: Request) -> Response:
+        page = await self._page(self.transaction_service.get_transactions_page, self._user_id(request),
+                                request.int_arg('limit', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE), request.arg('cursor'))
+        return json_response(self._page_json(page))
+
+    async def add_transaction(self, request: Request) -> Response:
+        from importer import RowValidationError, parse_transaction
+
+        data = request.json()
+        if not isinstance(data, dict):
+            raise HTTPError(400, "请求体应为 JSON 对象")
+        try:
+            transaction = parse_transaction(data, self._user_id(request))
+        except RowValidationError as e:
+            raise HTTPError(400, str(e))
+        saved = await self.workers.run(self.transaction_service.add_transaction, transaction)
+        if saved is None:
+            raise HTTPError(500, "写入交易失败")
+        return json_response(transaction_record(saved), 201)
+
+    async def add_transactions_bulk(self, request: Request) -> Response:
+        """逐条校验后整体批量写入；校验失败的记录不写入，在 errors 中按序号列出"""
+        from importer import RowValidationError, parse_transaction
+
+        if request.headers.get('content-type', '').startswith(NDJSON):
+            lines = request.body.decode('utf-8', errors='replace').splitlines()
+            try:
+                records = [json.loads(line) for line in lines if line.strip()]
+            except json.JSONDecodeError as e:
+                raise HTTPError(400, f"NDJSON 格式无效: {e}")
+        else:
+            records = request.json()
+        if not isinstance(records, list):
+            raise HTTPError(400, "请求体应为 JSON 数组或 NDJSON")
+
+        user_id = self._user_id(request)
+        transactions, errors = [], []
+        for index, record in enumerate(records):
+            try:
+                if not isinstance(record, dict):
+                    raise RowValidationError("记录应为 JSON 对象")
+                transactions.append(parse_transaction(record, user_id))
+            except RowValidationError as e:
+                errors.append({'index': index, 'error': str(e)})
+        result = await self.workers.run(self.transaction_service.add_transactions_bulk, transactions)
+        return json_response({
+            'inserted': result.inserted,
+            'failed': result.failed,
+            'rejected': len(errors),
+            'elapsed': round(result.elapsed, 6),
+            'errors': errors[:100],
+            'chunk_errors': [{'chunk': chunk, 'error': message} for chunk, message in result.chunk_errors],
+        }, 201 if result.inserted else 200)
+
+    async def delete_transaction(self, request: Request) -> Response:
+        deleted = await self.workers.run(self.transaction_service.delete_transaction, int(request.params[0]))
+        if not deleted:
+            raise HTTPError(404, f"交易不存在: {request.params[0]}")
+        return Response(204)
+
+    async def query_transactions(self, request: Request):
+        from services import decode_cursor
+
+        user_id = self._user_id(request)
+        conditions = self._conditions(request)
+        cursor = request.arg('cursor')
+        if cursor is not None:
+            # 流式响应的状态码在读第一页之前就已发出，续传令牌须提前校验
+            try:
+                decode_cursor(cursor)
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+        if request.arg('stream') in ('1', 'true') or request.accepts(NDJSON):
+            limit = request.int_arg('limit', 0) or None
+            return StreamingResponse(self._stream_query(user_id, conditions, limit, cursor))
+        page = await self._page(self.query_service.query_transactions_page, user_id,
+                                request.int_arg('limit', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE), cursor, **conditions)
+        return json_response(self._page_json(page))
+
+    async def _stream_query(self, user_id: int, conditions: Dict[str, Any], limit: Optional[int],
+                            cursor: Optional[str]) -> AsyncIterator[bytes]:
+        """每页单独提交给线程池，页与页之间不占用工作线程与数据库连接"""
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = STREAM_PAGE_SIZE if remaining is None else min(STREAM_PAGE_SIZE, remaining)
+            count, data, cursor = await self._page(self._read_ndjson_page, user_id, page_size, cursor, conditions)
+            yield data
+            if remaining is not None:
+                remaining -= count
+            if cursor is None:
+                break
+
+    def _read_ndjson_page(self, user_id: int, page_size: int, cursor: Optional[str],
+                          conditions: Dict[str, Any]) -> Tuple[int, bytes, Optional[str]]:
+        page = self.query_service.query_transactions_page(user_id, page_size, cursor, **conditions)
+        return len(page.transactions), encode_ndjson(page.transactions), page.next_cursor
+
+    async def count_transactions(self, request: Request) -> Response:
+        count = await self.workers.run(partial(self.query_service.count_transactions, self._user_id(request),
+                                               **self._conditions(request)))
+        return json_response({'count': count})
+
+    async def time_range_stats(self, request: Request) -> Response:
+        start, end = self._time_range(request)
+        stats = await self.workers.run(self.stats_service.get_time_range_stats, self._user_id(request), start, end)
+        return json_response(dict(stats, start=start, end=end))
+
+    async def top_categories(self, request: Request) -> Response:
+        start, end = self._time_range(request)
+        categories = await self.workers.run(self.stats_service.get_top_categories, self._user_id(request),
+                                            request.int_arg('limit', 10, 100), start, end)
+        return json_response({'start': start, 'end': end, 'categories': categories})
+
+    async def time_series(self, request: Request) -> Response:
+        start, end = self._time_range(request)
+        granularity = request.arg('granularity', 'month')
+        if granularity not in ('day', 'week', 'month', 'year'):
+            raise HTTPError(400, f"未知的粒度: {granularity}（可选: day、week、month、year）")
+        by_category = request.arg('by_category') in ('1', 'true')
+        series = await self.workers.run(self.stats_service.get_time_series, self._user_id(request),
+                                        start, end, granularity, by_category)
+        return json_response({'start': start, 'end': end, 'granularity': granularity, 'series': series})
+
+async def serve(host: str, port: int, workers: Optional[int] = None, ready: Optional[Callable] = None):
+    """运行服务直到收到 SIGINT/SIGTERM；ready 在开始监听后以实际端口调用"""
+    app = FinanceServer(workers)
+    server = await asyncio.start_server(app.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows 或非主线程：依靠 KeyboardInterrupt 退出
+    if ready is not None:
+        ready(server.sockets[0].getsockname()[1])
+    try:
+        await stop.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        await app.close()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python server.py", description="记账本本地 HTTP/JSON 服务")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"监听地址（默认 {DEFAULT_HOST}，只接受本机连接）")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"监听端口（默认 {DEFAULT_PORT}，0 表示随机）")
+    parser.add_argument("--workers", type=int, help="执行数据库调用的线程数（默认与连接池大小一致）")
+    parser.add_argument("--db", help="数据库路径（默认取环境变量 FINANCE_DB_PATH，否则为 finance_manager.db）")
+    parser.add_argument("--profile", help="数据库性能配置（默认取环境变量 FINANCE_DB_PROFILE）")
+    parser.add_argument("--trace", action="store_true", help="开启SQL跟踪（慢查询写入 slow_queries.log）")
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers <= 0:
+        parser.error("--workers 必须为正整数")
+    # DatabaseManager 是单例，必须在第一次导入使用服务之前设置好环境变量
+    if args.db:
+        os.environ['FINANCE_DB_PATH'] = args.db
+    if args.profile:
+        os.environ['FINANCE_DB_PROFILE'] = args.profile
+    if args.trace:
+        os.environ['FINANCE_SQL_TRACE'] = '1'
+    if os.environ.get('FINANCE_DB_PROFILE'):
+        # 在启动前校验性能配置名，未知的配置作为参数错误报告，而不是在第一次请求时抛出
+        from database import resolve_profile
+        try:
+            resolve_profile()
+        except ValueError as e:
+            parser.error(str(e))
+
+    def ready(port: int):
+        print(f"记账本服务已启动: http://{args.host}:{port}（Ctrl+C 退出）", file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,98 @@
 from database import DatabaseManager
-from models import User, Transaction, TransactionType, Category
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any, Tuple
+from cache import data_versions, stats_cache, VersionedLRUCache
+from events import TransactionChange, transaction_changes
+from models import (
+    User, Transaction, TransactionType, Category, BulkInsertResult, TransactionPage,
+    TransactionBatch, decode_transaction_row, to_cents, from_cents, to_epoch
+)
+from datetime import date, datetime, timedelta, time as time_of_day
+from typing import List, Optional, Dict, Any, Tuple, Iterable, Iterator
+from itertools import islice
+import base64
+import json
 import sqlite3
+import time
+
+def _invalidate_user_caches(change: TransactionChange):
+    # 缓存按用户数据版本判断是否过期；同步订阅，变更发布后缓存立即失效
+    data_versions.bump(change.user_id)
+
+transaction_changes.subscribe(_invalidate_user_caches)
+
+TRANSACTION_COLUMNS = ("id, user_id, from_user, to_user, amount_cents, transaction_type, category, description, "
+                       "transaction_epoch, tz_offset")
+
+def encode_cursor(transaction_epoch: int, transaction_id: int) -> str:
+    """把分页位置 (transaction_epoch, id) 编码为不透明的续传令牌"""
+    raw = json.dumps([transaction_epoch, transaction_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """解析续传令牌，令牌无效时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        transaction_epoch, transaction_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"无效的分页令牌: {cursor!r}") from e
+    if not isinstance(transaction_epoch, int) or not isinstance(transaction_id, int):
+        raise ValueError(f"无效的分页令牌: {cursor!r}")
+    return transaction_epoch, transaction_id
+
+def like_pattern(text: str) -> str:
+    """子串匹配的 LIKE 模式；转义 % 与 _，须配合 ESCAPE '\\' 使用"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+def build_match_expression(search_text: str) -> Optional[str]:
+    """把用户输入转换为 FTS5 MATCH 表达式
+
+    每个词作为带引号的短语并加 * 做前缀匹配，词之间为 AND 关系；
+    引号转义后用户输入中的 FTS 语法字符不会被解释。
+    """
+    terms = [term.replace('"', '""') for term in search_text.split()]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+def _page_query(where: str, params: list, page_size: int,
+                cursor: Optional[str] = None) -> Tuple[str, list]:
+    """构造按 (transaction_epoch, id) 倒序的键集分页查询
+
+    续传条件只依赖上一页最后一行的排序键，新插入的记录不会导致翻页时重复或遗漏。
+    """
+    if page_size <= 0:
+        raise ValueError("page_size 必须为正数")
+    query = f"SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE {where}"
+    params = list(params)
+    if cursor:
+        query += " AND (transaction_epoch, id) < (?, ?)"
+        params.extend(decode_cursor(cursor))
+    # 多取一行用于判断是否还有下一页
+    query += " ORDER BY transaction_epoch DESC, id DESC LIMIT ?"
+    params.append(page_size + 1)
+    return query, params
+
+def _fetch_transaction_page(db: DatabaseManager, where: str, params: list,
+                            page_size: int, cursor: Optional[str] = None) -> TransactionPage:
+    query, params = _page_query(where, params, page_size, cursor)
+    with db.connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+    
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1][8], rows[-1][0])
+    return TransactionPage([decode_transaction_row(row) for row in rows], next_cursor)
+
+def _iter_transaction_pages(db: DatabaseManager, where: str, params: list,
+                            page_size: int, cursor: Optional[str] = None) -> Iterator[TransactionPage]:
+    while True:
+        page = _fetch_transaction_page(db, where, params, page_size, cursor)
+        if page.transactions:
+            yield page
+        if not page.has_more:
+            return
+        cursor = page.next_cursor
 
 class UserService:
     def __init__(self):
@@ -10,42 +100,38 @@ class UserService:
     
     def register_user(self, username: str, password: str, email: str = "") -> Optional[User]:
         """用户注册"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            password_hash = self.db.hash_password(password)
-            cursor.execute(
-                "INSERT INTO users (username, password_hash, email) VALUES (?, ?, ?)",
-                (username, password_hash, email)
-            )
-            user_id = cursor.lastrowid#获取刚刚插入记录的自增ID（获取新用户ID）
-            conn.commit()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
             
-            return User(
-                id=user_id,
-                username=username,
-                email=email,
-                created_at=datetime.now()
-            )#返回User对象
-        except sqlite3.IntegrityError:
-            return None
-        finally:
-            conn.close()
+            try:
+                password_hash = self.db.hash_password(password)
+                cursor.execute(
+                    "INSERT INTO users (username, password_hash, email) VALUES (?, ?, ?)",
+                    (username, password_hash, email)
+                )
+                user_id = cursor.lastrowid#获取刚刚插入记录的自增ID（获取新用户ID）
+                conn.commit()
+                
+                return User(
+                    id=user_id,
+                    username=username,
+                    email=email,
+                    created_at=datetime.now()
+                )#返回User对象
+            except sqlite3.IntegrityError:
+                return None
     
     def login_user(self, username: str, password: str) -> Optional[User]:
         """用户登录"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
         password_hash = self.db.hash_password(password)
-        cursor.execute(
-            "SELECT id, username, email, created_at FROM users WHERE username = ? AND password_hash = ?",
-            (username, password_hash)
-        )
-        
-        result = cursor.fetchone()#查询结果处理
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, username, email, created_at FROM users WHERE username = ? AND password_hash = ?",
+                (username, password_hash)
+            )
+            
+            result = cursor.fetchone()#查询结果处理
         
         if result:
             return User(
@@ -58,147 +144,378 @@ class UserService:
     
     def user_exists(self, username: str) -> bool:
         """检查用户是否存在"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM users WHERE username = ?", (username,))
-        exists = cursor.fetchone() is not None
-        conn.close()
-        return exists
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM users WHERE username = ?", (username,))
+            return cursor.fetchone() is not None
+    
+    def get_user_by_username(self, username: str) -> Optional[User]:
+        """按用户名获取用户（不校验密码，供命令行等本地工具使用）"""
+        with self.db.connection() as conn:
+            result = conn.execute(
+                "SELECT id, username, email, created_at FROM users WHERE username = ?", (username,)
+            ).fetchone()
+        
+        if result:
+            return User(
+                id=result[0],
+                username=result[1],
+                email=result[2],
+                created_at=datetime.fromisoformat(result[3])
+            )
+        return None
 
 class TransactionService:
+    INSERT_SQL = '''
+        INSERT INTO transactions 
+        (user_id, from_user, to_user, amount, amount_cents, transaction_type, category, description,
+         transaction_time, transaction_epoch, tz_offset, from_party_id, to_party_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    
     def __init__(self):
         self.db = DatabaseManager()
     
-    def add_transaction(self, transaction: Transaction) -> bool:
-        """添加交易"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
+    def add_transaction(self, transaction: Transaction) -> Optional[Transaction]:
+        """添加交易，返回写入后的交易（带ID，金额与时间与从库中读出的一致），失败时返回 None"""
         try:
-            cursor.execute('''
-                INSERT INTO transactions 
-                (user_id, from_user, to_user, amount, transaction_type, category, description, transaction_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                transaction.user_id,
-                transaction.from_user,
-                transaction.to_user,
-                transaction.amount,
-                transaction.transaction_type.value,
-                transaction.category.value,
-                transaction.description,
-                transaction.transaction_time.isoformat()
-            ))
-            conn.commit()
-            return True
+            with self.db.connection() as conn:
+                party_ids, new_parties = self._resolve_counterparties(
+                    conn, [transaction.from_user, transaction.to_user])
+                params = self._insert_params(transaction, party_ids)
+                cursor = conn.cursor()
+                cursor.execute(self.INSERT_SQL, params)
+                conn.commit()
+            self._remember_counterparties(new_parties)
+            saved = decode_transaction_row((cursor.lastrowid,) + params[:3] + params[4:8] + params[9:11])
         except Exception as e:
             print(f"Error adding transaction: {e}")
-            return False
-        finally:
-            conn.close()
+            return None
+        transaction_changes.publish(TransactionChange.for_transactions(transaction.user_id, inserted=(saved,)))
+        return saved
     
-    def get_user_transactions(self, user_id: int, limit: int = 100) -> List[Transaction]:
-        """获取用户交易记录"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, user_id, from_user, to_user, amount, transaction_type, category, description, transaction_time
-            FROM transactions 
-            WHERE user_id = ? 
-            ORDER BY transaction_time DESC 
-            LIMIT ?
-        ''', (user_id, limit))
-        
-        transactions = []
-        for row in cursor.fetchall():
-            transactions.append(Transaction(
-                id=row[0],
-                user_id=row[1],
-                from_user=row[2],
-                to_user=row[3],
-                amount=row[4],
-                transaction_type=TransactionType(row[5]),
-                category=Category(row[6]),
-                description=row[7],
-                transaction_time=datetime.fromisoformat(row[8])
+    def add_transactions_bulk(self, transactions: Iterable[Transaction],
+                              chunk_size: int = 1000) -> BulkInsertResult:
+        """批量添加交易
+
+        接受任意可迭代对象（包括生成器），每 chunk_size 条用一次 executemany
+        写入并提交；某个分块失败时只回滚该分块，记录错误后继续后续分块。
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size 必须为正数")
+        result = BulkInsertResult()
+        started = time.perf_counter()
+        iterator = iter(transactions)
+        with self.db.connection() as conn:
+            while True:
+                transactions_chunk = list(islice(iterator, chunk_size))
+                if not transactions_chunk:
+                    break
+                try:
+                    names = [name for t in transactions_chunk for name in (t.from_user, t.to_user)]
+                    party_ids, new_parties = self._resolve_counterparties(conn, names)
+                    chunk = [self._insert_params(t, party_ids) for t in transactions_chunk]
+                    conn.executemany(self.INSERT_SQL, chunk)
+                    # 写锁在整个分块内持有，同一分块的自增ID是连续的
+                    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    conn.commit()
+                    self._remember_counterparties(new_parties)
+                    result.inserted += len(chunk)
+                    self._publish_bulk_changes(chunk, last_id - len(chunk) + 1)
+                except (sqlite3.Error, OverflowError) as e:
+                    # OverflowError：金额换算成分后超出 SQLite 整数范围
+                    conn.rollback()
+                    result.failed += len(transactions_chunk)
+                    result.chunk_errors.append((result.chunks, str(e)))
+                result.chunks += 1
+        result.elapsed = time.perf_counter() - started
+        return result
+    
+    @staticmethod
+    def _publish_bulk_changes(chunk: List[tuple], first_id: int):
+        """按用户发布一个分块的变更（只有ID、时间范围与分类，不携带完整交易）"""
+        changes: Dict[int, dict] = {}
+        for transaction_id, params in enumerate(chunk, start=first_id):
+            change = changes.setdefault(params[0], {'ids': [], 'epochs': [], 'categories': set()})
+            change['ids'].append(transaction_id)
+            change['epochs'].append(params[9])
+            change['categories'].add(params[6])
+        for user_id, change in changes.items():
+            transaction_changes.publish(TransactionChange(
+                user_id=user_id,
+                inserted_ids=tuple(change['ids']),
+                inserted_count=len(change['ids']),
+                start_epoch=min(change['epochs']),
+                end_epoch=max(change['epochs']),
+                categories=frozenset(change['categories']),
+                complete=False,
             ))
-        
-        conn.close()
-        return transactions
+    
+    @staticmethod
+    def _insert_params(transaction: Transaction, party_ids: Dict[str, int]) -> tuple:
+        amount_cents = to_cents(transaction.amount)
+        epoch, offset = to_epoch(transaction.transaction_time)
+        return (
+            transaction.user_id,
+            transaction.from_user,
+            transaction.to_user,
+            amount_cents / 100,  # 兼容旧读取方的 amount 列
+            amount_cents,
+            transaction.transaction_type.value,
+            transaction.category.value,
+            transaction.description,
+            transaction.transaction_time.isoformat(),  # 兼容旧读取方的时间文本
+            epoch,
+            offset,
+            party_ids[transaction.from_user],
+            party_ids[transaction.to_user]
+        )
+    
+    def _resolve_counterparties(self, conn, names: List[str]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """把交易方名称解析为ID，字典中没有的名称在当前事务中插入
+
+        返回 (全部名称的映射, 本次新解析的映射)；后者须在提交成功后
+        通过 _remember_counterparties 写入进程内缓存，避免缓存被回滚的ID。
+        """
+        cache = self.db.counterparty_ids
+        with self.db.counterparty_lock:
+            resolved = {name: cache[name] for name in names if name in cache}
+        missing = list({name for name in names if name not in resolved})
+        new_parties = {}
+        if missing:
+            conn.executemany("INSERT OR IGNORE INTO counterparties (name) VALUES (?)",
+                             [(name,) for name in missing])
+            # 分批查询，避免超过 SQLite 的参数个数上限
+            for start in range(0, len(missing), 500):
+                batch = missing[start:start + 500]
+                placeholders = ", ".join("?" * len(batch))
+                new_parties.update(conn.execute(
+                    f"SELECT name, id FROM counterparties WHERE name IN ({placeholders})", batch
+                ).fetchall())
+            resolved.update(new_parties)
+        return resolved, new_parties
+    
+    def _remember_counterparties(self, new_parties: Dict[str, int]):
+        if new_parties:
+            with self.db.counterparty_lock:
+                self.db.counterparty_ids.update(new_parties)
+    
+    def get_user_transactions(self, user_id: int, limit: Optional[int] = 100) -> List[Transaction]:
+        """获取用户最近的交易记录，limit 为 None 时返回全部"""
+        if limit is None:
+            return list(self.iter_user_transactions(user_id))
+        return self.get_transactions_page(user_id, page_size=limit).transactions
+    
+    def get_transactions_page(self, user_id: int, page_size: int = 100,
+                              cursor: Optional[str] = None) -> TransactionPage:
+        """按时间倒序分页获取交易记录，cursor 为上一页返回的 next_cursor"""
+        return _fetch_transaction_page(self.db, "user_id = ?", [user_id], page_size, cursor)
+    
+    def iter_user_transactions(self, user_id: int, page_size: int = 500,
+                               cursor: Optional[str] = None) -> Iterator[Transaction]:
+        """逐条产出用户的全部交易记录，内部按页读取"""
+        for page in _iter_transaction_pages(self.db, "user_id = ?", [user_id], page_size, cursor):
+            yield from page.transactions
     
     def delete_transaction(self, transaction_id: int) -> bool:
         """删除交易"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
-            conn.commit()
-            return cursor.rowcount > 0
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE id = ?", (transaction_id,))
+                row = cursor.fetchone()
+                if row is None:
+                    return False
+                cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
+                conn.commit()
+                deleted = cursor.rowcount > 0
+            if deleted:
+                removed = decode_transaction_row(row)
+                transaction_changes.publish(TransactionChange.for_transactions(removed.user_id, deleted=(removed,)))
+            return deleted
         except Exception as e:
             print(f"Error deleting transaction: {e}")
             return False
-        finally:
-            conn.close()
 
 class QueryService:
     def __init__(self):
         self.db = DatabaseManager()
     
     def query_transactions(self, user_id: int, **conditions) -> List[Transaction]:
-        """通用交易查询"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+        """通用交易查询
+
+        传入 search_text 时按全文检索相关度排序（相关度相同再按时间倒序），
+        其余情况按时间倒序。
+        """
+        search_text = conditions.get('search_text')
+        match = build_match_expression(search_text) if search_text else None
+        if match and self.db.fts_enabled:
+            other_conditions = {k: v for k, v in conditions.items() if k != 'search_text'}
+            where, params = self._build_conditions(user_id, other_conditions)
+            query = f'''
+                SELECT {TRANSACTION_COLUMNS}
+                FROM (SELECT rowid, rank FROM transactions_fts WHERE transactions_fts MATCH ?) AS matched
+                JOIN transactions ON transactions.id = matched.rowid
+                WHERE {where}
+                ORDER BY matched.rank, transaction_epoch DESC, id DESC
+            '''
+            params = [match] + params
+        else:
+            where, params = self._build_conditions(user_id, conditions)
+            query = f"SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE {where}"
+            query += " ORDER BY transaction_epoch DESC, id DESC"
+        
+        with self.db.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
         
-        query = '''
-            SELECT id, user_id, from_user, to_user, amount, transaction_type, category, description, transaction_time
-            FROM transactions 
-            WHERE user_id = ?
-        '''
+        return [decode_transaction_row(row) for row in rows]
+    
+    def query_transactions_batch(self, user_id: int, **conditions) -> TransactionBatch:
+        """按时间倒序查询，结果以列式 TransactionBatch 返回，行对象按需构造"""
+        where, params = self._build_conditions(user_id, conditions)
+        query = f"SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE {where}"
+        query += " ORDER BY transaction_epoch DESC, id DESC"
+        
+        with self.db.connection() as conn:
+            # 直接消费游标，不先生成完整的行列表
+            return TransactionBatch.from_rows(conn.execute(query, params))
+    
+    def query_transactions_page(self, user_id: int, page_size: int = 100,
+                                cursor: Optional[str] = None, **conditions) -> TransactionPage:
+        """分页查询，条件同 query_transactions"""
+        where, params = self._build_conditions(user_id, conditions)
+        return _fetch_transaction_page(self.db, where, params, page_size, cursor)
+    
+    def iter_transactions(self, user_id: int, page_size: int = 500,
+                          cursor: Optional[str] = None, **conditions) -> Iterator[Transaction]:
+        """逐条产出查询结果，内部按页读取，不会一次性加载全部结果"""
+        where, params = self._build_conditions(user_id, conditions)
+        for page in _iter_transaction_pages(self.db, where, params, page_size, cursor):
+            yield from page.transactions
+    
+    def count_transactions(self, user_id: int, **conditions) -> int:
+        """统计满足条件的记录数"""
+        where, params = self._build_conditions(user_id, conditions)
+        with self.db.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM transactions WHERE {where}", params).fetchone()[0]
+    
+    def _counterparty_subquery(self, name: str) -> Tuple[str, list]:
+        """返回按名称子串查找交易方ID的子查询"""
+        # 三元组索引只能匹配不少于3个字符的子串，更短的输入直接扫描交易方字典
+        if self.db.trigram_enabled and len(name) >= 3:
+            return ("SELECT rowid FROM counterparties_trigram WHERE counterparties_trigram MATCH ?",
+                    ['"' + name.replace('"', '""') + '"'])
+        return "SELECT id FROM counterparties WHERE name LIKE ? ESCAPE '\\'", [like_pattern(name)]
+    
+    def _build_conditions(self, user_id: int, conditions: Dict[str, Any]) -> Tuple[str, list]:
+        where = "user_id = ?"
         params = [user_id]
         
-        # 构建查询条件
+        # 全文检索：描述、付款方、收款方，支持前缀匹配
+        if 'search_text' in conditions and conditions['search_text']:
+            match = build_match_expression(conditions['search_text'])
+            if match and self.db.fts_enabled:
+                where += " AND id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)"
+                params.append(match)
+            else:
+                for term in conditions['search_text'].split():
+                    where += (" AND (description LIKE ? ESCAPE '\\' OR from_user LIKE ? ESCAPE '\\'"
+                              " OR to_user LIKE ? ESCAPE '\\')")
+                    params.extend([like_pattern(term)] * 3)
+        
+        # 构建查询条件：交易方先在交易方字典中做子串匹配，再按ID过滤交易
         if 'target_user' in conditions and conditions['target_user']:
-            query += " AND (from_user LIKE ? OR to_user LIKE ?)"
-            params.extend([f"%{conditions['target_user']}%", f"%{conditions['target_user']}%"])
+            party_query, party_params = self._counterparty_subquery(conditions['target_user'])
+            where += f" AND (from_party_id IN ({party_query}) OR to_party_id IN ({party_query}))"
+            params.extend(party_params * 2)
         
         if 'start_time' in conditions and conditions['start_time']:
-            query += " AND transaction_time >= ?"
-            params.append(conditions['start_time'].isoformat())
+            where += " AND transaction_epoch >= ?"
+            params.append(to_epoch(conditions['start_time'])[0])
         
         if 'end_time' in conditions and conditions['end_time']:
-            query += " AND transaction_time <= ?"
-            params.append(conditions['end_time'].isoformat())
+            where += " AND transaction_epoch <= ?"
+            params.append(to_epoch(conditions['end_time'])[0])
         
         if 'transaction_type' in conditions and conditions['transaction_type']:
-            query += " AND transaction_type = ?"
+            where += " AND transaction_type = ?"
             params.append(conditions['transaction_type'].value)
         
         if 'category' in conditions and conditions['category']:
-            query += " AND category = ?"
+            where += " AND category = ?"
             params.append(conditions['category'].value)
         
-        query += " ORDER BY transaction_time DESC"
-        
-        cursor.execute(query, params)
-        
-        transactions = []
-        for row in cursor.fetchall():
-            transactions.append(Transaction(
-                id=row[0],
-                user_id=row[1],
-                from_user=row[2],
-                to_user=row[3],
-                amount=row[4],
-                transaction_type=TransactionType(row[5]),
-                category=Category(row[6]),
-                description=row[7],
-                transaction_time=datetime.fromisoformat(row[8])
-            ))
-        
-        conn.close()
-        return transactions
+        return where, params
+
+def _local_time(value: datetime) -> datetime:
+    """带时区的时间换算为本机本地时间（不带时区），与汇总表的日期划分一致"""
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo is not None else value
+
+def _summary_segments(start_time: datetime, end_time: datetime, use_months: bool = True):
+    """把闭区间 [start_time, end_time] 拆分为可由汇总表回答的部分
+
+    返回 (raw, days, months)：
+    raw 为首尾不足一整天的原始行区间 [(下界, 上界, 上界是否闭合)]，以 UTC 时间戳表示；
+    days 为不构成整月的整日区间 [(首日, 末日)]；months 为整月区间 [(首月, 末月)]。
+    use_months 为 False 时不使用月度汇总，全部整日都放在 days 中。
+    日期均为本机时区的日期，与汇总表相同，整日部分与 raw 恰好互补。
+    """
+    start_time, end_time = _local_time(start_time), _local_time(end_time)
+    if end_time < start_time:
+        return [], [], []
+    first_day = start_time.date() if start_time.time() == time_of_day.min else start_time.date() + timedelta(days=1)
+    last_day = end_time.date() if end_time.time() == time_of_day.max else end_time.date() - timedelta(days=1)
+    if first_day > last_day:
+        return [(to_epoch(start_time)[0], to_epoch(end_time)[0], True)], [], []
+    
+    raw = []
+    if start_time.time() != time_of_day.min:
+        first_midnight = datetime.combine(first_day, time_of_day.min)
+        raw.append((to_epoch(start_time)[0], to_epoch(first_midnight)[0], False))
+    if end_time.time() != time_of_day.max:
+        last_midnight = datetime.combine(last_day + timedelta(days=1), time_of_day.min)
+        raw.append((to_epoch(last_midnight)[0], to_epoch(end_time)[0], True))
+    
+    # 完整包含在 [first_day, last_day] 内的月份
+    month_start = first_day if first_day.day == 1 else (first_day.replace(day=1) + timedelta(days=32)).replace(day=1)
+    after_last = last_day + timedelta(days=1)
+    month_end = last_day if after_last.day == 1 else last_day.replace(day=1) - timedelta(days=1)
+    if not use_months or month_start > month_end:
+        return raw, [(first_day.isoformat(), last_day.isoformat())], []
+    
+    days = []
+    if first_day < month_start:
+        days.append((first_day.isoformat(), (month_start - timedelta(days=1)).isoformat()))
+    if month_end < last_day:
+        days.append(((month_end + timedelta(days=1)).isoformat(), last_day.isoformat()))
+    months = [(month_start.strftime('%Y-%m'), month_end.strftime('%Y-%m'))]
+    return raw, days, months
+
+# 时间序列分桶：以桶内第一天（YYYY-MM-DD）作为桶的键；{d} 为某一天的日期文本
+TIME_SERIES_BUCKETS = {
+    'day': "{d}",
+    'week': "date({d}, 'weekday 0', '-6 days')",  # 周一开始
+    'month': "strftime('%Y-%m-01', {d})",
+    'year': "strftime('%Y-01-01', {d})",
+}
+
+def _bucket_start(day: date, granularity: str) -> date:
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+def _next_bucket(bucket: date, granularity: str) -> date:
+    if granularity == 'week':
+        return bucket + timedelta(days=7)
+    if granularity == 'month':
+        return (bucket + timedelta(days=32)).replace(day=1)
+    if granularity == 'year':
+        return bucket.replace(year=bucket.year + 1)
+    return bucket + timedelta(days=1)
 
 class StatisticsService:
     def __init__(self):
@@ -206,79 +523,301 @@ class StatisticsService:
     
     def get_time_range_stats(self, user_id: int, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
         """获取时间段统计"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        # 总收入、总支出
-        cursor.execute('''
-            SELECT 
-                SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END) as total_income,
-                SUM(CASE WHEN transaction_type = 'expense' THEN amount ELSE 0 END) as total_expense,
-                COUNT(*) as transaction_count
-            FROM transactions 
-            WHERE user_id = ? AND transaction_time BETWEEN ? AND ?
-        ''', (user_id, start_time.isoformat(), end_time.isoformat()))
+        with self.db.connection() as conn:
+            rows = self._aggregate_range(conn, user_id, start_time, end_time)
         
-        result = cursor.fetchone()
-        total_income = result[0] or 0
-        total_expense = result[1] or 0
-        transaction_count = result[2] or 0
+        # 全程用整数分累加，最后再转换为 Decimal
+        income_cents = 0
+        expense_cents = 0
+        transaction_count = 0
+        category_cents: Dict[str, int] = {}
+        for transaction_type, category, cents, count in rows:
+            if transaction_type == TransactionType.INCOME.value:
+                income_cents += cents
+            elif transaction_type == TransactionType.EXPENSE.value:
+                expense_cents += cents
+            transaction_count += count
+            category_cents[category] = category_cents.get(category, 0) + cents
         
         # 分类统计
-        cursor.execute('''
-            SELECT category, SUM(amount) as category_amount
-            FROM transactions 
-            WHERE user_id = ? AND transaction_time BETWEEN ? AND ?
-            GROUP BY category
-            ORDER BY category_amount DESC
-        ''', (user_id, start_time.isoformat(), end_time.isoformat()))
-        
         category_breakdown = []
-        for row in cursor.fetchall():
+        for category, cents in sorted(category_cents.items(), key=lambda item: item[1], reverse=True):
             category_breakdown.append({
-                'category': row[0],
-                'amount': row[1]
+                'category': category,
+                'amount': from_cents(cents)
             })
         
-        conn.close()
-        
         return {
-            'total_income': total_income,
-            'total_expense': total_expense,
-            'net_amount': total_income - total_expense,
+            'total_income': from_cents(income_cents),
+            'total_expense': from_cents(expense_cents),
+            'net_amount': from_cents(income_cents - expense_cents),
             'transaction_count': transaction_count,
             'category_breakdown': category_breakdown
         }
     
+    @staticmethod
+    def apply_changes(stats: Dict[str, Any], start_time: datetime, end_time: datetime,
+                      inserted: Iterable[Transaction] = (), deleted: Iterable[Transaction] = ()) -> Dict[str, Any]:
+        """在 get_time_range_stats 的结果上增减交易，返回新的统计（不重新查询）
+
+        只计入时间落在 [start_time, end_time] 内的交易。
+        """
+        lower, upper = to_epoch(start_time)[0], to_epoch(end_time)[0]
+        income_cents = to_cents(stats['total_income'])
+        expense_cents = to_cents(stats['total_expense'])
+        transaction_count = stats['transaction_count']
+        category_cents = {item['category']: to_cents(item['amount']) for item in stats['category_breakdown']}
+        for sign, transactions in ((1, inserted), (-1, deleted)):
+            for transaction in transactions:
+                if not lower <= to_epoch(transaction.transaction_time)[0] <= upper:
+                    continue
+                cents = sign * to_cents(transaction.amount)
+                if transaction.transaction_type == TransactionType.INCOME:
+                    income_cents += cents
+                else:
+                    expense_cents += cents
+                transaction_count += sign
+                category = transaction.category.value
+                category_cents[category] = category_cents.get(category, 0) + cents
+        
+        return {
+            'total_income': from_cents(income_cents),
+            'total_expense': from_cents(expense_cents),
+            'net_amount': from_cents(income_cents - expense_cents),
+            'transaction_count': transaction_count,
+            'category_breakdown': [
+                {'category': category, 'amount': from_cents(cents)}
+                for category, cents in sorted(category_cents.items(), key=lambda item: item[1], reverse=True)
+                if cents
+            ]
+        }
+    
     def get_top_categories(self, user_id: int, limit: int = 10, 
                           start_time: datetime = None, end_time: datetime = None) -> List[Dict[str, Any]]:
         """获取顶级分类"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        query = '''
-            SELECT category, SUM(amount) as total_amount, COUNT(*) as count
-            FROM transactions 
-            WHERE user_id = ? AND transaction_type = 'expense'
-        '''
-        params = [user_id]
-        
-        if start_time and end_time:
-            query += " AND transaction_time BETWEEN ? AND ?"
-            params.extend([start_time.isoformat(), end_time.isoformat()])
-        
-        query += " GROUP BY category ORDER BY total_amount DESC LIMIT ?"
-        params.append(limit)
-        
-        cursor.execute(query, params)
+        with self.db.connection() as conn:
+            if start_time and end_time:
+                rows = self._aggregate_range(conn, user_id, start_time, end_time,
+                                             TransactionType.EXPENSE.value)
+                rows = sorted(((category, amount, count) for _, category, amount, count in rows),
+                              key=lambda row: row[1], reverse=True)[:limit]
+            else:
+                # 不限时间时直接汇总月度表
+                rows = conn.execute('''
+                    SELECT category, SUM(total_cents) as total_cents, SUM(transaction_count) as count
+                    FROM monthly_summaries
+                    WHERE user_id = ? AND transaction_type = 'expense'
+                    GROUP BY category ORDER BY total_cents DESC LIMIT ?
+                ''', (user_id, limit)).fetchall()
         
         top_categories = []
-        for row in cursor.fetchall():
+        for row in rows:
             top_categories.append({
                 'category': row[0],
-                'amount': row[1],
+                'amount': from_cents(row[1]),
                 'count': row[2]
             })
         
-        conn.close()
-        return top_categories
\ No newline at end of file
+        return top_categories
+    
+    def _aggregate_range(self, conn, user_id: int, start_time: datetime, end_time: datetime,
+                         transaction_type: Optional[str] = None) -> List[tuple]:
+        """按 (类型, 分类) 汇总时间段内的金额（整数分）与笔数"""
+        query, params = self._aggregate_range_query(user_id, start_time, end_time, transaction_type)
+        if not query:
+            return []
+        return conn.execute(query, params).fetchall()
+    
+    @staticmethod
+    def _aggregate_range_query(user_id: int, start_time: datetime, end_time: datetime,
+                               transaction_type: Optional[str] = None) -> Tuple[Optional[str], list]:
+        """整月部分读月度汇总表，其余整日部分读日汇总表，只有首尾不足一天的
+        部分读交易表，各部分在一条 UNION ALL 查询中合并；区间为空时查询为 None
+        """
+        raw, days, months = _summary_segments(start_time, end_time)
+        type_filter = " AND transaction_type = ?" if transaction_type else ""
+        type_params = [transaction_type] if transaction_type else []
+        parts = []
+        params = []
+        for lower, upper, upper_closed in raw:
+            parts.append(f'''
+                SELECT transaction_type, category, SUM(amount_cents) AS cents, COUNT(*) AS cnt
+                FROM transactions
+                WHERE user_id = ? AND transaction_epoch >= ? AND transaction_epoch {'<=' if upper_closed else '<'} ?{type_filter}
+                GROUP BY transaction_type, category
+            ''')
+            params.extend([user_id, lower, upper, *type_params])
+        for table, bucket, ranges in (('daily_summaries', 'day', days), ('monthly_summaries', 'month', months)):
+            for lower, upper in ranges:
+                parts.append(f'''
+                    SELECT transaction_type, category, SUM(total_cents) AS cents, SUM(transaction_count) AS cnt
+                    FROM {table}
+                    WHERE user_id = ? AND {bucket} BETWEEN ? AND ?{type_filter}
+                    GROUP BY transaction_type, category
+                ''')
+                params.extend([user_id, lower, upper, *type_params])
+        if not parts:
+            return None, []
+        query = (
+            "SELECT transaction_type, category, SUM(cents), SUM(cnt) FROM ("
+            + " UNION ALL ".join(parts)
+            + ") GROUP BY transaction_type, category"
+        )
+        return query, params
+    
+    def get_time_series(self, user_id: int, start_time: datetime, end_time: datetime,
+                        granularity: str = 'month', by_category: bool = False) -> List[Dict[str, Any]]:
+        """按天/周/月/年分桶统计收支
+
+        返回按时间排列的桶列表，没有交易的桶也会返回（金额为 0），可直接用于绘图。
+        每个桶包含 period（桶内第一天）、income、expense、net、count；
+        by_category 为 True 时另含 categories：{分类: 金额}。
+        首尾的桶只统计落在 [start_time, end_time] 内的交易；带时区的时间先换算为本机本地时间，桶按本机时区的日期划分。
+        """
+        if granularity not in TIME_SERIES_BUCKETS:
+            raise ValueError(f"未知的时间粒度: {granularity}（可选: {', '.join(TIME_SERIES_BUCKETS)}）")
+        start_time, end_time = _local_time(start_time), _local_time(end_time)
+        if end_time < start_time:
+            return []
+        query, params = self._time_series_query(user_id, start_time, end_time, granularity, by_category)
+        with self.db.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        # 先按整数分累加，补齐空桶后再转换为 Decimal
+        buckets: Dict[date, Dict[str, Any]] = {}
+        period = _bucket_start(start_time.date(), granularity)
+        while period <= end_time.date():
+            buckets[period] = {'income': 0, 'expense': 0, 'count': 0, 'categories': {}}
+            period = _next_bucket(period, granularity)
+        for period_text, transaction_type, category, cents, count in rows:
+            # 各部分都按本机时区的日期分桶，不会落在区间之外；防御性地补建桶而不是丢弃数据
+            bucket = buckets.setdefault(date.fromisoformat(period_text),
+                                        {'income': 0, 'expense': 0, 'count': 0, 'categories': {}})
+            if transaction_type == TransactionType.INCOME.value:
+                bucket['income'] += cents
+            elif transaction_type == TransactionType.EXPENSE.value:
+                bucket['expense'] += cents
+            bucket['count'] += count
+            if by_category:
+                bucket['categories'][category] = bucket['categories'].get(category, 0) + cents
+        
+        series = []
+        for period, bucket in sorted(buckets.items()):
+            point = {
+                'period': period,
+                'income': from_cents(bucket['income']),
+                'expense': from_cents(bucket['expense']),
+                'net': from_cents(bucket['income'] - bucket['expense']),
+                'count': bucket['count'],
+            }
+            if by_category:
+                point['categories'] = {category: from_cents(cents)
+                                       for category, cents in sorted(bucket['categories'].items())}
+            series.append(point)
+        return series
+    
+    @staticmethod
+    def _time_series_query(user_id: int, start_time: datetime, end_time: datetime,
+                           granularity: str, by_category: bool) -> Tuple[str, list]:
+        """各时间段先产出 (日期, 类型, 分类, 金额, 笔数)，再在外层按桶分组
+
+        按月/年分桶时整月读月度汇总表，按天/周分桶时整日都读日汇总表，
+        首尾不足一天的部分读交易表（走覆盖索引）。
+        """
+        raw, days, months = _summary_segments(start_time, end_time,
+                                              use_months=granularity in ('month', 'year'))
+        parts = []
+        params = []
+        for lower, upper, upper_closed in raw:
+            parts.append(f'''
+                SELECT date(transaction_epoch, 'unixepoch', 'localtime') AS d, transaction_type, category,
+                       SUM(amount_cents) AS cents, COUNT(*) AS cnt
+                FROM transactions
+                WHERE user_id = ? AND transaction_epoch >= ? AND transaction_epoch {'<=' if upper_closed else '<'} ?
+                GROUP BY 1, 2, 3
+            ''')
+            params.extend([user_id, lower, upper])
+        for lower, upper in days:
+            parts.append('''
+                SELECT day AS d, transaction_type, category, total_cents AS cents, transaction_count AS cnt
+                FROM daily_summaries
+                WHERE user_id = ? AND day BETWEEN ? AND ?
+            ''')
+            params.extend([user_id, lower, upper])
+        for lower, upper in months:
+            parts.append('''
+                SELECT month || '-01' AS d, transaction_type, category, total_cents AS cents, transaction_count AS cnt
+                FROM monthly_summaries
+                WHERE user_id = ? AND month BETWEEN ? AND ?
+            ''')
+            params.extend([user_id, lower, upper])
+        
+        bucket = TIME_SERIES_BUCKETS[granularity].format(d='d')
+        if by_category:
+            select, group_by = "category", "1, 2, 3"
+        else:
+            select, group_by = "NULL", "1, 2"
+        query = (
+            f"SELECT {bucket}, transaction_type, {select}, SUM(cents), SUM(cnt) FROM ("
+            + " UNION ALL ".join(parts)
+            + f") GROUP BY {group_by} ORDER BY 1"
+        )
+        return query, params
+    
+    def rebuild_summaries(self):
+        """重建日/月汇总表"""
+        self.db.rebuild_summaries()
+        data_versions.bump_all()
+
+class CachedStatisticsService(StatisticsService):
+    """带结果缓存的统计服务
+
+    结果按 (用户, 查询类型, 时间范围) 缓存，用户数据版本变化（增删交易）后自动失效。
+    """
+    
+    def __init__(self, cache: Optional[VersionedLRUCache] = None):
+        super().__init__()
+        self.cache = cache or stats_cache
+    
+    def get_time_range_stats(self, user_id: int, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
+        """获取时间段统计（缓存）"""
+        key = ('range', start_time.isoformat(), end_time.isoformat())
+        return self.cache.get_or_compute(
+            user_id, key, lambda: super(CachedStatisticsService, self).get_time_range_stats(user_id, start_time, end_time)
+        )
+    
+    def get_top_categories(self, user_id: int, limit: int = 10, 
+                          start_time: datetime = None, end_time: datetime = None) -> List[Dict[str, Any]]:
+        """获取顶级分类（缓存）"""
+        key = ('top_categories', limit,
+               start_time.isoformat() if start_time else None,
+               end_time.isoformat() if end_time else None)
+        return self.cache.get_or_compute(
+            user_id, key,
+            lambda: super(CachedStatisticsService, self).get_top_categories(user_id, limit, start_time, end_time)
+        )
+    
+    def get_time_series(self, user_id: int, start_time: datetime, end_time: datetime,
+                        granularity: str = 'month', by_category: bool = False) -> List[Dict[str, Any]]:
+        """按时间分桶统计（缓存）"""
+        key = ('series', start_time.isoformat(), end_time.isoformat(), granularity, by_category)
+        return self.cache.get_or_compute(
+            user_id, key,
+            lambda: super(CachedStatisticsService, self).get_time_series(
+                user_id, start_time, end_time, granularity, by_category)
+        )
+    
+    def get_recent_stats(self, user_id: int, days: int = 30, ttl: float = 60.0) -> Dict[str, Any]:
+        """最近 days 天的统计
+
+        时间窗口随当前时间滑动，因此除了数据版本外还按 ttl 秒过期。
+        """
+        def compute():
+            end_time = datetime.now()
+            start_time = end_time - timedelta(days=days)
+            return super(CachedStatisticsService, self).get_time_range_stats(user_id, start_time, end_time)
+        return self.cache.get_or_compute(user_id, ('recent', days), compute, ttl=ttl)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """缓存命中/未命中等指标"""
+        return self.cache.stats()
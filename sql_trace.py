@@ -0,0 +1,291 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# 环境变量：FINANCE_SQL_TRACE=1 开启跟踪；慢查询阈值（毫秒）、日志路径、是否记录查询计划
+TRACE_ENV = 'FINANCE_SQL_TRACE'
+SLOW_MS_ENV = 'FINANCE_SQL_SLOW_MS'
+SLOW_LOG_ENV = 'FINANCE_SQL_SLOW_LOG'
+EXPLAIN_ENV = 'FINANCE_SQL_EXPLAIN'
+
+DEFAULT_SLOW_MS = 50.0
+DEFAULT_SLOW_LOG = 'slow_queries.log'
+
+# 查找调用方时跳过的模块文件
+_SKIPPED_FILES = (os.path.abspath(__file__), os.path.dirname(sqlite3.__file__), 'contextlib.py')
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+def normalize_sql(sql: str) -> str:
+    """合并空白，便于按语句分组与记录日志"""
+    return " ".join(sql.split())
+
+def parameter_shape(parameters: Any) -> str:
+    """参数的形状（类型与个数），不记录参数值"""
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+def find_caller() -> str:
+    """调用栈中最近的类方法（例如 QueryService.query_transactions），没有时取最近的函数"""
+    frame = sys._getframe(1)
+    fallback = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not any(skipped in filename for skipped in _SKIPPED_FILES):
+            owner = frame.f_locals.get('self')
+            if owner is not None:
+                return f"{type(owner).__qualname__}.{frame.f_code.co_name}"
+            if fallback is None:
+                module = os.path.splitext(os.path.basename(filename))[0]
+                fallback = f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback or "?"
+
+@dataclass
+class QueryRecord:
+    """一次语句执行的跟踪记录"""
+    sql: str
+    params: str
+    caller: str
+    duration_ms: float  # 在 SQLite 中执行与读取结果的时间，不含调用方处理结果的时间
+    rows: int  # 查询为读取的行数，其余语句为影响的行数
+    started_at: str
+    error: Optional[str] = None
+    plan: Optional[List[str]] = None
+
+@dataclass
+class _StatementStats:
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    callers: Dict[str, int] = field(default_factory=dict)
+
+class SQLTracer:
+    """收集语句耗时，超过阈值的语句写入慢查询日志（JSON Lines）
+
+    explain 为 True 时，对慢查询在同一连接上执行 EXPLAIN QUERY PLAN 并一并记录。
+    """
+
+    def __init__(self, slow_ms: float = DEFAULT_SLOW_MS, log_path: Optional[str] = DEFAULT_SLOW_LOG,
+                 explain: bool = False, keep: int = 1000):
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self.explain = explain
+        self._lock = threading.Lock()
+        self._recent: "deque[QueryRecord]" = deque(maxlen=keep)
+        self._slow: "deque[QueryRecord]" = deque(maxlen=keep)
+        self._statements: Dict[str, _StatementStats] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["SQLTracer"]:
+        """按环境变量创建，未开启跟踪时返回 None"""
+        if not _env_flag(TRACE_ENV):
+            return None
+        return cls(
+            slow_ms=float(os.environ.get(SLOW_MS_ENV) or DEFAULT_SLOW_MS),
+            log_path=os.environ.get(SLOW_LOG_ENV) or DEFAULT_SLOW_LOG,
+            explain=_env_flag(EXPLAIN_ENV),
+        )
+
+    def record(self, conn: sqlite3.Connection, sql: str, parameters: Any, caller: str,
+               seconds: float, rows: int, error: Optional[str] = None, many: bool = False):
+        sql = normalize_sql(sql)
+        if many:
+            shape = f"{len(parameters)} x {parameter_shape(parameters[0]) if parameters else '()'}"
+        else:
+            shape = parameter_shape(parameters)
+        record = QueryRecord(
+            sql=sql,
+            params=shape,
+            caller=caller,
+            duration_ms=seconds * 1000,
+            rows=rows,
+            started_at=datetime.now().isoformat(timespec='milliseconds'),
+            error=error,
+        )
+        slow = record.duration_ms >= self.slow_ms
+        if slow and self.explain and not many and error is None:
+            record.plan = self._explain(conn, sql, parameters)
+        with self._lock:
+            self._recent.append(record)
+            stats = self._statements.setdefault(sql, _StatementStats())
+            stats.count += 1
+            stats.total_ms += record.duration_ms
+            stats.max_ms = max(stats.max_ms, record.duration_ms)
+            stats.rows += max(rows, 0)
+            stats.callers[caller] = stats.callers.get(caller, 0) + 1
+            if slow:
+                self._slow.append(record)
+                self._write_log(record)
+
+    @staticmethod
+    def _explain(conn: sqlite3.Connection, sql: str, parameters: Any) -> Optional[List[str]]:
+        if sql.split(None, 1)[0].upper() not in ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE'):
+            return None
+        try:
+            # 直接用底层 Cursor，避免查询计划本身也被跟踪
+            cursor = sqlite3.Cursor(conn)
+            return [row[3] for row in sqlite3.Cursor.execute(cursor, f"EXPLAIN QUERY PLAN {sql}", parameters)]
+        except sqlite3.Error as e:
+            return [f"EXPLAIN 失败: {e}"]
+
+    def _write_log(self, record: QueryRecord):
+        if not self.log_path:
+            return
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"写入慢查询日志失败: {e}")
+
+    def recent(self) -> List[QueryRecord]:
+        with self._lock:
+            return list(self._recent)
+
+    def slow_queries(self) -> List[QueryRecord]:
+        with self._lock:
+            return list(self._slow)
+
+    def summary(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """按累计耗时排序的语句统计"""
+        with self._lock:
+            items = [(sql, stats.count, stats.total_ms, stats.max_ms, stats.rows, dict(stats.callers))
+                     for sql, stats in self._statements.items()]
+        items.sort(key=lambda item: item[2], reverse=True)
+        return [{'sql': sql, 'count': count, 'total_ms': total, 'mean_ms': total / count,
+                 'max_ms': max_ms, 'rows': rows, 'callers': callers}
+                for sql, count, total, max_ms, rows, callers in items[:limit]]
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._slow.clear()
+            self._statements.clear()
+
+class TracingCursor(sqlite3.Cursor):
+    """记录每条语句执行与读取结果耗时的游标
+
+    查询语句在结果读完、游标再次执行或关闭时才生成记录，
+    耗时为 execute 与各次 fetch 调用的时间之和。
+    """
+
+    _pending = None  # [sql, 参数, 调用方, 累计秒数, 行数]
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        caller = find_caller()
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except sqlite3.Error as e:
+            self._record(sql, parameters, caller, time.perf_counter() - started, -1, error=str(e))
+            raise
+        elapsed = time.perf_counter() - started
+        if self.description is None:
+            # 非查询语句没有结果集，直接记录影响的行数
+            self._record(sql, parameters, caller, elapsed, self.rowcount)
+        else:
+            self._pending = [sql, parameters, caller, elapsed, 0]
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        caller = find_caller()
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except sqlite3.Error as e:
+            self._record(sql, seq_of_parameters, caller, time.perf_counter() - started, -1,
+                         error=str(e), many=True)
+            raise
+        self._record(sql, seq_of_parameters, caller, time.perf_counter() - started, self.rowcount, many=True)
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._advance(time.perf_counter() - started, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._advance(time.perf_counter() - started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._advance(time.perf_counter() - started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._advance(time.perf_counter() - started, 0, True)
+            raise
+        self._advance(time.perf_counter() - started, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+    def _advance(self, seconds: float, rows: int, exhausted: bool):
+        pending = self._pending
+        if pending is None:
+            return
+        pending[3] += seconds
+        pending[4] += rows
+        if exhausted:
+            self._finish()
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self._record(*pending)
+
+    def _record(self, sql, parameters, caller, seconds, rows, error=None, many=False):
+        tracer = getattr(self.connection, 'tracer', None)
+        if tracer is not None:
+            tracer.record(self.connection, sql, parameters, caller, seconds, rows, error, many)
+
+class TracingConnection(sqlite3.Connection):
+    """游标均为 TracingCursor 的连接
+
+    Connection.execute 在 C 层直接创建基础 Cursor，不经过 cursor()，因此一并重写。
+    """
+
+    tracer: Optional[SQLTracer] = None
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
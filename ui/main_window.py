@@ -1,29 +1,74 @@
 import sys
+import time
 from datetime import datetime, timedelta
+from functools import partial
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QLabel, QPushButton, QTableWidget, QTableWidgetItem,
+    QLabel, QPushButton, QTableView, QAbstractItemView,
     QTabWidget, QLineEdit, QComboBox, QDateEdit, 
     QMessageBox, QHeaderView, QFrame, QGroupBox,
     QFormLayout, QDoubleSpinBox, QTextEdit, QDialog, QSizePolicy
 )
-from PyQt6.QtCore import Qt, QDate
-from PyQt6.QtGui import QFont, QColor
+from PyQt6.QtCore import Qt, QDate, QTimer, pyqtSignal
+from PyQt6.QtGui import QFont
 
-from models import User, Transaction, TransactionType, Category
-from services import TransactionService, QueryService, StatisticsService
+from models import User, Transaction, TransactionType, Category, to_decimal, to_epoch
+from services import TransactionService, QueryService, StatisticsService, CachedStatisticsService
+from events import TransactionChange, transaction_changes
+from ui.transaction_model import TransactionTableModel
+from ui.workers import BackgroundRunner
+from ui.startup_timing import StartupTimer
+
+# 统计卡片显示的时间窗口（天）
+DASHBOARD_DAYS = 30
+# 交易变更合并后处理的最短间隔（秒）
+CHANGE_INTERVAL = 0.1
 
 class MainWindow(QMainWindow):
+    # 交易变更可能在任意线程发布，经队列信号回到GUI线程处理
+    _transaction_changed = pyqtSignal(object)
+    
     def __init__(self, user: User):
+        started = time.perf_counter()
         super().__init__()
+        self.startup_timer = StartupTimer(origin=started, parent=self)  # 启动耗时：首次绘制、可交互
         self.user = user # 当前登录用户
         self.transaction_service = TransactionService()
         self.query_service = QueryService()
-        self.stats_service = StatisticsService()
+        self.stats_service = CachedStatisticsService()
+        self.runner = BackgroundRunner(parent=self)  # 数据库查询在后台线程执行
+        self._pending_tabs = {}  # 选项卡序号 -> 尚未执行的构建函数
+        self._dashboard_stats = None  # 最近一次的30天统计，统计选项卡构建时填入
+        self._initial_load_pending = True
         
         self.setup_ui()
-        self.load_transactions()
-        self.update_stats()
+        self.startup_timer.mark('ui_built')
+        self.startup_timer.track(self)
+        
+        # 只订阅当前用户的变更；批量写入时合并后每 CHANGE_INTERVAL 秒最多处理一次
+        self._transaction_changed.connect(self._apply_transaction_change)
+        self._change_subscription = transaction_changes.subscribe(
+            self._transaction_changed.emit, user_id=user.id, interval=CHANGE_INTERVAL)
+        
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._initial_load_pending:
+            # 窗口先显示（卡片与表格为占位状态），数据在事件循环处理完显示后再开始加载
+            self._initial_load_pending = False
+            self.startup_timer.mark('shown')
+            QTimer.singleShot(0, self.load_initial_data)
+    
+    def load_initial_data(self):
+        """首次显示后加载交易记录与统计卡片"""
+        self.statusBar().showMessage("正在加载数据...")
+        self.startup_timer.expect('transactions', 'stats')
+        self.load_transactions(on_loaded=lambda: self._initial_load_done('transactions'))
+        self.update_stats(on_loaded=lambda: self._initial_load_done('stats'))
+    
+    def _initial_load_done(self, name: str):
+        self.startup_timer.complete(name)
+        if name == 'transactions':
+            self.statusBar().clearMessage()
         
     def setup_ui(self):
         self.setWindowTitle(f"记账本系统 - {self.user.username}")
@@ -134,25 +179,36 @@ class MainWindow(QMainWindow):
             }
         """)
         
+        # 只立即构建默认显示的交易记录选项卡，其余选项卡第一次切换到时再构建
         self.setup_transactions_tab()
-        self.setup_query_tab()
-        self.setup_stats_tab()
+        self._add_lazy_tab("🔍 交易查询", self.setup_query_tab)
+        self._add_lazy_tab("📊 数据统计", self.setup_stats_tab)
+        self.tab_widget.currentChanged.connect(self._ensure_tab_built)
         
         layout.addWidget(self.tab_widget)
     
+    def _add_lazy_tab(self, title: str, builder):
+        index = self.tab_widget.addTab(QWidget(), title)
+        self._pending_tabs[index] = builder
+    
+    def _ensure_tab_built(self, index: int):
+        builder = self._pending_tabs.pop(index, None)
+        if builder is not None:
+            builder(self.tab_widget.widget(index))
+    
     def setup_stats_cards(self, layout):
         """设置统计信息卡片"""
         cards_layout = QHBoxLayout()
         cards_layout.setSpacing(15)
         
         # 总收入卡片
-        self.income_card = self.create_stat_card("总收入", "¥0.00", "#27ae60", "💰")
+        self.income_card = self.create_stat_card("总收入", "加载中...", "#27ae60", "💰")
         # 总支出卡片
-        self.expense_card = self.create_stat_card("总支出", "¥0.00", "#e74c3c", "💸")
+        self.expense_card = self.create_stat_card("总支出", "加载中...", "#e74c3c", "💸")
         # 净收入卡片
-        self.net_card = self.create_stat_card("净收入", "¥0.00", "#3498db", "📊")
+        self.net_card = self.create_stat_card("净收入", "加载中...", "#3498db", "📊")
         # 交易笔数卡片
-        self.count_card = self.create_stat_card("交易笔数", "0", "#f39c12", "📝")
+        self.count_card = self.create_stat_card("交易笔数", "加载中...", "#f39c12", "📝")
         
         cards_layout.addWidget(self.income_card)
         cards_layout.addWidget(self.expense_card)
@@ -217,12 +273,10 @@ class MainWindow(QMainWindow):
         info_label.setStyleSheet("color: #2c3e50; margin-bottom: 10px;")
         layout.addWidget(info_label)
         
-        # 交易表格
-        self.transaction_table = QTableWidget()
-        self.transaction_table.setColumnCount(7)
-        self.transaction_table.setHorizontalHeaderLabels([
-            "ID", "交易方", "金额", "类型", "分类", "描述", "时间"
-        ])
+        # 交易表格（按需分页加载，结果已按时间倒序排列）
+        self.transaction_model = TransactionTableModel(parent=self)
+        self.transaction_table = QTableView()
+        self.transaction_table.setModel(self.transaction_model)
         
         # 设置表格属性
         self.transaction_table.setAlternatingRowColors(True)
@@ -240,16 +294,14 @@ class MainWindow(QMainWindow):
         header.setSectionResizeMode(5, QHeaderView.ResizeMode.Stretch)  # 描述列自适应
         header.setSectionResizeMode(6, QHeaderView.ResizeMode.ResizeToContents)  # 时间列
         
-        self.transaction_table.setSortingEnabled(True)
-        self.transaction_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.transaction_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         
         layout.addWidget(self.transaction_table)
         
         self.tab_widget.addTab(tab, "📋 交易记录")
 
-    def setup_query_tab(self):
-        """设置查询选项卡"""
-        tab = QWidget()
+    def setup_query_tab(self, tab: QWidget):
+        """设置查询选项卡（第一次切换到时构建）"""
         layout = QVBoxLayout(tab)
         layout.setSpacing(15)
         layout.setContentsMargins(15, 15, 15, 15)
@@ -263,6 +315,10 @@ class MainWindow(QMainWindow):
         self.query_target_edit.setPlaceholderText("输入交易方名称")
         self.query_target_edit.setMinimumHeight(35)
         
+        self.query_text_edit = QLineEdit()
+        self.query_text_edit.setPlaceholderText("输入描述或交易方关键词，支持前缀匹配")
+        self.query_text_edit.setMinimumHeight(35)
+        
         self.query_type_combo = QComboBox()
         self.query_type_combo.addItem("所有类型", None)
         self.query_type_combo.addItem("收入", TransactionType.INCOME)
@@ -286,6 +342,7 @@ class MainWindow(QMainWindow):
         self.query_end_date.setMinimumHeight(35)
         
         query_layout.addRow("交易方:", self.query_target_edit)
+        query_layout.addRow("关键词:", self.query_text_edit)
         query_layout.addRow("类型:", self.query_type_combo)
         query_layout.addRow("分类:", self.query_category_combo)
         query_layout.addRow("开始时间:", self.query_start_date)
@@ -311,11 +368,9 @@ class MainWindow(QMainWindow):
         layout.addWidget(query_group)
         
         # 查询结果表格
-        self.query_table = QTableWidget()
-        self.query_table.setColumnCount(7)
-        self.query_table.setHorizontalHeaderLabels([
-            "ID", "交易方", "金额", "类型", "分类", "描述", "时间"
-        ])
+        self.query_model = TransactionTableModel(parent=self)
+        self.query_table = QTableView()
+        self.query_table.setModel(self.query_model)
 
         # 设置行高 - 解决行间距问题
         self.query_table.verticalHeader().setDefaultSectionSize(40)  # 设置默认行高
@@ -331,12 +386,9 @@ class MainWindow(QMainWindow):
         header.setSectionResizeMode(6, QHeaderView.ResizeMode.ResizeToContents)
         
         layout.addWidget(self.query_table)
-        
-        self.tab_widget.addTab(tab, "🔍 交易查询")
 
-    def setup_stats_tab(self):
-        """设置统计选项卡"""
-        tab = QWidget()
+    def setup_stats_tab(self, tab: QWidget):
+        """设置统计选项卡（第一次切换到时构建）"""
         layout = QVBoxLayout(tab)
         layout.setSpacing(15)
         layout.setContentsMargins(15, 15, 15, 15)
@@ -423,72 +475,82 @@ class MainWindow(QMainWindow):
         
         layout.addLayout(stats_display_layout)
         
-        self.tab_widget.addTab(tab, "📊 数据统计")
+        if self._dashboard_stats is not None:
+            self._set_stats_labels(self._dashboard_stats)
 
     # ========== 核心功能方法 ==========
 
-    def load_transactions(self):
-        """加载交易记录"""
-        try:
-            transactions = self.transaction_service.get_user_transactions(self.user.id)
-            self.populate_table(self.transaction_table, transactions)
-        except Exception as e:
-            QMessageBox.warning(self, "错误", f"加载交易记录失败: {str(e)}")
-
-    def populate_table(self, table: QTableWidget, transactions: list):
-        """填充表格数据"""
-        table.setRowCount(len(transactions))
-        
-        for row, transaction in enumerate(transactions):
-            table.setItem(row, 0, QTableWidgetItem(str(transaction.id)))
-            table.setItem(row, 1, QTableWidgetItem(
-                f"{transaction.from_user} → {transaction.to_user}"
-            ))
-            
-            amount_item = QTableWidgetItem(f"¥{transaction.amount:.2f}")
-            if transaction.transaction_type == TransactionType.INCOME:
-                amount_item.setForeground(QColor(39, 174, 96))  # 绿色
-            else:
-                amount_item.setForeground(QColor(231, 76, 60))  # 红色
-            table.setItem(row, 2, amount_item)
-            
-            type_text = "收入" if transaction.transaction_type == TransactionType.INCOME else "支出"
-            table.setItem(row, 3, QTableWidgetItem(type_text))
-            table.setItem(row, 4, QTableWidgetItem(transaction.category.value))
-            table.setItem(row, 5, QTableWidgetItem(transaction.description))
-            table.setItem(row, 6, QTableWidgetItem(
-                transaction.transaction_time.strftime("%Y-%m-%d %H:%M:%S")
-            ))
+    def load_transactions(self, on_loaded=None):
+        """加载交易记录（第一页在后台线程读取）"""
+        fetch_page = partial(self._fetch_user_page, self.user.id)
+        
+        def on_result(first_page):
+            self.populate_table(self.transaction_model, fetch_page, first_page)
+            if on_loaded is not None:
+                on_loaded()
+        
+        self.runner.submit(
+            'transactions',
+            lambda context: fetch_page(None, self.transaction_model.page_size),
+            on_result=on_result,
+            on_error=lambda e: QMessageBox.warning(self, "错误", f"加载交易记录失败: {str(e)}")
+        )
+
+    def populate_table(self, model: TransactionTableModel, fetch_page, first_page=None):
+        """为表格模型设置数据源并加载第一页，其余行在滚动时按需读取"""
+        model.set_source(fetch_page, first_page)
+        if first_page is None and model.canFetchMore():
+            model.fetchMore()
+
+    def _fetch_user_page(self, user_id: int, cursor, page_size: int):
+        return self.transaction_service.get_transactions_page(user_id, page_size, cursor)
+
+    def _fetch_query_page(self, user_id: int, conditions: dict, cursor, page_size: int):
+        return self.query_service.query_transactions_page(user_id, page_size, cursor, **conditions)
+
+    def show_progress(self, percent: int, message: str):
+        """在状态栏显示后台任务进度"""
+        self.statusBar().showMessage(f"{message} ({percent}%)" if percent < 100 else message, 3000)
 
     def refresh_data(self):
         """刷新数据"""
-        self.load_transactions()
+        self.load_transactions(
+            on_loaded=lambda: QMessageBox.information(self, "刷新", "数据已刷新！")
+        )
         self.update_stats()
-        QMessageBox.information(self, "刷新", "数据已刷新！")
 
-    def update_stats(self):
+    def update_stats(self, on_loaded=None):
         """更新统计信息"""
-        try:
-            # 获取最近30天的统计数据
-            end_time = datetime.now()
-            start_time = end_time - timedelta(days=30)
-            
-            stats = self.stats_service.get_time_range_stats(self.user.id, start_time, end_time)
-            
-            # 更新统计卡片
-            self.update_stat_card(self.income_card, f"¥{stats['total_income']:.2f}")
-            self.update_stat_card(self.expense_card, f"¥{stats['total_expense']:.2f}")
-            self.update_stat_card(self.net_card, f"¥{stats['net_amount']:.2f}")
-            self.update_stat_card(self.count_card, str(stats['transaction_count']))
-            
-            # 更新统计选项卡中的数字
-            self.stats_income_label.setText(f"总收入: ¥{stats['total_income']:.2f}")
-            self.stats_expense_label.setText(f"总支出: ¥{stats['total_expense']:.2f}")
-            self.stats_net_label.setText(f"净收入: ¥{stats['net_amount']:.2f}")
-            self.stats_count_label.setText(f"交易笔数: {stats['transaction_count']}")
-            
-        except Exception as e:
-            print(f"更新统计信息失败: {e}")
+        def on_result(stats):
+            self._show_dashboard_stats(stats)
+            if on_loaded is not None:
+                on_loaded()
+        
+        # 获取最近30天的统计数据（数据未变化时直接使用缓存）
+        self.runner.submit(
+            'dashboard_stats',
+            lambda context: self.stats_service.get_recent_stats(self.user.id, days=DASHBOARD_DAYS),
+            on_result=on_result,
+            on_error=lambda e: print(f"更新统计信息失败: {e}")
+        )
+
+    def _show_dashboard_stats(self, stats: dict):
+        # 更新统计卡片
+        self.update_stat_card(self.income_card, f"¥{stats['total_income']:.2f}")
+        self.update_stat_card(self.expense_card, f"¥{stats['total_expense']:.2f}")
+        self.update_stat_card(self.net_card, f"¥{stats['net_amount']:.2f}")
+        self.update_stat_card(self.count_card, str(stats['transaction_count']))
+        
+        # 更新统计选项卡中的数字（选项卡尚未构建时在构建时填入）
+        self._dashboard_stats = stats
+        if hasattr(self, 'stats_income_label'):
+            self._set_stats_labels(stats)
+
+    def _set_stats_labels(self, stats: dict):
+        self.stats_income_label.setText(f"总收入: ¥{stats['total_income']:.2f}")
+        self.stats_expense_label.setText(f"总支出: ¥{stats['total_expense']:.2f}")
+        self.stats_net_label.setText(f"净收入: ¥{stats['net_amount']:.2f}")
+        self.stats_count_label.setText(f"交易笔数: {stats['transaction_count']}")
 
     def update_stat_card(self, card: QFrame, value: str):
         """更新统计卡片的值"""
@@ -499,87 +561,142 @@ class MainWindow(QMainWindow):
                 break
 
     def perform_search(self):
-        """执行搜索"""
-        try:
-            conditions = {}
-            
-            target_user = self.query_target_edit.text().strip()
-            if target_user:
-                conditions['target_user'] = target_user
-            
-            transaction_type = self.query_type_combo.currentData()
-            if transaction_type:
-                conditions['transaction_type'] = transaction_type
-            
-            category = self.query_category_combo.currentData()
-            if category:
-                conditions['category'] = category
-            
-            start_time = self.query_start_date.date().toPyDate()
-            end_time = self.query_end_date.date().toPyDate()
-            conditions['start_time'] = datetime.combine(start_time, datetime.min.time())
-            conditions['end_time'] = datetime.combine(end_time, datetime.max.time())
-            
-            transactions = self.query_service.query_transactions(self.user.id, **conditions)
-            self.populate_table(self.query_table, transactions)
-            
-            QMessageBox.information(self, "搜索完成", f"找到 {len(transactions)} 条记录")
-            
-        except Exception as e:
-            QMessageBox.warning(self, "搜索错误", f"搜索失败: {str(e)}")
+        """执行搜索（后台执行，新的搜索会取代尚未完成的旧搜索）"""
+        conditions = {}
+        
+        target_user = self.query_target_edit.text().strip()
+        if target_user:
+            conditions['target_user'] = target_user
+        
+        search_text = self.query_text_edit.text().strip()
+        if search_text:
+            conditions['search_text'] = search_text
+        
+        transaction_type = self.query_type_combo.currentData()
+        if transaction_type:
+            conditions['transaction_type'] = transaction_type
+        
+        category = self.query_category_combo.currentData()
+        if category:
+            conditions['category'] = category
+        
+        start_time = self.query_start_date.date().toPyDate()
+        end_time = self.query_end_date.date().toPyDate()
+        conditions['start_time'] = datetime.combine(start_time, datetime.min.time())
+        conditions['end_time'] = datetime.combine(end_time, datetime.max.time())
+        
+        fetch_page = partial(self._fetch_query_page, self.user.id, conditions)
+        
+        def search(context):
+            context.report(0, "正在统计匹配记录...")
+            total = self.query_service.count_transactions(self.user.id, **conditions)
+            context.check_cancelled()
+            context.report(50, "正在读取查询结果...")
+            first_page = fetch_page(None, self.query_model.page_size)
+            context.report(100, "搜索完成")
+            return total, first_page
+        
+        def on_result(result):
+            total, first_page = result
+            self.populate_table(self.query_model, fetch_page, first_page)
+            QMessageBox.information(self, "搜索完成", f"找到 {total} 条记录")
+        
+        self.runner.submit(
+            'search', search,
+            on_result=on_result,
+            on_error=lambda e: QMessageBox.warning(self, "搜索错误", f"搜索失败: {str(e)}"),
+            on_progress=self.show_progress
+        )
 
     def reset_search(self):
         """重置搜索条件"""
+        self.runner.cancel('search')
         self.query_target_edit.clear()
+        self.query_text_edit.clear()
         self.query_type_combo.setCurrentIndex(0)
         self.query_category_combo.setCurrentIndex(0)
         self.query_start_date.setDate(QDate.currentDate().addMonths(-1))
         self.query_end_date.setDate(QDate.currentDate())
-        self.query_table.setRowCount(0)
+        self.query_model.clear()
 
     def generate_stats(self):
-        """生成统计"""
-        try:
-            start_time = datetime.combine(
-                self.stats_start_date.date().toPyDate(), 
-                datetime.min.time()
-            )
-            end_time = datetime.combine(
-                self.stats_end_date.date().toPyDate(), 
-                datetime.max.time()
-            )
-            
+        """生成统计（后台执行）"""
+        start_time = datetime.combine(
+            self.stats_start_date.date().toPyDate(), 
+            datetime.min.time()
+        )
+        end_time = datetime.combine(
+            self.stats_end_date.date().toPyDate(), 
+            datetime.max.time()
+        )
+        
+        def compute(context):
+            context.report(0, "正在生成统计...")
             stats = self.stats_service.get_time_range_stats(self.user.id, start_time, end_time)
-            
-            # 更新统计显示
-            self.stats_income_label.setText(f"总收入: ¥{stats['total_income']:.2f}")
-            self.stats_expense_label.setText(f"总支出: ¥{stats['total_expense']:.2f}")
-            self.stats_net_label.setText(f"净收入: ¥{stats['net_amount']:.2f}")
-            self.stats_count_label.setText(f"交易笔数: {stats['transaction_count']}")
-            
-            # 显示分类统计
-            category_text = "📊 分类统计\n\n"
-            total_amount = stats['total_income'] + stats['total_expense']
-            
-            for category in stats['category_breakdown']:
-                percentage = (category['amount'] / total_amount * 100) if total_amount > 0 else 0
-                category_text += f"• {category['category']}: ¥{category['amount']:.2f} ({percentage:.1f}%)\n"
-            
-            self.chart_area.setText(category_text)
-            
-            QMessageBox.information(self, "统计完成", "统计数据已生成！")
-            
-        except Exception as e:
-            QMessageBox.warning(self, "统计错误", f"生成统计失败: {str(e)}")
+            context.report(100, "统计完成")
+            return stats
+        
+        self.runner.submit(
+            'range_stats', compute,
+            on_result=self._show_range_stats,
+            on_error=lambda e: QMessageBox.warning(self, "统计错误", f"生成统计失败: {str(e)}"),
+            on_progress=self.show_progress
+        )
+
+    def _show_range_stats(self, stats: dict):
+        # 更新统计显示
+        self._set_stats_labels(stats)
+        
+        # 显示分类统计
+        category_text = "📊 分类统计\n\n"
+        total_amount = stats['total_income'] + stats['total_expense']
+        
+        for category in stats['category_breakdown']:
+            percentage = (category['amount'] / total_amount * 100) if total_amount > 0 else 0
+            category_text += f"• {category['category']}: ¥{category['amount']:.2f} ({percentage:.1f}%)\n"
+        
+        self.chart_area.setText(category_text)
+        
+        QMessageBox.information(self, "统计完成", "统计数据已生成！")
+
+    def _apply_transaction_change(self, change: TransactionChange):
+        """按变更增量更新交易表格与统计卡片，无法增量更新时整体重新加载"""
+        if not change.complete:
+            self.load_transactions()
+            window_start = to_epoch(datetime.now() - timedelta(days=DASHBOARD_DAYS))[0]
+            if change.end_epoch is None or change.end_epoch >= window_start:
+                self.update_stats()
+            return
+        
+        model = self.transaction_model
+        applied = all([model.insert_transaction(t) for t in change.inserted]
+                      + [model.remove_transaction(t) for t in change.deleted])
+        if not applied:
+            self.load_transactions()
+        
+        if self._dashboard_stats is None or self.runner.is_running('dashboard_stats'):
+            # 统计尚未加载完成，重新提交即可取得包含这次变更的结果
+            self.update_stats()
+            return
+        end_time = datetime.now()
+        start_time = end_time - timedelta(days=DASHBOARD_DAYS)
+        self._show_dashboard_stats(StatisticsService.apply_changes(
+            self._dashboard_stats, start_time, end_time, change.inserted, change.deleted))
+
+    def closeEvent(self, event):
+        """关闭窗口前取消并等待后台任务"""
+        transaction_changes.unsubscribe(self._change_subscription)
+        self.runner.shutdown()
+        super().closeEvent(event)
 
     def show_add_transaction_dialog(self, transaction_type: TransactionType):
         """显示添加交易对话框"""
         dialog = AddTransactionDialog(self.user, transaction_type, self)
         if dialog.exec():
             transaction = dialog.get_transaction()
+            # 表格与统计卡片随交易变更增量更新，不再整体刷新
             if self.transaction_service.add_transaction(transaction):
-                QMessageBox.information(self, "成功", "交易添加成功！")
-                self.refresh_data()
+                self.statusBar().showMessage("交易添加成功", 3000)
             else:
                 QMessageBox.warning(self, "错误", "交易添加失败！")
 
@@ -590,18 +707,18 @@ class MainWindow(QMainWindow):
                 background: #ecf0f1;
                 font-family: "Microsoft YaHei";
             }
-            QTableWidget {
+            QTableView {
                 border: 2px solid #bdc3c7;
                 border-radius: 8px;
                 background: white;
                 gridline-color: #ecf0f1;
                 font-size: 12px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px 12px;
                 border-bottom: 1px solid #ecf0f1;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background: #3498db;
                 color: white;
             }
@@ -781,7 +898,7 @@ class AddTransactionDialog(QDialog):
             user_id=self.user.id,
             from_user=self.from_user_edit.text().strip(),
             to_user=self.to_user_edit.text().strip(),
-            amount=self.amount_spin.value(),
+            amount=to_decimal(self.amount_spin.value()),
             transaction_type=self.transaction_type,
             category=self.category_combo.currentData(),
             description=self.description_edit.toPlainText().strip(),
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from PyQt6.QtCore import QEvent, QObject, QTimer, pyqtSignal
+
+# 环境变量：FINANCE_STARTUP_TIMING=1 时窗口可交互后把启动耗时打印到标准错误
+TIMING_ENV = 'FINANCE_STARTUP_TIMING'
+
+class StartupTimer(QObject):
+    """记录主窗口启动过程中各阶段的时间点（相对 origin 的毫秒数）
+
+    first_paint：窗口第一次绘制；interactive：第一次绘制之后、所有 expect() 登记的
+    初始加载都 complete() 且事件队列空闲的时刻。初始加载失败时不会产生 interactive。
+    """
+
+    interactive = pyqtSignal()
+
+    def __init__(self, origin: Optional[float] = None, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.origin = time.perf_counter() if origin is None else origin
+        self.marks: Dict[str, float] = {}
+        self._pending: Set[str] = set()
+        self._widget = None
+
+    def mark(self, name: str):
+        """记录阶段时间点，同名阶段只记录第一次"""
+        self.marks.setdefault(name, (time.perf_counter() - self.origin) * 1000)
+
+    def elapsed(self, name: str) -> Optional[float]:
+        return self.marks.get(name)
+
+    @property
+    def time_to_first_paint(self) -> Optional[float]:
+        return self.marks.get('first_paint')
+
+    @property
+    def time_to_interactive(self) -> Optional[float]:
+        return self.marks.get('interactive')
+
+    def track(self, widget):
+        """监听 widget 的第一次绘制事件"""
+        self._widget = widget
+        widget.installEventFilter(self)
+
+    def expect(self, *names: str):
+        """登记可交互之前必须完成的初始加载"""
+        self._pending.update(names)
+
+    def complete(self, name: str):
+        self.mark(f"{name}_loaded")
+        self._pending.discard(name)
+        self._check_interactive()
+
+    def eventFilter(self, watched, event) -> bool:
+        if watched is self._widget and event.type() == QEvent.Type.Paint:
+            watched.removeEventFilter(self)
+            self.mark('first_paint')
+            self._check_interactive()
+        return False
+
+    def _check_interactive(self):
+        if self._pending or 'first_paint' not in self.marks or 'interactive' in self.marks:
+            return
+        # 等已排队的事件（包括加载结果触发的重绘）处理完再记为可交互
+        QTimer.singleShot(0, self._on_idle)
+
+    def _on_idle(self):
+        if 'interactive' in self.marks:
+            return
+        self.mark('interactive')
+        if os.environ.get(TIMING_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on'):
+            print(self.report(), file=sys.stderr)
+        self.interactive.emit()
+
+    def timeline(self) -> List[Tuple[str, float]]:
+        return sorted(self.marks.items(), key=lambda item: item[1])
+
+    def report(self) -> str:
+        lines = ["启动耗时（毫秒，从创建主窗口开始计）："]
+        lines.extend(f"  {name:<24} {elapsed:>9.1f}" for name, elapsed in self.timeline())
+        return "\n".join(lines)
@@ -0,0 +1,260 @@
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+from models import Transaction, TransactionType, TransactionPage, to_epoch
+from services import decode_cursor
+
+# fetch_page(cursor, page_size) -> TransactionPage
+PageFetcher = Callable[[Optional[str], int], TransactionPage]
+
+INCOME_COLOR = QColor(39, 174, 96)  # 绿色
+EXPENSE_COLOR = QColor(231, 76, 60)  # 红色
+
+class TransactionTableModel(QAbstractTableModel):
+    """按需分页加载的交易表格模型
+
+    视图滚动到底部时通过 canFetchMore/fetchMore 读取下一页；单元格文本在
+    data() 中按需格式化。内存中最多缓存 max_cached_pages 页，被淘汰的页在
+    再次显示时用该页的起始令牌重新读取，因此内存占用与结果总数无关。
+
+    insert_transaction/remove_transaction 在已加载的范围内增量插入、删除单行，
+    各页的行数因此可能不再等于 page_size，按每页的起始行号定位。
+    """
+
+    HEADERS = ["ID", "交易方", "金额", "类型", "分类", "描述", "时间"]
+
+    def __init__(self, fetch_page: Optional[PageFetcher] = None, page_size: int = 200,
+                 max_cached_pages: int = 20, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.max_cached_pages = max(2, max_cached_pages)
+        self._fetch_page = fetch_page
+        self._init_state()
+
+    def _init_state(self):
+        self._row_count = 0
+        self._page_cursors: List[Optional[str]] = []  # 每一页的起始令牌
+        self._page_starts: List[int] = []  # 每一页第一行的行号
+        self._page_lengths: List[int] = []  # 每一页的行数
+        self._pages: "OrderedDict[int, List[Transaction]]" = OrderedDict()  # LRU 页缓存
+        self._next_cursor: Optional[str] = None
+        self._exhausted = self._fetch_page is None
+
+    # ========== 数据源 ==========
+
+    def set_source(self, fetch_page: Optional[PageFetcher], first_page: Optional[TransactionPage] = None):
+        """更换数据源并清空已加载的数据
+
+        first_page 为预先（例如在后台线程）读取好的第一页，可避免在GUI线程中查询。
+        """
+        self.beginResetModel()
+        self._fetch_page = fetch_page
+        self._init_state()
+        if first_page is not None and fetch_page is not None:
+            self._append_page(None, first_page)
+        self.endResetModel()
+
+    def reload(self):
+        """重新从第一页开始加载"""
+        self.set_source(self._fetch_page)
+
+    def clear(self):
+        self.set_source(None)
+
+    def transaction_at(self, row: int) -> Optional[Transaction]:
+        """返回指定行的交易，必要时重新读取所在页"""
+        if row < 0 or row >= self._row_count:
+            return None
+        # 行数为 0 的页与下一页起始行号相同，bisect_right 会越过它
+        page_index = bisect_right(self._page_starts, row) - 1
+        offset = row - self._page_starts[page_index]
+        page = self._cached_page(page_index)
+        return page[offset] if offset < len(page) else None
+
+    def _cached_page(self, page_index: int) -> List[Transaction]:
+        page = self._pages.get(page_index)
+        if page is None:
+            return self._reload_page(page_index)
+        self._pages.move_to_end(page_index)
+        return page
+
+    def _reload_page(self, page_index: int, length: Optional[int] = None) -> List[Transaction]:
+        length = self._page_lengths[page_index] if length is None else length
+        transactions = []
+        if length > 0:
+            transactions = self._fetch_page(self._page_cursors[page_index], length).transactions
+        self._store_page(page_index, transactions)
+        return transactions
+
+    def _store_page(self, page_index: int, transactions: List[Transaction]):
+        self._pages[page_index] = transactions
+        self._pages.move_to_end(page_index)
+        while len(self._pages) > self.max_cached_pages:
+            # 第一页的起始令牌为空，重新读取会混入新记录，因此常驻缓存
+            oldest = next(iter(self._pages))
+            if oldest == 0:
+                self._pages.move_to_end(0)
+                oldest = next(iter(self._pages))
+            del self._pages[oldest]
+
+    # ========== 增量加载 ==========
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        cursor = self._next_cursor
+        page = self._fetch_page(cursor, self.page_size)
+        if not page.transactions:
+            self._exhausted = True
+            return
+        first = self._row_count
+        self.beginInsertRows(QModelIndex(), first, first + len(page.transactions) - 1)
+        self._append_page(cursor, page)
+        self.endInsertRows()
+
+    def _append_page(self, cursor: Optional[str], page: TransactionPage):
+        self._next_cursor = page.next_cursor
+        self._exhausted = not page.has_more
+        if not page.transactions:
+            return
+        page_index = len(self._page_cursors)
+        self._page_cursors.append(cursor)
+        self._page_starts.append(self._row_count)
+        self._page_lengths.append(len(page.transactions))
+        self._store_page(page_index, page.transactions)
+        self._row_count += len(page.transactions)
+
+    # ========== 增量更新 ==========
+
+    @staticmethod
+    def _sort_key(transaction: Transaction) -> Tuple[int, int]:
+        """与分页查询一致的排序键 (transaction_epoch, id)，按倒序排列"""
+        return to_epoch(transaction.transaction_time)[0], transaction.id
+
+    def _page_for_key(self, key: Tuple[int, int]) -> Optional[int]:
+        """排序键所在的已加载页；排在已加载范围之后（之后翻页才会读到）时返回 None
+
+        第 i 页的行都不小于第 i+1 页的起始令牌（即第 i 页最后一行的排序键）。
+        """
+        for page_index in range(len(self._page_cursors)):
+            if page_index + 1 < len(self._page_cursors):
+                boundary = self._page_cursors[page_index + 1]
+            else:
+                boundary = self._next_cursor
+            if boundary is None or key >= decode_cursor(boundary):
+                return page_index
+        return None
+
+    def _shift_pages(self, page_index: int, delta: int):
+        self._page_lengths[page_index] += delta
+        for index in range(page_index + 1, len(self._page_starts)):
+            self._page_starts[index] += delta
+        self._row_count += delta
+
+    def insert_transaction(self, transaction: Transaction) -> bool:
+        """把已写入数据库的交易插入到排序位置
+
+        返回 False 表示无法增量插入（例如尚未设置数据源），调用方应重新加载。
+        """
+        if self._fetch_page is None:
+            return False
+        if not self._page_cursors:
+            if not self._exhausted:
+                return True  # 还没有读取任何一页，之后读取时自然包含这一行
+            self._page_cursors.append(None)
+            self._page_starts.append(0)
+            self._page_lengths.append(0)
+            self._store_page(0, [])
+        key = self._sort_key(transaction)
+        page_index = self._page_for_key(key)
+        if page_index is None:
+            return True
+        page = self._pages.get(page_index)
+        if page is None:
+            # 数据库中已包含新行，按原行数加一重新读取该页后定位
+            page = self._reload_page(page_index, self._page_lengths[page_index] + 1)
+            offsets = [i for i, t in enumerate(page) if t.id == transaction.id]
+            if not offsets:
+                return False
+            offset = offsets[0]
+            del page[offset]
+        else:
+            self._pages.move_to_end(page_index)
+            offset = next((i for i, t in enumerate(page) if key > self._sort_key(t)), len(page))
+        row = self._page_starts[page_index] + offset
+        self.beginInsertRows(QModelIndex(), row, row)
+        page.insert(offset, transaction)
+        self._shift_pages(page_index, 1)
+        self.endInsertRows()
+        return True
+
+    def remove_transaction(self, transaction: Transaction) -> bool:
+        """移除已从数据库删除的交易
+
+        返回 False 表示无法定位该行（所在页已被淘汰），调用方应重新加载。
+        """
+        if self._fetch_page is None:
+            return False
+        page_index = self._page_for_key(self._sort_key(transaction))
+        if page_index is None:
+            return True  # 不在已加载范围内
+        page = self._pages.get(page_index)
+        if page is None:
+            return False
+        offset = next((i for i, t in enumerate(page) if t.id == transaction.id), None)
+        if offset is None:
+            return True
+        row = self._page_starts[page_index] + offset
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del page[offset]
+        self._shift_pages(page_index, -1)
+        self.endRemoveRows()
+        return True
+
+    # ========== QAbstractTableModel 接口 ==========
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            transaction = self.transaction_at(index.row())
+            return None if transaction is None else self._display_text(transaction, index.column())
+        if role == Qt.ItemDataRole.ForegroundRole and index.column() == 2:
+            transaction = self.transaction_at(index.row())
+            if transaction is not None:
+                return INCOME_COLOR if transaction.transaction_type == TransactionType.INCOME else EXPENSE_COLOR
+        return None
+
+    @staticmethod
+    def _display_text(transaction: Transaction, column: int) -> str:
+        if column == 0:
+            return str(transaction.id)
+        if column == 1:
+            return f"{transaction.from_user} → {transaction.to_user}"
+        if column == 2:
+            return f"¥{transaction.amount:.2f}"
+        if column == 3:
+            return "收入" if transaction.transaction_type == TransactionType.INCOME else "支出"
+        if column == 4:
+            return transaction.category.value
+        if column == 5:
+            return transaction.description
+        return transaction.transaction_time.strftime("%Y-%m-%d %H:%M:%S")
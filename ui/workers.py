@@ -0,0 +1,141 @@
+import threading
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+class TaskCancelled(Exception):
+    """任务已被新的同类请求取代或被主动取消"""
+
+class TaskContext:
+    """传给后台函数的上下文：汇报进度、检查是否已取消"""
+
+    def __init__(self, runner: "BackgroundRunner", key: str, generation: int):
+        self.key = key
+        self.generation = generation
+        self._runner = runner
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check_cancelled(self):
+        """在耗时步骤之间调用，已取消时抛出 TaskCancelled 结束任务"""
+        if self._cancelled.is_set():
+            raise TaskCancelled(self.key)
+
+    def report(self, percent: int, message: str = ""):
+        if not self._cancelled.is_set():
+            self._runner._progress.emit(self, percent, message)
+
+class _Task(QRunnable):
+    def __init__(self, runner: "BackgroundRunner", context: TaskContext,
+                 fn: Callable, args: tuple, kwargs: dict):
+        super().__init__()
+        self.runner = runner
+        self.context = context
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        context = self.context
+        if context.cancelled:
+            return
+        try:
+            result = self.fn(context, *self.args, **self.kwargs)
+        except TaskCancelled:
+            return
+        except Exception as e:
+            traceback.print_exc()
+            self.runner._failed.emit(context, e)
+            return
+        self.runner._finished.emit(context, result)
+
+class BackgroundRunner(QObject):
+    """在线程池中执行耗时的数据库操作，并把结果交回GUI线程
+
+    每个任务带一个 key；同一 key 提交新任务时旧任务被标记为取消，
+    旧任务即使已经执行完，其结果也会被丢弃，界面只显示最新一次请求的结果。
+    回调函数都在GUI线程中调用。
+    """
+
+    # 信号从工作线程发出，经队列连接在 runner 所在的GUI线程中处理
+    _finished = pyqtSignal(object, object)
+    _failed = pyqtSignal(object, object)
+    _progress = pyqtSignal(object, int, str)
+
+    def __init__(self, max_threads: int = 4, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._generations: Dict[str, int] = {}
+        self._active: Dict[str, TaskContext] = {}
+        self._callbacks: Dict[TaskContext, tuple] = {}
+        self._finished.connect(self._on_finished)
+        self._failed.connect(self._on_failed)
+        self._progress.connect(self._on_progress)
+
+    def submit(self, key: str, fn: Callable[..., Any], *args,
+               on_result: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None,
+               on_progress: Optional[Callable[[int, str], None]] = None,
+               **kwargs) -> TaskContext:
+        """提交任务 fn(context, *args, **kwargs)，同 key 的旧任务会被取消"""
+        self.cancel(key)
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+        context = TaskContext(self, key, generation)
+        self._active[key] = context
+        self._callbacks[context] = (on_result, on_error, on_progress)
+        self.pool.start(_Task(self, context, fn, args, kwargs))
+        return context
+
+    def cancel(self, key: str):
+        context = self._active.pop(key, None)
+        if context is not None:
+            context.cancel()
+            self._callbacks.pop(context, None)
+
+    def cancel_all(self):
+        for key in list(self._active):
+            self.cancel(key)
+
+    def is_running(self, key: str) -> bool:
+        return key in self._active
+
+    def shutdown(self, timeout_ms: int = 3000):
+        """取消所有任务并等待正在执行的任务结束"""
+        self.cancel_all()
+        self.pool.clear()
+        self.pool.waitForDone(timeout_ms)
+
+    def _is_current(self, context: TaskContext) -> bool:
+        return not context.cancelled and self._active.get(context.key) is context
+
+    def _on_finished(self, context: TaskContext, result):
+        if not self._is_current(context):
+            return
+        del self._active[context.key]
+        on_result = self._callbacks.pop(context)[0]
+        if on_result is not None:
+            on_result(result)
+
+    def _on_failed(self, context: TaskContext, error: Exception):
+        if not self._is_current(context):
+            return
+        del self._active[context.key]
+        on_error = self._callbacks.pop(context)[1]
+        if on_error is not None:
+            on_error(error)
+
+    def _on_progress(self, context: TaskContext, percent: int, message: str):
+        if not self._is_current(context):
+            return
+        on_progress = self._callbacks[context][2]
+        if on_progress is not None:
+            on_progress(percent, message)